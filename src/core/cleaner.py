@@ -0,0 +1,167 @@
+"""
+Table cleaning for the generic (table finder) path.
+
+Works column-wise on plain lists of cell values with precompiled patterns,
+so a 5k line PO is cleaned in a handful of passes without building
+intermediate DataFrames. Cells are str, None (no cell) or pd.NA (blank cell).
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from typing import TYPE_CHECKING
+
+# pandas is only imported by the tables that need it:
+# a PO read by a template, or a small one, is parsed without it
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Common header names and the column they stand for
+COLUMN_ALIASES = {
+    "quantity": "qty",
+    "quantity.1": "qty",
+    "item": "description",
+    "desc": "description",
+    "part number": "sku",
+    "pn": "sku",
+    "ref": "sku",
+}
+
+# Columns containing any of these are money columns and get dropped
+MONEY_COLUMNS = ("price", "total", "amount", "cost")
+
+# Whitespace-only cell
+BLANK = re.compile(r"^\s*$")
+# A letter, a space, then a lowercase letter: a word split by the extraction ("G asket")
+SPLIT_WORD = re.compile(r"(?<=[a-zA-Z])\s(?=[a-z])")
+
+
+def clean_columns(header: list, columns: list[list]) -> tuple[list[str], list[list]]:
+    """
+    Cleans a raw extracted table given as its header and its columns.
+    Returns the cleaned column names and columns (same row count in every column).
+    """
+    # 1. Standardize headers, duplicates become 'name.number'
+    names = []
+    seen_counts = {}  # Tracks how many times we've seen a header
+    for col in header:
+        name = str(col).replace("\n", "").strip().lower()
+        if name in seen_counts:
+            seen_counts[name] += 1
+            # Create unique name: "total.1", "none.2", ".1"
+            name = f"{name}.{seen_counts[name]}"
+        else:
+            seen_counts[name] = 0
+
+        # 1.5 Normalize common names
+        names.append(COLUMN_ALIASES.get(name, name))
+
+    # 2. Drop price/total
+    keep = [i for i, n in enumerate(names) if not any(x in n for x in MONEY_COLUMNS)]
+    names = [names[i] for i in keep]
+    columns = [columns[i] for i in keep]
+
+    # 3. Fix split data (Merge Left)
+    i = 1
+    while i < len(names):
+        if _is_header_bad(names[i]):
+            # Merge Data: Previous + Space + Current
+            columns[i - 1] = [
+                f"{_as_text(prev)} {_as_text(curr)}".strip()
+                for prev, curr in zip(columns[i - 1], columns[i])
+            ]
+            del names[i], columns[i]
+        else:
+            i += 1
+
+    # 4. Blank cells become NA, then fix split headers (Merge Header Name Left)
+    import pandas as pd
+
+    columns = [
+        [pd.NA if isinstance(v, str) and BLANK.match(v) else v for v in col]
+        for col in columns
+    ]
+
+    i = 1
+    while i < len(names):
+        # If column is empty (all NA), it's a split header artifact
+        if all(_is_na(v) for v in columns[i]):
+            names[i - 1] = names[i - 1] + names[i]
+            del names[i], columns[i]
+        else:
+            i += 1
+
+    if not names:
+        return names, columns
+
+    # 5. Rows to keep: not a repeated header and not completely empty
+    first_col = names[0]
+    rows = [
+        r
+        for r, value in enumerate(columns[0])
+        if str(value) != first_col and not all(_is_na(col[r]) for col in columns)
+    ]
+
+    # 6. Final cleanup: newlines, split words, leading/trailing spaces
+    columns = [[_clean_cell(col[r]) for r in rows] for col in columns]
+
+    return names, columns
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame in, DataFrame out version of clean_columns()"""
+    if df.empty:
+        return df
+
+    columns = df.to_numpy(dtype=object).T.tolist()
+    names, columns = clean_columns(list(df.columns), columns)
+    return to_frame(names, columns)
+
+
+def to_frame(names: list[str], columns: list[list]) -> pd.DataFrame:
+    """Builds the items frame from cleaned columns"""
+    import pandas as pd
+
+    frame = pd.DataFrame(dict(enumerate(columns)), dtype=object)
+    frame.columns = names
+    return frame
+
+
+def to_records(names: list[str], columns: list[list]) -> list[dict]:
+    """Builds the items as a list of dicts (one per line) from cleaned columns"""
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _is_header_bad(name) -> bool:
+    """Returns True if the column header looks like a ghost/split artifact"""
+    return (
+        name == "nan"
+        or "unnamed" in name
+        or name == ""
+        or name == "none"
+        or name.startswith(".")
+    )
+
+
+def is_missing(value) -> bool:
+    """True for the cells a DataFrame would see as missing (None, NaN, NA)"""
+    return _is_na(value)
+
+
+def _is_na(value) -> bool:
+    # value != value is only True for NaN, pd.NA only exists once pandas is loaded
+    pd = sys.modules.get("pandas")
+    return value is None or (pd is not None and value is pd.NA) or value != value
+
+
+def _as_text(value) -> str:
+    """Cell as text for merging, a missing float becomes empty"""
+    text = str(value)
+    return "" if text == "nan" else text
+
+
+def _clean_cell(value):
+    if not isinstance(value, str):
+        return value
+    return SPLIT_WORD.sub("", value.replace("\n", "")).strip()
@@ -0,0 +1,170 @@
+"""
+Coordinate clustering column detector.
+
+An alternative to pdfplumber's table finder for whitespace layouts.
+The columns are found where the words of the table leave a vertical gap:
+every word covers [x0, x1] on a 1pt grid, and x-positions that (almost) no word
+covers separate the columns. The header labels above each cluster name it.
+Words are grouped into lines by their top and dropped into the column their
+left edge falls in. Lines without qty and sku are wrapped descriptions.
+
+Rows come out in one shape for every page, [qty, sku, description, other],
+so pages with different column sets can be joined (see ROW_LAYOUT).
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.core.layout_template import (
+    LABEL_GAP,
+    ROW_TOLERANCE,
+    TEMPLATE_COLUMNS,
+    template_frame,
+    template_items,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# A vertical gap at least this wide (in points) separates two columns
+MIN_COLUMN_GAP = 8
+# Share of the lines that may cross a gap (stray footer text, a long description)
+NOISE_SHARE = 0.05
+
+# Shape of the rows returned by cluster_rows(), read by template_frame()
+ROW_LAYOUT = {
+    "columns": [
+        {"name": name, "label": name} for name in TEMPLATE_COLUMNS + ["other"]
+    ]
+}
+
+
+def detect_columns(words, header_word, page_width, aliases) -> list[dict] | None:
+    """
+    Finds the columns of the table that starts at 'header_word'.
+    Returns [{"name", "label", "x0", "x1"}, ...] or None if qty, sku
+    and description can't all be found.
+    """
+    header = [w for w in words if abs(w["top"] - header_word["top"]) <= ROW_TOLERANCE]
+    body = [w for w in words if w["top"] > header_word["bottom"]]
+    if not body:
+        return None
+
+    # 1. Cluster the x-coordinates of the header and the body
+    table = header + body
+    boundaries = _column_boundaries(
+        np.array([w["x0"] for w in table]),
+        np.array([w["x1"] for w in table]),
+        page_width,
+        noise=int(_line_count(body) * NOISE_SHARE),
+    )
+
+    # 2. Glue the header words into labels ("UNIT PRICE")
+    labels = []
+    for word in sorted(header, key=lambda w: w["x0"]):
+        if labels and word["x0"] - labels[-1]["x1"] < LABEL_GAP:
+            labels[-1]["text"] += f" {word['text']}"
+            labels[-1]["x1"] = word["x1"]
+        else:
+            labels.append({"text": word["text"], "x0": word["x0"], "x1": word["x1"]})
+
+    # 3. Every label names the cluster its center falls in
+    columns = [
+        {"name": "", "label": "", "x0": boundaries[i], "x1": boundaries[i + 1]}
+        for i in range(len(boundaries) - 1)
+    ]
+    for label in labels:
+        center = (label["x0"] + label["x1"]) / 2
+        index = int(np.searchsorted(boundaries, center, side="right")) - 1
+        column = columns[min(max(index, 0), len(columns) - 1)]
+        if not column["name"]:
+            name = label["text"].lower().strip()
+            column["name"] = aliases.get(name, name)
+            column["label"] = label["text"]
+
+    names = [col["name"] for col in columns]
+    if not all(col in names for col in TEMPLATE_COLUMNS):
+        return None
+
+    return columns
+
+
+def cluster_rows(words, columns) -> list[list[str]]:
+    """
+    Groups the words into lines and cuts them along the columns.
+    Returns one [qty, sku, description, other] row per line.
+    """
+    if not words:
+        return []
+
+    tops = np.array([w["top"] for w in words])
+    x0s = np.array([w["x0"] for w in words])
+
+    # 1. Lines: sorted by top, a new line starts after a jump bigger than the tolerance
+    order = np.argsort(tops, kind="stable")
+    line_of = np.empty(len(words), dtype=np.int64)
+    line_of[order] = np.concatenate(
+        ([0], np.cumsum(np.diff(tops[order]) > ROW_TOLERANCE))
+    )
+
+    # 2. Column of every word: the last column starting left of it
+    starts = np.array([col["x0"] for col in columns[1:]])
+    column_of = np.searchsorted(starts, x0s, side="right")
+
+    # 3. Slot of every column in the output row (qty, sku, description, other)
+    slots = [
+        TEMPLATE_COLUMNS.index(col["name"]) if col["name"] in TEMPLATE_COLUMNS else 3
+        for col in columns
+    ]
+
+    rows = [[[] for _ in ROW_LAYOUT["columns"]] for _ in range(int(line_of.max()) + 1)]
+    # Reading order: line by line, left to right
+    for i in np.lexsort((x0s, line_of)):
+        rows[line_of[i]][slots[column_of[i]]].append(words[i]["text"])
+
+    return [[" ".join(cell) for cell in row] for row in rows]
+
+
+def clustered_frame(rows) -> pd.DataFrame:
+    """The [qty, sku, description] frame of the rows of all pages"""
+    return template_frame(rows, ROW_LAYOUT)
+
+
+def clustered_items(rows) -> list[list[str]]:
+    """The [qty, sku, description] lines of the rows of all pages"""
+    return template_items(rows, ROW_LAYOUT)
+
+
+def _column_boundaries(x0s, x1s, page_width, noise=0) -> np.ndarray:
+    """
+    Vectorized gap search over the x-axis.
+    Returns the column boundaries: page edge, the middle of every gap, page edge.
+    """
+    width = int(np.ceil(page_width)) + 1
+
+    # Coverage of every 1pt slot: +1 where a word starts, -1 after it ends
+    delta = np.zeros(width + 1, dtype=np.int64)
+    np.add.at(delta, np.clip(np.floor(x0s).astype(np.int64), 0, width), 1)
+    np.add.at(delta, np.clip(np.ceil(x1s).astype(np.int64), 0, width), -1)
+    covered = np.cumsum(delta)[:width] > noise
+
+    # Runs of covered slots: where the coverage switches on and off
+    switches = np.flatnonzero(np.diff(np.concatenate(([0], covered, [0])).astype(np.int8)))
+    run_starts, run_ends = switches[::2], switches[1::2]
+    if len(run_starts) == 0:
+        return np.array([0.0, page_width])
+
+    # Gaps that are too narrow are spaces inside a column
+    gaps = run_starts[1:] - run_ends[:-1]
+    wide = gaps >= MIN_COLUMN_GAP
+    middles = (run_ends[:-1][wide] + run_starts[1:][wide]) / 2
+
+    return np.concatenate(([0.0], middles, [page_width]))
+
+
+def _line_count(words) -> int:
+    tops = np.sort(np.array([w["top"] for w in words]))
+    return int(np.sum(np.diff(tops) > ROW_TOLERANCE)) + 1
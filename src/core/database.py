@@ -1,22 +1,52 @@
+from __future__ import annotations
+
+import json
 import re
 import sqlite3
+from typing import TYPE_CHECKING
 
-import pandas as pd
 from loguru import logger
 
+from src.core.line_template import compile_template
 from src.core.settings import settings
+from src.lib.text import NORMALIZER_VERSION, fold_description, normalize_description
+
+# pandas is imported by the methods that return frames:
+# the parse processes load this module and never need it
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class Database:
     def __init__(self):
         self.path = settings.db_path
+        # Called after every add_product/add_mapping (see match_index.py)
+        self._listeners = []
         self._initialize()
 
+    def add_listener(self, listener):
+        """Registers a callable that receives every product/mapping write as a dict"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def change_counter(self) -> int:
+        """Number of writes to the products, mappings and description_aliases tables, by anyone"""
+        conn = self._get_connection()
+        try:
+            return conn.execute("SELECT counter FROM db_changes").fetchone()[0]
+        finally:
+            conn.close()
+
     def add_product(self, warehouse_code, description) -> bool:
         """Adds a new item to the products list AND initializes the mapping row."""
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
+            before = self._begin_write(cursor)
 
             # Append the products table
             cursor.execute(
@@ -32,8 +62,23 @@ class Database:
                 "INSERT INTO mappings (warehouse_code) VALUES (?)", (warehouse_code,)
             )
 
+            # Normalized once here, the matcher never processes the catalog again
+            normalized = normalize_description(description, catalog=True)
+            self._store_normalized(cursor, [(warehouse_code, description, normalized)])
+
+            after = self._counter(cursor)
             conn.commit()
             logger.info(f"Added product: {description}")
+            self._notify(
+                {
+                    "table": "products",
+                    "warehouse_code": warehouse_code,
+                    "description": description,
+                    "normalized": normalized,
+                    "before": before,
+                    "after": after,
+                }
+            )
             return True
 
         except sqlite3.IntegrityError:
@@ -53,6 +98,7 @@ class Database:
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
+            before = self._begin_write(cursor)
             query = f"UPDATE mappings SET {col_name} = ? WHERE warehouse_code = ?"
             cursor.execute(query, (supplier_sku, warehouse_code))
 
@@ -60,10 +106,21 @@ class Database:
                 logger.error(f"Cannot map to {warehouse_code}: Product not found.")
                 return False
             else:
+                after = self._counter(cursor)
                 conn.commit()
                 logger.info(
                     f"Mapped {supplier_name} [{supplier_sku}] -> {warehouse_code}"
                 )
+                self._notify(
+                    {
+                        "table": "mappings",
+                        "supplier": supplier_name,
+                        "sku": supplier_sku,
+                        "warehouse_code": warehouse_code,
+                        "before": before,
+                        "after": after,
+                    }
+                )
                 return True
 
         except Exception as e:
@@ -74,6 +131,8 @@ class Database:
 
     def get_supplier_history(self, supplier) -> pd.DataFrame:
         """Gets known matches for this supplier."""
+        import pandas as pd
+
         col_name = self._ensure_supplier(supplier)
         conn = self._get_connection()
         try:
@@ -87,8 +146,79 @@ class Database:
         finally:
             conn.close()
 
+    def get_supplier_skus(self, supplier) -> dict[str, str]:
+        """Known matches for this supplier as {supplier_sku: warehouse_code}."""
+        col_name = self._ensure_supplier(supplier)
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT warehouse_code, "{col_name}" FROM mappings WHERE "{col_name}" IS NOT NULL'
+            )
+            return {row[1]: row[0] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    def get_product_map(self) -> dict[str, list[str]]:
+        """The catalog as {description: [warehouse_code, ...]}, products sharing a description in catalog order."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT warehouse_code, description FROM products ORDER BY rowid")
+            product_map = {}
+            for code, description in cursor.fetchall():
+                product_map.setdefault(description, []).append(code)
+            return product_map
+        finally:
+            conn.close()
+
+    def get_normalized_map(self) -> dict[str, list[str]]:
+        """
+        The catalog as {normalized description: [warehouse_code, ...]}, in catalog order:
+        products that only differ by noise share a key, none of them is lost.
+        Products added behind the app's back (or normalized by an older version) are done now.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT p.warehouse_code, p.description,
+                       n.description AS source, n.normalized, n.version
+                FROM products p
+                LEFT JOIN normalized_products n ON n.warehouse_code = p.warehouse_code
+                ORDER BY p.rowid
+            """
+            )
+
+            normalized_map = {}
+            stale = []
+            for row in cursor.fetchall():
+                normalized = row["normalized"]
+                if (
+                    normalized is None
+                    or row["source"] != row["description"]
+                    or row["version"] != NORMALIZER_VERSION
+                ):
+                    normalized = normalize_description(row["description"], catalog=True)
+                    stale.append((row["warehouse_code"], row["description"], normalized))
+                # Descriptions that are all noise (or missing) can't be matched on
+                if normalized:
+                    normalized_map.setdefault(normalized, []).append(row["warehouse_code"])
+
+            if stale:
+                self._store_normalized(cursor, stale)
+                conn.commit()
+                logger.info(f"Normalized {len(stale)} product descriptions")
+
+            return normalized_map
+        finally:
+            conn.close()
+
     def get_products(self) -> pd.DataFrame:
         """Returns the code and description for fuzzy matching."""
+        import pandas as pd
+
         conn = self._get_connection()
         try:
             query = "SELECT warehouse_code, description FROM products"
@@ -98,6 +228,8 @@ class Database:
 
     def get_autocomplete_data(self) -> pd.DataFrame:
         """Returns data for UI search bar."""
+        import pandas as pd
+
         conn = self._get_connection()
         try:
             query = "SELECT warehouse_code, description FROM products"
@@ -107,6 +239,8 @@ class Database:
 
     def get_registry_data(self) -> pd.DataFrame:
         """Returns the full combined table of products and all their supplier mappings."""
+        import pandas as pd
+
         conn = self._get_connection()
         try:
             # 1. Get all products
@@ -128,6 +262,8 @@ class Database:
 
     def get_registry_page(self, page: int, page_size: int, query: str = None, search_col: str = "description") -> pd.DataFrame:
         """Returns a single page of registry data, optionally filtered by search."""
+        import pandas as pd
+
         conn = self._get_connection()
         try:
             offset = (page - 1) * page_size
@@ -227,6 +363,447 @@ class Database:
         finally:
             conn.close()
 
+    def get_table_strategies(self, supplier) -> dict[str, dict]:
+        """Returns the table strategy stats recorded for this supplier."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT strategy, settings, wins, losses
+                FROM table_strategies
+                WHERE supplier = ?
+            """,
+                (self._clean_name(supplier),),
+            )
+            return {
+                row["strategy"]: {
+                    "settings": json.loads(row["settings"]),
+                    "wins": row["wins"],
+                    "losses": row["losses"],
+                }
+                for row in cursor.fetchall()
+            }
+        except Exception as e:
+            logger.error(f"Failed to read table strategies: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def record_table_strategy(self, supplier, strategy, table_settings, wins, losses) -> bool:
+        """Adds the page wins/losses of a table strategy to the supplier's stats."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO table_strategies (supplier, strategy, settings, wins, losses)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(supplier, strategy) DO UPDATE SET
+                    settings = excluded.settings,
+                    wins = wins + excluded.wins,
+                    losses = losses + excluded.losses
+            """,
+                (
+                    self._clean_name(supplier),
+                    strategy,
+                    json.dumps(table_settings),
+                    wins,
+                    losses,
+                ),
+            )
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save table strategy: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def get_layout_template(self, supplier) -> dict | None:
+        """Returns the learned column layout for this supplier (None if there isn't one)."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT columns, keywords, crop_offset
+                FROM layout_templates
+                WHERE supplier = ?
+            """,
+                (self._clean_name(supplier),),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+
+            return {
+                "columns": json.loads(row["columns"]),
+                "keywords": json.loads(row["keywords"]),
+                "crop_offset": row["crop_offset"],
+            }
+        except Exception as e:
+            logger.error(f"Failed to read layout template: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def save_layout_template(self, supplier, template) -> bool:
+        """Stores (or replaces) the column layout learned for this supplier."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO layout_templates
+                    (supplier, columns, keywords, crop_offset, hits)
+                VALUES (?, ?, ?, ?, 0)
+            """,
+                (
+                    self._clean_name(supplier),
+                    json.dumps(template["columns"]),
+                    json.dumps(template["keywords"]),
+                    template["crop_offset"],
+                ),
+            )
+            conn.commit()
+            logger.info(f"Learned layout template for {supplier}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save layout template: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def record_template_hit(self, supplier):
+        """Counts a document that was parsed with the supplier's template."""
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                "UPDATE layout_templates SET hits = hits + 1 WHERE supplier = ?",
+                (self._clean_name(supplier),),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to update layout template: {e}")
+        finally:
+            conn.close()
+
+    def delete_layout_template(self, supplier):
+        """Forgets the supplier's template (e.g. after the layout changed)."""
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                "DELETE FROM layout_templates WHERE supplier = ?",
+                (self._clean_name(supplier),),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to delete layout template: {e}")
+        finally:
+            conn.close()
+
+    def get_line_templates(self, supplier) -> list[dict]:
+        """Returns the supplier's regex line templates with their stats, most used first."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT name, pattern, continuation, hits, misses, seconds
+                FROM line_templates
+                WHERE supplier = ?
+                ORDER BY hits DESC, name
+            """,
+                (self._clean_name(supplier),),
+            )
+            templates = []
+            for row in cursor.fetchall():
+                uses = row["hits"] + row["misses"]
+                templates.append(
+                    {
+                        "name": row["name"],
+                        "pattern": row["pattern"],
+                        "continuation": row["continuation"],
+                        "hits": row["hits"],
+                        "misses": row["misses"],
+                        "hit_rate": row["hits"] / uses if uses else None,
+                        "avg_seconds": row["seconds"] / uses if uses else None,
+                    }
+                )
+            return templates
+        except Exception as e:
+            logger.error(f"Failed to read line templates: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def save_line_template(self, supplier, name, pattern, continuation=None) -> bool:
+        """Stores (or replaces) a regex line template for this supplier (see line_template.py)."""
+        try:
+            compile_template({"pattern": pattern, "continuation": continuation})
+        except ValueError as e:
+            logger.error(f"Invalid line template '{name}': {e}")
+            return False
+
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO line_templates
+                    (supplier, name, pattern, continuation, hits, misses, seconds)
+                VALUES (?, ?, ?, ?, 0, 0, 0)
+            """,
+                (self._clean_name(supplier), name, pattern, continuation),
+            )
+            conn.commit()
+            logger.info(f"Saved line template '{name}' for {supplier}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save line template: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def record_line_template(self, supplier, name, hit, seconds):
+        """Counts a document the template parsed (hit) or failed on (miss), and its time."""
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                """
+                UPDATE line_templates
+                SET hits = hits + ?, misses = misses + ?, seconds = seconds + ?
+                WHERE supplier = ? AND name = ?
+            """,
+                (int(hit), int(not hit), seconds, self._clean_name(supplier), name),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to update line template: {e}")
+        finally:
+            conn.close()
+
+    def delete_line_template(self, supplier, name):
+        """Removes one of the supplier's line templates."""
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                "DELETE FROM line_templates WHERE supplier = ? AND name = ?",
+                (self._clean_name(supplier), name),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to delete line template: {e}")
+        finally:
+            conn.close()
+
+    def get_supplier_aliases(self) -> dict[str, str]:
+        """Returns the known aliases (clean name -> supplier) used to spot suppliers in file names."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            # Longest first, so "acmesupplieseu" wins over "acmesupplies"
+            cursor.execute(
+                "SELECT alias, supplier FROM supplier_aliases ORDER BY LENGTH(alias) DESC"
+            )
+            return {row["alias"]: row["supplier"] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to read supplier aliases: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def add_supplier_alias(self, alias, supplier) -> bool:
+        """Links an alias (e.g. a name used in file names) to a supplier."""
+        clean_alias = self._clean_name(alias)
+        # Short aliases would match random file names
+        if len(clean_alias) < 4:
+            return False
+
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR IGNORE INTO supplier_aliases (alias, supplier) VALUES (?, ?)",
+                (clean_alias, supplier),
+            )
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save supplier alias: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def delete_supplier_alias(self, alias) -> bool:
+        """Forgets an alias, its files are recognized from the page again."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM supplier_aliases WHERE alias = ?", (self._clean_name(alias),)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Failed to delete supplier alias: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def get_description_aliases(self, supplier) -> dict[str, str]:
+        """
+        Descriptions confirmed in review for this supplier: {folded description: warehouse_code}.
+        Keys are redone from the description (older versions stored it normalized), there are few.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT description, warehouse_code
+                FROM description_aliases
+                WHERE supplier = ?
+                ORDER BY rowid
+            """,
+                (self._clean_name(supplier),),
+            )
+
+            # Later rows win, a description confirmed again replaces an older alias
+            aliases = {}
+            for row in cursor.fetchall():
+                key = fold_description(row["description"])
+                if key:
+                    aliases[key] = row["warehouse_code"]
+
+            return aliases
+        except Exception as e:
+            logger.error(f"Failed to read description aliases: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def add_description_aliases(self, supplier, aliases: list[dict]) -> int:
+        """
+        Remembers reviewed lines ({description, warehouse_code}) of this supplier,
+        so the same description is matched without scoring next time.
+        Only case and whitespace are folded: "Grade A" never confirms "Grade B".
+        Saving a description again replaces its code.
+        Returns the number of aliases saved.
+        """
+        rows = {}
+        for alias in aliases:
+            key = fold_description(alias["description"])
+            if key:
+                rows[key] = (alias["description"], alias["warehouse_code"])
+        if not rows:
+            return 0
+
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            before = self._begin_write(cursor)
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO description_aliases
+                    (supplier, normalized, description, warehouse_code, version)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                [
+                    (self._clean_name(supplier), key, description, code, NORMALIZER_VERSION)
+                    for key, (description, code) in rows.items()
+                ],
+            )
+            after = self._counter(cursor)
+            conn.commit()
+            logger.info(f"Saved {len(rows)} description aliases for {supplier}")
+            self._notify(
+                {
+                    "table": "description_aliases",
+                    "supplier": supplier,
+                    "aliases": {key: code for key, (_, code) in rows.items()},
+                    "before": before,
+                    "after": after,
+                }
+            )
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Failed to save description aliases: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def delete_description_aliases(self, supplier, descriptions: list[str]) -> int:
+        """
+        Forgets reviewed descriptions of this supplier (a wrong confirmation),
+        their lines are fuzzy scored again. Returns the number of aliases removed.
+        """
+        keys = {fold_description(description) for description in descriptions}
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            before = self._begin_write(cursor)
+            cursor.execute(
+                "SELECT rowid, description FROM description_aliases WHERE supplier = ?",
+                (self._clean_name(supplier),),
+            )
+            rowids = [
+                (row["rowid"],)
+                for row in cursor.fetchall()
+                if fold_description(row["description"]) in keys
+            ]
+            cursor.executemany("DELETE FROM description_aliases WHERE rowid = ?", rowids)
+            after = self._counter(cursor)
+            conn.commit()
+            logger.info(f"Removed {len(rowids)} description aliases of {supplier}")
+            self._notify(
+                {
+                    "table": "description_aliases",
+                    "supplier": supplier,
+                    "aliases": {},
+                    "removed": sorted(keys),
+                    "before": before,
+                    "after": after,
+                }
+            )
+            return len(rowids)
+        except Exception as e:
+            logger.error(f"Failed to delete description aliases: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _store_normalized(cursor, rows):
+        """Saves (warehouse_code, description, normalized) rows"""
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO normalized_products
+                (warehouse_code, description, normalized, version)
+            VALUES (?, ?, ?, ?)
+        """,
+            [(*row, NORMALIZER_VERSION) for row in rows],
+        )
+
+    def _begin_write(self, cursor) -> int:
+        """Locks the database for a write, returns the change counter before it"""
+        cursor.execute("BEGIN IMMEDIATE")
+        return self._counter(cursor)
+
+    @staticmethod
+    def _counter(cursor) -> int:
+        cursor.execute("SELECT counter FROM db_changes")
+        return cursor.fetchone()[0]
+
+    def _notify(self, change):
+        for listener in list(self._listeners):
+            try:
+                listener(change)
+            except Exception as e:
+                # A broken listener must never fail the write
+                logger.error(f"Database listener failed: {e}")
+
     def _ensure_supplier(self, supplier):
         """Dynamically adds a column for the supplier if it doesn't exist."""
         conn = self._get_connection()
@@ -237,8 +814,7 @@ class Database:
         existing_cols = [row["name"] for row in cursor.fetchall()]
 
         # Clean the supplier name before adding it
-        clean_sup = supplier.lower().strip()
-        clean_sup = re.sub(r"[^a-z0-9]", "", clean_sup)
+        clean_sup = self._clean_name(supplier)
 
         # Check against raw name
         if clean_sup not in existing_cols:
@@ -253,6 +829,12 @@ class Database:
         conn.close()
         return clean_sup
 
+    @staticmethod
+    def _clean_name(supplier) -> str:
+        """Lowercase alphanumeric version of the supplier name, used as a key"""
+        clean_sup = supplier.lower().strip()
+        return re.sub(r"[^a-z0-9]", "", clean_sup)
+
     def _get_connection(self) -> sqlite3.Connection:
         """Ensures there is always a valid connection for the current thread."""
         try:
@@ -284,8 +866,108 @@ class Database:
             );
         """
 
+        # Which table finder strategy works for each supplier (see PdfParser)
+        strategies_sql = """
+            CREATE TABLE IF NOT EXISTS table_strategies (
+                supplier TEXT,
+                strategy TEXT,
+                settings TEXT,
+                wins INTEGER DEFAULT 0,
+                losses INTEGER DEFAULT 0,
+                PRIMARY KEY (supplier, strategy)
+            );
+        """
+
+        # Learned column boundaries per supplier (see layout_template.py)
+        templates_sql = """
+            CREATE TABLE IF NOT EXISTS layout_templates (
+                supplier TEXT PRIMARY KEY,
+                columns TEXT,
+                keywords TEXT,
+                crop_offset REAL,
+                hits INTEGER DEFAULT 0
+            );
+        """
+
+        # Regex line templates per supplier (see line_template.py)
+        line_templates_sql = """
+            CREATE TABLE IF NOT EXISTS line_templates (
+                supplier TEXT,
+                name TEXT,
+                pattern TEXT,
+                continuation TEXT,
+                hits INTEGER DEFAULT 0,
+                misses INTEGER DEFAULT 0,
+                seconds REAL DEFAULT 0,
+                PRIMARY KEY (supplier, name)
+            );
+        """
+
+        # Names that identify a supplier before its PDF is read
+        aliases_sql = """
+            CREATE TABLE IF NOT EXISTS supplier_aliases (
+                alias TEXT PRIMARY KEY,
+                supplier TEXT
+            );
+        """
+
+        # Matcher form of every description (see src/lib/text.py)
+        normalized_sql = """
+            CREATE TABLE IF NOT EXISTS normalized_products (
+                warehouse_code TEXT PRIMARY KEY,
+                description TEXT,
+                normalized TEXT,
+                version INTEGER,
+                FOREIGN KEY(warehouse_code) REFERENCES products(warehouse_code)
+                    ON UPDATE CASCADE
+                    ON DELETE CASCADE
+            );
+        """
+
+        # Descriptions an operator confirmed in review, per supplier (see matcher.py)
+        description_aliases_sql = """
+            CREATE TABLE IF NOT EXISTS description_aliases (
+                supplier TEXT,
+                normalized TEXT,
+                description TEXT,
+                warehouse_code TEXT,
+                version INTEGER,
+                PRIMARY KEY (supplier, normalized),
+                FOREIGN KEY(warehouse_code) REFERENCES products(warehouse_code)
+                    ON UPDATE CASCADE
+                    ON DELETE CASCADE
+            );
+        """
+
+        # Moved by every write to the matcher's tables, from this app or anything else
+        changes_sql = """
+            CREATE TABLE IF NOT EXISTS db_changes (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                counter INTEGER
+            );
+        """
+
         cursor.execute(products_sql)
         cursor.execute(mappings_sql)
+        cursor.execute(normalized_sql)
+        cursor.execute(description_aliases_sql)
+        cursor.execute(changes_sql)
+        cursor.execute("INSERT OR IGNORE INTO db_changes (id, counter) VALUES (0, 0)")
+        for table in ["products", "mappings", "description_aliases"]:
+            for action in ["INSERT", "UPDATE", "DELETE"]:
+                cursor.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_{action.lower()}_changes
+                    AFTER {action} ON {table}
+                    BEGIN
+                        UPDATE db_changes SET counter = counter + 1;
+                    END;
+                """
+                )
+        cursor.execute(strategies_sql)
+        cursor.execute(templates_sql)
+        cursor.execute(line_templates_sql)
+        cursor.execute(aliases_sql)
         conn.commit()
         logger.info("Database initialized")
         conn.close()
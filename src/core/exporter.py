@@ -1,33 +1,47 @@
+import csv
+import os
+
 import pandas as pd
 from loguru import logger
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
 from pathlib import Path
 
+from src.core.cleaner import is_missing
 from src.core.settings import settings
 from src.core.logger import task_scope
 
 
+class ExportCancelled(Exception):
+    """Raised by a stream of export frames to drop the file it was writing"""
+
+
 class Exporter:
     """Handles data export to various formats (.xlsx, .xls, .csv)."""
 
     def __init__(self):
         self.output_dir = settings.output_dir
 
-    def run(self, df: pd.DataFrame, filename: str):
+    def run(self, df: pd.DataFrame | list[dict], filename: str):
         """
         Exports the dataframe to the configured format.
+        Small POs come as a list of dicts and are written without pandas.
         """
         fmt = settings.export_format.lower()
+        export_path = self._export_path(filename, fmt)
 
-        # 1. Prepare path
-        export_path = self.output_dir / filename
-        
-        # Ensure correct extension
-        if not export_path.suffix == fmt:
-            export_path = export_path.with_suffix(fmt)
+        # No native writer for this format
+        if isinstance(df, list) and fmt not in [".csv", ".xlsx"]:
+            df = pd.DataFrame(df)
 
         with task_scope(f"Exporting to {export_path.name}"):
             try:
-                if fmt == ".csv":
+                if isinstance(df, list) and fmt == ".csv":
+                    self._write_csv(df, export_path)
+                elif isinstance(df, list):
+                    self._write_xlsx(df, export_path)
+                elif fmt == ".csv":
                     df.to_csv(export_path, index=False)
                 elif fmt in [".xlsx", ".xls"]:
                     # pandas handles both via openpyxl or xlwt/xlsxwriter
@@ -42,3 +56,134 @@ class Exporter:
             except Exception as e:
                 logger.error(f"Export failed: {e}")
                 return None
+
+    def run_chunks(self, frames, filename: str):
+        """
+        Exports a stream of export frames (see data.prepare_export_chunks) into one file,
+        writing each frame as it arrives. Same file as run() on the whole export.
+        The file only appears once it's complete: a stream that raises ExportCancelled
+        (or fails) leaves nothing behind. No frames at all, no file.
+        """
+        fmt = settings.export_format.lower()
+        export_path = self._export_path(filename, fmt)
+        # Written next to the export, renamed when the last frame is in
+        part_path = export_path.with_name(f".{export_path.stem}.part{export_path.suffix}")
+
+        with task_scope(f"Exporting to {export_path.name}"):
+            try:
+                if fmt == ".csv":
+                    rows = self._stream_csv(frames, part_path)
+                elif fmt == ".xlsx":
+                    rows = self._stream_xlsx(frames, part_path)
+                elif fmt == ".xls":
+                    # No streaming writer for this format, same as run()
+                    frames = list(frames)
+                    rows = sum(len(df) for df in frames)
+                    if frames:
+                        pd.concat(frames, ignore_index=True).to_excel(part_path, index=False)
+                else:
+                    logger.error(f"Unsupported export format: {fmt}")
+                    return None
+
+                if not part_path.exists():
+                    logger.warning(f"Nothing to export to {export_path.name}")
+                    return None
+
+                os.replace(part_path, export_path)
+                logger.info(f"File exported successfully: {export_path.name} ({rows} rows)")
+                return export_path
+
+            except ExportCancelled as e:
+                logger.info(f"Export to {export_path.name} cancelled: {e}")
+                return None
+            except Exception as e:
+                logger.error(f"Export failed: {e}")
+                return None
+            finally:
+                part_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _stream_csv(frames, export_path: Path) -> int:
+        """Header with the first frame, the next ones are appended"""
+        rows = 0
+        first = True
+        for df in frames:
+            df.to_csv(export_path, index=False, mode="w" if first else "a", header=first)
+            first = False
+            rows += len(df)
+        return rows
+
+    @staticmethod
+    def _stream_xlsx(frames, export_path: Path) -> int:
+        """
+        Same sheet as DataFrame.to_excel(index=False), header style included.
+        A write-only workbook keeps no cells in memory, the rows go to disk as they come.
+        """
+        workbook = None
+        rows = 0
+        for df in frames:
+            if workbook is None:
+                workbook = Workbook(write_only=True)
+                sheet = workbook.create_sheet("Sheet1")
+                # pandas' header: bold, thin borders, centered at the top
+                side = Side(style="thin")
+                header = []
+                for name in df.columns:
+                    cell = WriteOnlyCell(sheet, value=name)
+                    cell.font = Font(bold=True)
+                    cell.border = Border(left=side, right=side, top=side, bottom=side)
+                    cell.alignment = Alignment(horizontal="center", vertical="top")
+                    header.append(cell)
+                sheet.append(header)
+
+            for row in df.itertuples(index=False):
+                sheet.append([None if is_missing(v) else v for v in row])
+            rows += len(df)
+
+        if workbook is not None:
+            workbook.save(export_path)
+        return rows
+
+    @staticmethod
+    def _write_csv(rows: list[dict], export_path: Path):
+        """Same file as DataFrame.to_csv(index=False)"""
+        with open(export_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            if rows:
+                writer.writerow(rows[0].keys())
+            for row in rows:
+                writer.writerow("" if is_missing(v) else v for v in row.values())
+
+    @staticmethod
+    def _write_xlsx(rows: list[dict], export_path: Path):
+        """Same sheet as DataFrame.to_excel(index=False), header style included"""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "Sheet1"
+
+        if rows:
+            # pandas' header: bold, thin borders, centered at the top
+            side = Side(style="thin")
+            for col, name in enumerate(rows[0].keys(), start=1):
+                cell = sheet.cell(row=1, column=col, value=name)
+                cell.font = Font(bold=True)
+                cell.border = Border(left=side, right=side, top=side, bottom=side)
+                cell.alignment = Alignment(horizontal="center", vertical="top")
+
+        for r, row in enumerate(rows, start=2):
+            for col, value in enumerate(row.values(), start=1):
+                if not is_missing(value):
+                    sheet.cell(row=r, column=col, value=value)
+
+        workbook.save(export_path)
+
+    def _export_path(self, filename: str, fmt: str) -> Path:
+        """Output path with the extension of the export format"""
+        # 1. Prepare path
+        export_path = self.output_dir / filename
+
+        # Ensure correct extension
+        if not export_path.suffix == fmt:
+            export_path = export_path.with_suffix(fmt)
+
+        return export_path
@@ -0,0 +1,148 @@
+"""
+Supplier layout templates.
+
+Once a supplier's PO parsed cleanly, the x-positions of its header labels tell us
+where every column starts. The template stores those boundaries so later POs can be
+cut along those lines instead of running the table finder every time.
+
+Template format:
+{
+    "columns": [{"name": "qty", "label": "QTY", "x0": 0, "x1": 78.0}, ...],
+    "keywords": ["qty", "sku", ...],
+    "crop_offset": 142.0,
+}
+"""
+
+from __future__ import annotations
+
+import bisect
+from typing import TYPE_CHECKING
+
+from src.core.cleaner import SPLIT_WORD
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Gap (in points) between two header words that still belong to the same label ("UNIT PRICE")
+LABEL_GAP = 6
+# Distance between a label and the boundary line drawn left of it
+BOUNDARY_MARGIN = 2
+# Words whose tops are this close belong to the same line
+ROW_TOLERANCE = 3
+
+# Only these columns are kept, everything else (price, total, ...) is ignored
+TEMPLATE_COLUMNS = ["qty", "sku", "description"]
+
+
+def learn_template(words, header_word, page_width, aliases) -> dict | None:
+    """
+    Builds a template from the words of the header row.
+    Returns None if the header doesn't name the qty, sku and description columns.
+    """
+    # 1. The header row: every word on the same line as the header keyword
+    row = [w for w in words if abs(w["top"] - header_word["top"]) < 3]
+    row.sort(key=lambda w: w["x0"])
+
+    # 2. Glue words that sit close together into labels
+    labels = []
+    for word in row:
+        if labels and word["x0"] - labels[-1]["x1"] < LABEL_GAP:
+            labels[-1]["text"] += f" {word['text']}"
+            labels[-1]["x1"] = word["x1"]
+        else:
+            labels.append({"text": word["text"], "x0": word["x0"], "x1": word["x1"]})
+
+    # 3. Name the columns the same way _clean_table does
+    names = []
+    for label in labels:
+        name = label["text"].lower().strip()
+        names.append(aliases.get(name, name))
+
+    if not all(col in names for col in TEMPLATE_COLUMNS):
+        return None
+
+    # 4. Boundaries: page edge, left of every label after the first, page edge
+    lines = [0] + [label["x0"] - BOUNDARY_MARGIN for label in labels[1:]] + [page_width]
+    columns = [
+        {"name": name, "label": labels[i]["text"], "x0": lines[i], "x1": lines[i + 1]}
+        for i, name in enumerate(names)
+    ]
+
+    return {
+        "columns": columns,
+        "keywords": sorted({label["text"].split()[0].lower() for label in labels}),
+        "crop_offset": header_word["top"],
+    }
+
+
+def template_rows(words, template) -> list[list[str]]:
+    """
+    Cuts the words of a page into the template's columns.
+    Words on the same line form a row, each word goes to the column its left edge falls in.
+    """
+    columns = template["columns"]
+    starts = [col["x0"] for col in columns[1:]]
+
+    # 1. Group the words into lines
+    lines = []
+    for word in sorted(words, key=lambda w: w["top"]):
+        # A new line starts when the word sits lower than the line's first word
+        if not lines or word["top"] - lines[-1][0]["top"] > ROW_TOLERANCE:
+            lines.append([])
+        lines[-1].append(word)
+
+    # 2. Put every word in the column its left edge falls in
+    rows = []
+    for line in lines:
+        row = [[] for _ in columns]
+        for word in sorted(line, key=lambda w: w["x0"]):
+            row[bisect.bisect_right(starts, word["x0"])].append(word["text"])
+        rows.append([" ".join(cell) for cell in row])
+
+    return rows
+
+
+def template_frame(rows, template) -> pd.DataFrame:
+    """
+    Turns the rows cut by a template into the [qty, sku, description] frame.
+    The columns are already known, so no header repair is needed.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(template_items(rows, template), columns=TEMPLATE_COLUMNS)
+
+
+def template_items(rows, template) -> list[list[str]]:
+    """The [qty, sku, description] lines of the rows cut by a template"""
+    names = [col["name"] for col in template["columns"]]
+    keep = [names.index(col) for col in TEMPLATE_COLUMNS]
+    header = [template["columns"][i]["label"].lower() for i in keep]
+
+    items = []
+    for row in rows:
+        cells = [_clean_cell(row[i]) for i in keep]
+
+        # Empty rows and repeated header rows (one per page)
+        if not any(cells) or [c.lower() for c in cells] == header:
+            continue
+
+        qty, sku, desc = cells
+        if not qty and not sku:
+            # Only the description filled in: it wrapped onto the next line
+            others = [_clean_cell(v) for i, v in enumerate(row) if i not in keep]
+            if items and not any(others):
+                items[-1][2] = f"{items[-1][2]} {desc}".strip()
+            # Anything else (totals, notes) isn't a line item
+            continue
+
+        items.append(cells)
+
+    return items
+
+
+def _clean_cell(value) -> str:
+    """Same cell cleanup as the end of cleaner.clean_columns"""
+    if value is None:
+        return ""
+    value = str(value).replace("\n", "")
+    return SPLIT_WORD.sub("", value).strip()
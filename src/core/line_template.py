@@ -0,0 +1,96 @@
+"""
+Regex line templates.
+
+Some suppliers print every line item on one line of text in a fixed format.
+For them a regex over the text lines of the page recovers the items much faster
+than any table finder. Templates are added per supplier to the database
+(line_templates) and tried before the table strategies.
+
+Template format:
+{
+    "name": "acme-2024",
+    "pattern": r"(?P<qty>\\d+) (?P<sku>AS-\\d{3}) (?P<description>.+) \\$[\\d.,]+ \\$[\\d.,]+",
+    "continuation": r"(?P<description>[^$]+)",  # optional, wrapped description lines
+}
+
+The pattern has to match a whole line. A continuation line extends the description
+of the item above it, so its regex should be strict enough to skip footers.
+A template is only trusted if it covers most lines of the block it matched in
+(from its first item line to its last covered line on every page).
+"""
+
+import re
+
+from src.core.layout_template import ROW_TOLERANCE, TEMPLATE_COLUMNS
+
+# Share of the lines in the item block a template has to cover
+MIN_LINE_COVERAGE = 0.9
+
+
+def compile_template(template) -> tuple[re.Pattern, re.Pattern | None]:
+    """
+    Compiles the pattern and the continuation of a template.
+    Raises ValueError if a regex is broken or misses the qty, sku or description group.
+    """
+    try:
+        pattern = re.compile(template["pattern"])
+        continuation = template.get("continuation")
+        continuation = re.compile(continuation) if continuation else None
+    except re.error as e:
+        raise ValueError(f"invalid regex: {e}") from e
+
+    missing = [col for col in TEMPLATE_COLUMNS if col not in pattern.groupindex]
+    if missing:
+        raise ValueError(f"the pattern has no group for {', '.join(missing)}")
+    if continuation is not None and "description" not in continuation.groupindex:
+        raise ValueError("the continuation has no description group")
+
+    return pattern, continuation
+
+
+def text_lines(words) -> list[str]:
+    """The words of a page joined into lines of text, top to bottom"""
+    lines = []
+    line = []
+    top = None
+    for word in sorted(words, key=lambda w: (round(w["top"]), w["x0"])):
+        if top is not None and word["top"] - top > ROW_TOLERANCE:
+            lines.append(line)
+            line = []
+        if not line:
+            top = word["top"]
+        line.append(word)
+    if line:
+        lines.append(line)
+
+    return [" ".join(w["text"] for w in sorted(line, key=lambda w: w["x0"])) for line in lines]
+
+
+def match_lines(lines, pattern, continuation=None) -> tuple[list[list[str]], int, int]:
+    """
+    Matches the template against the lines of one page.
+    Returns the [qty, sku, description] items, the covered lines and the size of the block.
+    """
+    items = []
+    covered = 0
+    first = None
+    last = None
+
+    for index, line in enumerate(lines):
+        line = line.strip()
+
+        match = pattern.fullmatch(line)
+        if match:
+            items.append([match.group(col).strip() for col in TEMPLATE_COLUMNS])
+        elif items and continuation is not None:
+            match = continuation.fullmatch(line)
+            if match:
+                items[-1][2] = f"{items[-1][2]} {match.group('description').strip()}"
+
+        if match:
+            covered += 1
+            first = index if first is None else first
+            last = index
+
+    block = 0 if first is None else last - first + 1
+    return items, covered, block
@@ -0,0 +1,170 @@
+import threading
+
+from src.core.database import database as db
+from src.core.token_index import TokenIndex
+
+
+class Catalog:
+    """
+    The products in one form (raw or normalized descriptions):
+    - products: description -> [warehouse_code, ...] (products sharing a description, in catalog order)
+    - descriptions: the search choices, positions match the token index
+    - tokens: inverted index over the descriptions (built on first use, see token_index.py)
+    """
+
+    def __init__(self, products):
+        self.products = products
+        # (descriptions, token index), replaced in one assignment: a search reads a matching pair.
+        # The searches skip products without a description anyway
+        self._state = ([d for d in products if d is not None], None)
+
+    @property
+    def descriptions(self) -> list[str]:
+        return self._state[0]
+
+    def search_state(self) -> tuple[list[str], TokenIndex]:
+        """The descriptions and their token index, from the same catalog state"""
+        descriptions, tokens = self._state
+        if tokens is None:
+            tokens = TokenIndex(descriptions)
+            self._state = (descriptions, tokens)
+        return descriptions, tokens
+
+    def add(self, description, code):
+        codes = self.products.get(description)
+        if codes is not None:
+            # Already a search choice, one more product behind it
+            if code not in codes:
+                codes.append(code)
+            return
+
+        self.products[description] = [code]
+        if description is None:
+            return
+
+        # New lists, not updated in place: a running search may still read the old ones
+        descriptions, tokens = self._state
+        position = len(descriptions)
+        descriptions = descriptions + [description]
+        if tokens is not None:
+            tokens = tokens.extended(position, description)
+        self._state = (descriptions, tokens)
+
+
+class MatchIndex:
+    """
+    Long-lived lookup tables for the matcher, so a PO doesn't reload the catalog.
+    - catalogs: the products by raw or normalized description (loaded on first use)
+    - histories: supplier SKU -> warehouse_code, one dict per supplier (loaded on first use)
+    - aliases: description (case and spaces folded) -> warehouse_code, confirmed in review, one dict per supplier
+
+    add_product/add_mapping and the description alias writes update the tables in place. Any other
+    write to the products, mappings or description_aliases tables moves the database
+    change counter, and the next lookup starts over from the database.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Database file and change counter the tables were loaded at
+        self.path = None
+        self.version = None
+
+        # normalized (bool): Catalog
+        self._catalogs = {}
+        self._histories = {}
+        self._aliases = {}
+
+        db.add_listener(self._on_change)
+
+    def history(self, supplier) -> dict[str, str]:
+        """Known SKUs of the supplier: {supplier_sku: warehouse_code}"""
+        key = db._clean_name(supplier)
+        with self.lock:
+            self._sync()
+            if key not in self._histories:
+                self._histories[key] = db.get_supplier_skus(supplier)
+            return self._histories[key]
+
+    def aliases(self, supplier) -> dict[str, str]:
+        """Reviewed descriptions of the supplier: {normalized description: warehouse_code}"""
+        key = db._clean_name(supplier)
+        with self.lock:
+            self._sync()
+            if key not in self._aliases:
+                self._aliases[key] = db.get_description_aliases(supplier)
+            return self._aliases[key]
+
+    def catalog(self, normalized=False) -> Catalog:
+        """The products by description, or by normalized description (see src/lib/text.py)"""
+        with self.lock:
+            self._sync()
+            if normalized not in self._catalogs:
+                products = db.get_normalized_map() if normalized else db.get_product_map()
+                self._catalogs[normalized] = Catalog(products)
+            return self._catalogs[normalized]
+
+    def search_state(self, catalog) -> tuple[list[str], TokenIndex]:
+        """Descriptions and token index of a catalog from catalog(), built under the lock"""
+        with self.lock:
+            return catalog.search_state()
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def _sync(self):
+        """Drops everything if the database was changed behind the index (or swapped)"""
+        version = db.change_counter()
+        if self.path != db.path or self.version != version:
+            self._clear()
+            self.path = db.path
+            self.version = version
+
+    def _clear(self):
+        self._catalogs = {}
+        self._histories = {}
+        self._aliases = {}
+        self.version = None
+
+    def _on_change(self, change):
+        """Write-through of add_product/add_mapping/add_description_aliases/delete_description_aliases"""
+        with self.lock:
+            # Another write got in between, the next lookup reloads anyway
+            if self.path != db.path or self.version != change["before"]:
+                self._clear()
+                return
+            self.version = change["after"]
+
+            if change["table"] == "products":
+                code = change["warehouse_code"]
+                if False in self._catalogs:
+                    self._catalogs[False].add(change["description"], code)
+                if True in self._catalogs and change["normalized"]:
+                    self._catalogs[True].add(change["normalized"], code)
+                return
+
+            if change["table"] == "description_aliases":
+                aliases = self._aliases.get(db._clean_name(change["supplier"]))
+                if aliases is not None:
+                    aliases.update(change["aliases"])
+                    for key in change.get("removed", []):
+                        aliases.pop(key, None)
+                return
+
+            history = self._histories.get(db._clean_name(change["supplier"]))
+            if history is None:
+                return
+
+            sku, code = change["sku"], change["warehouse_code"]
+            if history.get(sku, code) != code:
+                # The SKU is taken by another product, let the database decide
+                del self._histories[db._clean_name(change["supplier"])]
+                return
+
+            # A product has one SKU per supplier, the new one replaces the old
+            for old_sku in [s for s, c in history.items() if c == code]:
+                del history[old_sku]
+            history[sku] = code
+
+
+match_index = MatchIndex()
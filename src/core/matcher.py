@@ -1,91 +1,263 @@
+from collections.abc import Iterator
+
+import numpy as np
 import pandas as pd
 from rapidfuzz import fuzz, process
 
-from src.core.database import database as db
+from src.core.match_index import match_index
 from src.core.settings import settings
+from src.lib.text import fold_description, normalize_description
+
+# Cells of one score matrix (float64): lines * catalog size, about 64 MB
+MAX_SCORE_CELLS = 8_000_000
+# Lowest score worth suggesting in review, a red line still gets its near misses
+CANDIDATE_CUTOFF = 40
 
 
-def fuzzy_match(po_items: pd.DataFrame, supplier: str) -> pd.DataFrame:
+def fuzzy_match(po_items: pd.DataFrame | list[dict], supplier: str) -> pd.DataFrame | list[dict]:
     """
-    Creates a DataFrame mapping PDF items to internal codes.
+    Creates a DataFrame mapping PDF items to internal codes, one row per item (same order).
+    Small POs come in as a list of dicts and get their results as one too.
+    Repeated lines (same sku and description) are matched once.
 
     Returns:
-        New DF with columns: ['sku', 'warehouse_code', 'flag', 'score']
+        New DF with columns: ['sku', 'warehouse_code', 'flag', 'score', 'candidates']
+        candidates: the best matches of a scored line, [{warehouse_code, score}], best first
     """
     # 1. Requests
-    # Get the available SKU's for the supplier
-    available_mappings = db.get_supplier_history(supplier)
-
-    # Get the available product codes
-    all_products = db.get_products()
+    # Known SKU's and product codes, kept in memory between POs
+    # History map (green): key = sku, value = warehouse_code
+    history_map = match_index.history(supplier)
+    # Aliases (blue): key = description confirmed in review (case and spaces folded), value = warehouse_code
+    aliases = match_index.aliases(supplier)
+    # Catalog (yellow): key = (normalized) description, value = warehouse codes (the first one is suggested)
+    normalized = settings.normalize_descriptions
+    catalog = match_index.catalog(normalized)
 
     # 2. Declarations
     threshold = settings.fuzzy_threshold * 100
-    # History map (green): key = sku, value = warehouse_code
-    history_map = dict(
-        zip(available_mappings.iloc[:, 1], available_mappings.iloc[:, 0])
-    )
+    limit = settings.review_candidates
+    skus, descriptions = _item_columns(po_items)
+    # Delivery splits repeat a line, only the distinct ones are matched
+    lines = list(dict.fromkeys(zip(skus, descriptions)))
 
-    # Product map (yellow): key = description, value = warehouse_code
-    product_map = dict(zip(all_products.iloc[:, 1], all_products.iloc[:, 0]))
+    # 3. Exact lookups, no scoring: known SKU first, then a reviewed description
+    results = []
+    pending = []
+    queries = []
+    for index, (pdf_sku, pdf_desc) in enumerate(lines):
+        if pdf_sku in history_map:
+            results.append(_result(pdf_sku, history_map[pdf_sku], "green", 100))
+            continue
 
-    valid_descriptions = list(product_map.keys())
+        key = fold_description(pdf_desc)
+        if key in aliases:
+            results.append(_result(pdf_sku, aliases[key], "blue", 100))
+            continue
 
-    results = []
+        results.append(None)
+        pending.append(index)
+        # The catalog side was normalized once, when the product was added
+        queries.append(normalize_description(pdf_desc) if normalized else pdf_desc)
 
-    # 3. Parsing
-    for index, row in po_items.iterrows():
-        # Clean inputs
-        pdf_sku = str(row["sku"]).strip()
-        pdf_desc = str(row["description"]).strip()
+    # 4. Fuzzy search for the rest
+    if pending:
+        # Both sides have sorted tokens already, plain ratio == token_sort_ratio
+        scorer = fuzz.ratio if normalized else fuzz.token_sort_ratio
+        if settings.matcher_engine == "batched":
+            match = _match_batched
+        elif settings.matcher_engine == "blocked":
+            match = _match_blocked
+        else:
+            match = _match_rows
+        found = match([lines[i][0] for i in pending], queries, catalog, threshold, scorer, limit)
+        for index, result in zip(pending, found):
+            results[index] = result
 
-        # Check history for perfect matches
-        if pdf_sku in history_map:
-            results.append(
-                {
-                    "sku": pdf_sku,
-                    "warehouse_code": history_map[pdf_sku],
-                    "flag": "green",
-                    "score": 100,
-                }
-            )
-            # Found it, moving on
-            continue
+    # 5. Back to one result per item
+    if len(lines) < len(skus):
+        by_line = dict(zip(lines, results))
+        results = [dict(by_line[line]) for line in zip(skus, descriptions)]
+
+    # 6. Return
+    if isinstance(po_items, list):
+        return results
+    return pd.DataFrame(results)
+
+
+def _match_rows(skus, descriptions, catalog, threshold, scorer, limit) -> list[dict]:
+    """One fuzzy search per line"""
+    cutoff = _cutoff(threshold, limit)
+    results = []
 
-        match = process.extractOne(
-            pdf_desc, valid_descriptions, scorer=fuzz.token_sort_ratio
+    for pdf_sku, pdf_desc in zip(skus, descriptions):
+        # Best first, the first one on a tie (like extractOne)
+        matches = process.extract(
+            pdf_desc, catalog.descriptions, scorer=scorer, limit=max(limit, 1), score_cutoff=cutoff
         )
+        candidates = _candidates(catalog, [(desc, score) for desc, score, _ in matches], limit)
 
         # match returns: (best_string, score, index)
-        if match:
-            best_desc, score, _ = match
+        if matches:
+            best_desc, score, _ = matches[0]
 
             if score >= threshold:
                 results.append(
-                    {
-                        "sku": pdf_sku,
-                        "warehouse_code": product_map[best_desc],
-                        "flag": "yellow",
-                        "score": int(score),
-                    }
+                    _result(pdf_sku, catalog.products[best_desc][0], "yellow", int(score), candidates)
                 )
                 continue
 
         # We didn't get a match/it wasn't good enough
-        results.append(
-            {
-                "sku": pdf_sku,
-                "warehouse_code": None,
-                "flag": "red",
-                "score": 0,
-            }
+        results.append(_result(pdf_sku, None, "red", 0, candidates))
+
+    return results
+
+
+def _match_batched(skus, descriptions, catalog, threshold, scorer, limit) -> list[dict]:
+    """
+    Same results as _match_rows(), in bulk: the descriptions are scored against
+    the catalog in one matrix call.
+    """
+    valid_descriptions = catalog.descriptions
+    cutoff = _cutoff(threshold, limit)
+
+    # 1. Red until a description matches
+    results = [_result(pdf_sku, None, "red", 0) for pdf_sku in skus]
+    if not valid_descriptions:
+        return results
+
+    # 2. Score the lines in blocks that keep the matrix small
+    block = max(1, MAX_SCORE_CELLS // len(valid_descriptions))
+    for start in range(0, len(skus), block):
+        rows = range(start, min(start + block, len(skus)))
+        # Scores under the cutoff come back as 0, float64 like extractOne
+        scores = process.cdist(
+            descriptions[start : start + block],
+            valid_descriptions,
+            scorer=scorer,
+            score_cutoff=cutoff,
+            dtype=np.float64,
+            workers=-1,
         )
 
-    # 4. Return
-    return pd.DataFrame(results)
+        # 3. Best match per line (the first one on a tie, like extractOne)
+        best = scores.argmax(axis=1)
+        for row, (index, choice) in enumerate(zip(rows, best)):
+            score = scores[row, choice]
+            candidates = _candidates(
+                catalog,
+                [(valid_descriptions[c], scores[row, c]) for c in _top(scores[row], limit, cutoff)],
+                limit,
+            )
+            if score >= threshold:
+                best_desc = valid_descriptions[choice]
+                results[index] = _result(
+                    skus[index], catalog.products[best_desc][0], "yellow", int(score), candidates
+                )
+            else:
+                results[index]["candidates"] = candidates
+
+    return results
+
+
+def _match_blocked(skus, descriptions, catalog, threshold, scorer, limit) -> list[dict]:
+    """
+    Every line is only scored against the products that share its rare
+    tokens (see token_index.py), or the whole catalog if there are too few.
+    """
+    # Read together: a product added meanwhile must not shift the positions of the shortlist
+    valid_descriptions, tokens = match_index.search_state(catalog)
+    cutoff = _cutoff(threshold, limit)
+
+    results = []
+    for pdf_sku, pdf_desc in zip(skus, descriptions):
+        # Shortlist in catalog order, so a tie goes to the same product as a full scan
+        shortlist = tokens.shortlist(pdf_desc)
+        choices = (
+            valid_descriptions
+            if shortlist is None
+            else [valid_descriptions[i] for i in shortlist]
+        )
+        matches = process.extract(
+            pdf_desc, choices, scorer=scorer, limit=max(limit, 1), score_cutoff=cutoff
+        )
+        candidates = _candidates(catalog, [(desc, score) for desc, score, _ in matches], limit)
+
+        if matches and matches[0][1] >= threshold:
+            best_desc, score, _ = matches[0]
+            results.append(
+                _result(pdf_sku, catalog.products[best_desc][0], "yellow", int(score), candidates)
+            )
+        else:
+            results.append(_result(pdf_sku, None, "red", 0, candidates))
+
+    return results
+
+
+def _item_columns(po_items) -> tuple[list[str], list[str]]:
+    """The cleaned sku and description columns of the items"""
+    if isinstance(po_items, list):
+        skus = [str(row["sku"]).strip() for row in po_items]
+        descriptions = [str(row["description"]).strip() for row in po_items]
+        return skus, descriptions
+
+    skus = po_items["sku"].astype(str).str.strip().tolist()
+    descriptions = po_items["description"].astype(str).str.strip().tolist()
+    return skus, descriptions
+
+
+def _cutoff(threshold, limit) -> float:
+    """Lowest score a search has to keep: the threshold, or lower for the review candidates"""
+    return min(threshold, CANDIDATE_CUTOFF) if limit else threshold
+
+
+def _top(scores, limit, cutoff) -> np.ndarray:
+    """Positions of the 'limit' best scores, best first, the first one on a tie (like extract)"""
+    found = np.flatnonzero(scores >= cutoff)
+    if not limit:
+        return found[:0]
+    if len(found) > limit:
+        # Drop everything under the limit-th best score before sorting
+        kth = np.partition(scores[found], len(found) - limit)[len(found) - limit]
+        found = found[scores[found] >= kth]
+    return found[np.lexsort((found, -scores[found]))][:limit]
+
+
+def _candidates(catalog, matches, limit) -> list[dict]:
+    """Review candidates of (description, score) matches, best first, every product of a shared description"""
+    candidates = [
+        {"warehouse_code": code, "score": int(score)}
+        for description, score in matches
+        for code in catalog.products[description]
+    ]
+    return candidates[:limit]
+
+
+def _result(sku, warehouse_code, flag, score, candidates=None) -> dict:
+    return {
+        "sku": sku,
+        "warehouse_code": warehouse_code,
+        "flag": flag,
+        "score": score,
+        "candidates": candidates or [],
+    }
+
+
+def match_chunks(parser, size=500) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Matches the items of a PdfParser one chunk at a time (see PdfParser.iter_chunks),
+    the supplier is only known once the parser has opened the file.
+    Yields (items, match_results) pairs, see prepare_export_chunks() for the export.
+    """
+    for items in parser.iter_chunks(size):
+        yield items, fuzzy_match(po_items=items, supplier=parser.supplier)
 
 
 def green_check(df) -> bool:
-    """Checks if all the flags in the matcher result are green"""
-    issues = df["flag"].isin(["red", "yellow"]).any()
-    return not issues
+    """
+    Checks if all the flags in the matcher result are green.
+    Blue lines still go to review, pre-confirmed: a reviewed description is not a known SKU.
+    """
+    if isinstance(df, list):
+        return all(result["flag"] == "green" for result in df)
+    return bool((df["flag"] == "green").all())
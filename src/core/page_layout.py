@@ -0,0 +1,164 @@
+import re
+
+from pdfplumber.page import CroppedPage
+
+# extract_words() settings shared by the header finder and the stream strategy
+WORD_SETTINGS = {"x_tolerance": 3, "y_tolerance": 3}
+
+# Fewer characters than this on the first pages: no text layer
+MIN_CHARS = 40
+
+# A quantity, price or code-like number ("12", "4.50", "$1,200.00")
+NUMBER = re.compile(r"^\$?\d[\d,]*(\.\d+)?$")
+# A supplier part number: letters and digits together ("NP-999", "AS-00012", "AB123")
+SKU = re.compile(r"^(?=.*\d)(?=.*[A-Za-z])[A-Za-z0-9]+(?:[-_/.][A-Za-z0-9]+)*$")
+
+# -- Text layer check --
+# Pages looked at to tell a scanned (image-only) document apart
+TEXT_LAYER_PAGES = 3
+
+
+def text_layer_reason(pages) -> str | None:
+    """
+    Checks that the first pages have a text layer before any table search.
+    Returns why the document can't be parsed (scanned, no text), None if it can.
+    """
+    checked = pages[:TEXT_LAYER_PAGES]
+    chars = 0
+    images = 0
+    for page in checked:
+        chars += len(page.chars)
+        # Enough text already, a normal document stops on its first page
+        if chars >= MIN_CHARS:
+            return None
+        images += len(page.images)
+
+    if images:
+        return (
+            f"scanned document, {images} images and {chars} chars of text "
+            f"on the first {len(checked)} pages"
+        )
+    return f"no text layer, {chars} chars of text on the first {len(checked)} pages"
+
+
+class PageLayout:
+    """
+    Analyzes a page once and shares the result between the parser stages.
+    The chars, words and edges are computed on first use and dropped by release().
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.width = page.width
+        self.height = page.height
+
+        self._words = None
+
+    @property
+    def chars(self) -> list[dict]:
+        # pdfplumber caches the parsed objects on the page itself
+        return self.page.chars
+
+    @property
+    def words(self) -> list[dict]:
+        if self._words is None:
+            self._words = self.page.extract_words(**WORD_SETTINGS)
+        return self._words
+
+    @property
+    def edges(self) -> list[dict]:
+        return self.page.edges
+
+    def load(self):
+        """Parses the page content now, so later steps only read from the cache"""
+        self.page.objects
+        self.words
+
+    def crop(self, top):
+        """Returns the part of the page below 'top', reusing the cached words"""
+        return LayoutCrop(self, (0, top, self.width, self.height))
+
+    @staticmethod
+    def has_grid(page) -> bool:
+        """
+        A lattice table needs two vertical and two horizontal edges to form a cell.
+        Without them the "lines" strategy can't find anything, so it can be skipped.
+        """
+        vertical = 0
+        horizontal = 0
+        for edge in page.edges:
+            if edge["orientation"] == "v":
+                vertical += 1
+            else:
+                horizontal += 1
+
+            if vertical >= 2 and horizontal >= 2:
+                return True
+
+        return False
+
+    def profile(self, keywords) -> dict:
+        """Cheap statistics about the page, used to decide if it can hold line items"""
+        # Words by line of text
+        lines = {}
+        for w in self.words:
+            lines.setdefault(round(w["top"]), []).append(w["text"])
+
+        numeric_lines = 0
+        item_lines = 0
+        for words in lines.values():
+            numbers = sum(1 for word in words if NUMBER.match(word))
+            skus = sum(1 for word in words if SKU.match(word) and not NUMBER.match(word))
+            numeric_lines += numbers > 0
+            # A quantity next to a part number or a price: "1 NP-999 Widget $4.50"
+            item_lines += bool(skus) or numbers >= 2
+
+        return {
+            "chars": len(self.chars),
+            "numeric_lines": numeric_lines,
+            "item_lines": item_lines,
+            "has_header": any(w["text"].lower().strip() in keywords for w in self.words),
+        }
+
+    def skip_reason(self, keywords) -> str | None:
+        """
+        Decides if the page can contain line items.
+        Returns why it can't (terms, cover, signature page...), None if it can.
+        Only a page without a single item-like line is skipped: one item on a
+        continuation page is enough to keep it, whatever else is on the page.
+        """
+        stats = self.profile(keywords)
+
+        # A header row means a table starts here
+        if stats["has_header"]:
+            return None
+
+        # Continuation pages have no header, but their lines still look like items
+        if stats["item_lines"]:
+            return None
+
+        return (
+            f"no header and no item-like line ({stats['chars']} chars, "
+            f"{stats['numeric_lines']} lines with numbers)"
+        )
+
+    def release(self):
+        """Frees everything cached for this page"""
+        self._words = None
+        self.page.close()
+
+
+class LayoutCrop(CroppedPage):
+    """A cropped page that takes its words from the parent layout instead of re-extracting them"""
+
+    def __init__(self, layout, bbox):
+        super().__init__(layout.page, bbox)
+        self.source = layout
+
+    def extract_words(self, **kwargs) -> list[dict]:
+        if kwargs and kwargs != WORD_SETTINGS:
+            return super().extract_words(**kwargs)
+
+        # Keep the words that reach into the cropped area
+        top, bottom = self.bbox[1], self.bbox[3]
+        return [w for w in self.source.words if w["bottom"] > top and w["top"] < bottom]
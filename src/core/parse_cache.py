@@ -0,0 +1,201 @@
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+import pandas as pd
+from loguru import logger
+
+from src.core.cleaner import is_missing
+from src.core.pdf_parser import PARSER_VERSION, settings_fingerprint, supplier_fingerprint
+from src.core.settings import settings
+
+
+class ParseCache:
+    """
+    Remembers the parse result of every PDF, keyed by a hash of its content.
+    A file that comes back to Input (e.g. after review) skips the parser entirely.
+    An entry is only used while the parser settings and what the parser learned
+    about its supplier (templates, strategies, aliases) are the ones it was parsed with.
+    """
+
+    def __init__(self):
+        self.path = settings.parse_cache_path
+        self._initialize()
+
+    @staticmethod
+    def file_hash(file_path) -> str:
+        """SHA-256 of the file content, read in blocks"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, file_hash) -> tuple[str, pd.DataFrame | list[dict], int | None] | None:
+        """
+        Returns (supplier, items, pages) if this content was parsed by the current parser version,
+        with the current settings and the current state of its supplier.
+        """
+        if settings.parse_cache_size <= 0:
+            return None
+
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT supplier, data, pages, settings_key, supplier_key
+                FROM parse_cache
+                WHERE hash = ? AND version = ?
+            """,
+                (file_hash, PARSER_VERSION),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+
+            # The next parse replaces a stale entry
+            if row["settings_key"] != settings_fingerprint():
+                logger.info("Parse cache entry made with other settings, parsing again")
+                return None
+            if row["supplier_key"] != supplier_fingerprint(row["supplier"]):
+                logger.info(f"Parser learned more about {row['supplier']}, parsing again")
+                return None
+
+            # Keep recently used entries away from eviction
+            cursor.execute(
+                "UPDATE parse_cache SET last_used = ? WHERE hash = ?",
+                (time.time(), file_hash),
+            )
+            conn.commit()
+
+            return row["supplier"], self._unpack(row["data"]), row["pages"]
+        except Exception as e:
+            logger.error(f"Parse cache read failed: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def put(self, file_hash, supplier, items: pd.DataFrame | list[dict], pages=None):
+        """Stores a parse result and evicts the oldest entries if the cache is too big."""
+        if settings.parse_cache_size <= 0:
+            return
+
+        data = self._pack(items)
+        # The state after the parse: what it learned is part of the result
+        settings_key = settings_fingerprint()
+        supplier_key = supplier_fingerprint(supplier)
+        conn = self._get_connection()
+        try:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO parse_cache
+                    (hash, version, settings_key, supplier_key, supplier, data, pages, size,
+                     last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    file_hash,
+                    PARSER_VERSION,
+                    settings_key,
+                    supplier_key,
+                    supplier,
+                    data,
+                    pages,
+                    len(data),
+                    time.time(),
+                ),
+            )
+            conn.commit()
+            self._evict(conn)
+        except Exception as e:
+            logger.error(f"Parse cache write failed: {e}")
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        """Removes the least recently used entries until the cache fits its size limit"""
+        limit = settings.parse_cache_size * 1024 * 1024
+        cursor = conn.cursor()
+
+        # Results of older parser versions are never read again
+        cursor.execute("DELETE FROM parse_cache WHERE version != ?", (PARSER_VERSION,))
+
+        cursor.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache")
+        total = cursor.fetchone()[0]
+        if total > limit:
+            cursor.execute("SELECT hash, size FROM parse_cache ORDER BY last_used")
+            victims = []
+            for row in cursor.fetchall():
+                if total <= limit:
+                    break
+                victims.append((row["hash"],))
+                total -= row["size"]
+
+            cursor.executemany("DELETE FROM parse_cache WHERE hash = ?", victims)
+            logger.info(f"Parse cache: evicted {len(victims)} entries")
+
+        conn.commit()
+
+    @staticmethod
+    def _pack(items: pd.DataFrame | list[dict]) -> bytes:
+        """Compressed JSON of the cleaned table"""
+        if isinstance(items, list):
+            # Missing cells (NaN/NA) become null
+            columns = list(items[0].keys()) if items else []
+            data = [[None if is_missing(v) else v for v in item.values()] for item in items]
+            payload = {"columns": columns, "data": data}
+            return zlib.compress(json.dumps(payload).encode("utf-8"))
+
+        # Missing cells (NaN/NA) become null
+        values = items.astype(object).where(items.notna(), None)
+        payload = {"columns": list(values.columns), "data": values.values.tolist()}
+        return zlib.compress(json.dumps(payload).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(data: bytes) -> pd.DataFrame | list[dict]:
+        payload = json.loads(zlib.decompress(data).decode("utf-8"))
+        if 0 < len(payload["data"]) <= settings.small_po_rows:
+            # Small PO: records, like the parser returns them
+            return [
+                {name: pd.NA if v is None else v for name, v in zip(payload["columns"], row)}
+                for row in payload["data"]
+            ]
+
+        items = pd.DataFrame(payload["data"], columns=payload["columns"], dtype=object)
+        # Back to the NA the parser leaves in empty cells
+        return items.where(items.notna(), pd.NA)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _initialize(self):
+        conn = self._get_connection()
+        # A cache from before the supplier keys or page counts: dropped, it's only a cache
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(parse_cache)")]
+        if columns and not {"supplier_key", "pages"} <= set(columns):
+            conn.execute("DROP TABLE parse_cache")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                hash TEXT PRIMARY KEY,
+                version INTEGER,
+                settings_key TEXT,
+                supplier_key TEXT,
+                supplier TEXT,
+                data BLOB,
+                pages INTEGER,
+                size INTEGER,
+                last_used REAL
+            );
+        """
+        )
+        conn.commit()
+        conn.close()
+
+
+parse_cache = ParseCache()
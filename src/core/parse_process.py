@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import multiprocessing
+import sys
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from src.core.pdf_parser import NoTextLayer
+from src.core.settings import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ParseBudgetExceeded(Exception):
+    """The parse ran out of time or memory and its process was killed"""
+
+
+def _serve(conn, memory_limit):
+    """
+    Entry point of the parse process.
+    Parses the files it receives one by one until it gets None.
+    """
+    from src.core.pdf_parser import PdfParser
+
+    # This process can't start a pool of its own, extract the pages serially
+    settings.parser_workers = 1
+
+    # Everything is imported, whatever is allocated from now on is the parse
+    if memory_limit:
+        _limit_memory(memory_limit)
+
+    # Collect the logs of a parse and hand them to the main process with the result
+    records = []
+    logger.remove()
+    logger.add(
+        lambda message: records.append(
+            (
+                message.record["level"].name,
+                message.record["message"],
+                message.record["extra"].get("visual", True),
+            )
+        ),
+        format="{message}",
+        level="DEBUG",
+    )
+
+    while True:
+        try:
+            file_path = conn.recv()
+        except EOFError:
+            # The main process is gone
+            break
+        if file_path is None:
+            break
+
+        records.clear()
+        try:
+            with PdfParser(file_path) as parser:
+                supplier, items = parser.run()
+            conn.send(("ok", supplier, items, parser.num_pages, list(records)))
+        except NoTextLayer as e:
+            conn.send(("no_text", str(e), None, None, list(records)))
+        except MemoryError:
+            conn.send(("memory", None, None, None, list(records)))
+        except Exception as e:
+            conn.send(("error", str(e), None, None, list(records)))
+
+
+def _limit_memory(limit_mb):
+    """Caps the address space of this process at its current size plus the budget"""
+    try:
+        import resource
+    except ImportError:
+        # Windows: no rlimit, only the timeout applies
+        return
+
+    current = 0
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        pass
+
+    limit = current + limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+class ParseProcess:
+    """
+    Runs PdfParser in a separate, reusable process.
+    A parse that takes longer than the timeout, or needs more memory than the
+    limit, gets its process killed instead of blocking the Worker.
+    The next parse starts a fresh process.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.conn = None
+        # Memory limit the running process was started with
+        self.memory_limit = None
+
+    def parse(
+        self, file_path
+    ) -> tuple[str | None, pd.DataFrame | list[dict] | None, int | None]:
+        """
+        Returns (supplier, items) like PdfParser.run(), and the page count of the document.
+        Raises ParseBudgetExceeded if the file went over its time or memory budget.
+        """
+        # The memory limit is set at start, a new limit needs a new process
+        if (
+            self.process is None
+            or not self.process.is_alive()
+            or self.memory_limit != settings.parse_memory_limit
+        ):
+            self._start()
+
+        self.conn.send(str(file_path))
+
+        # 1. Wait for the result, up to the timeout
+        timeout = settings.parse_timeout
+        try:
+            ready = self.conn.poll(timeout)
+            result = self.conn.recv() if ready else None
+        except (EOFError, OSError):
+            # The process died mid parse (e.g. killed by the OS for its memory)
+            self._stop()
+            raise ParseBudgetExceeded("the parse process died, likely out of memory")
+
+        if result is None:
+            self._stop()
+            raise ParseBudgetExceeded(f"no result after {timeout} seconds")
+
+        # 2. Replay the logs of the parse here, so they reach the file log and the GUI
+        status, supplier, items, pages, records = result
+        for level, message, visual in records:
+            logger.bind(visual=visual).log(level, message)
+
+        if status == "memory":
+            self._stop()
+            raise ParseBudgetExceeded(
+                f"over the memory limit of {settings.parse_memory_limit} MB"
+            )
+        if status == "no_text":
+            raise NoTextLayer(supplier)
+        if status == "error":
+            raise RuntimeError(supplier)
+
+        return supplier, items, pages
+
+    def close(self):
+        """Asks the process to finish, kills it if it doesn't"""
+        if self.process is None:
+            return
+
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        self._stop()
+
+    def _start(self):
+        self._stop()
+
+        # Spawn: a clean interpreter, no copy of the GUI or the Worker threads
+        context = multiprocessing.get_context("spawn")
+        self.memory_limit = settings.parse_memory_limit
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_serve,
+            args=(child_conn, self.memory_limit),
+            name="ParseProcess",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+        if sys.platform == "win32" and settings.parse_memory_limit:
+            logger.bind(visual=False).warning(
+                "Parse memory limit isn't enforced on Windows, only the timeout applies"
+            )
+
+    def _stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+        if self.conn is not None:
+            self.conn.close()
+
+        self.process = None
+        self.conn = None
@@ -1,11 +1,244 @@
+from __future__ import annotations
+
+import gc
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import pickle
 import re
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
 import pdfplumber
 from loguru import logger
 
+from src.core.cleaner import (
+    COLUMN_ALIASES,
+    clean_columns,
+    clean_frame,
+    to_frame,
+    to_records,
+)
+from src.core.column_detector import (
+    cluster_rows,
+    clustered_frame,
+    clustered_items,
+    detect_columns,
+)
+from src.core.database import database as db
 from src.core.settings import settings
 from src.core.logger import task_scope
+from src.core.layout_template import (
+    TEMPLATE_COLUMNS,
+    learn_template,
+    template_frame,
+    template_items,
+    template_rows,
+)
+from src.core.line_template import (
+    MIN_LINE_COVERAGE,
+    compile_template,
+    match_lines,
+    text_lines,
+)
+from src.core.page_layout import WORD_SETTINGS, PageLayout, text_layer_reason
+from src.core.timing import emit, span
+from src.lib.memory import current_rss_mb
+
+# pandas is only imported by the tables that need it, see cleaner.py
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Bump when a change alters the parser output, cached results of older versions are dropped
+PARSER_VERSION = 7
+
+# Table finder settings for ruled layouts (cells separated by lines)
+LATTICE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 3,
+}
+
+# Table finder settings for whitespace layouts (columns aligned by text)
+STREAM_SETTINGS = {
+    "vertical_strategy": "text",
+    "horizontal_strategy": "text",
+    "intersection_tolerance": 5,
+    "snap_tolerance": 3,
+}
+
+# Key + colon (optional) + text until end of line, e.g. "Supplier: Acme Supplies"
+SUPPLIER_PATTERN = re.compile(
+    r"\b(?:Vendor|Supplier|Provider|From|Sold By|Remit To|Seller)\b"
+    r"\s*(?P<colon>:)?\s*(?P<name>.+)",
+    re.IGNORECASE,
+)
+
+# Words that mark the header row of the items table
+HEADER_KEYWORDS = [
+    "sku",
+    "qty",
+    "quantity",
+    "description",
+    "desc",
+    "unit price",
+    "price",
+    "unit",
+    "total",
+    "amount",
+    "item",
+    "ref",
+    "part number",
+]
+
+# Default order in which the strategies are tried
+TABLE_STRATEGIES = {
+    "lattice": LATTICE_SETTINGS,
+    "stream": STREAM_SETTINGS,
+}
+
+
+def _extract_page_range(file_path, start, stop, strategies, template, columns) -> tuple:
+    """
+    Process pool entry point.
+    Opens its own copy of the document and extracts the pages [start, stop).
+    """
+    # The pool process has no log sinks, its logs go back with the tables
+    records = []
+    sink = logger.add(
+        lambda message: records.append(
+            (
+                message.record["level"].name,
+                message.record["message"],
+                message.record["extra"].get("visual", True),
+            )
+        ),
+        format="{message}",
+        level="DEBUG",
+    )
+    try:
+        with PdfParser(file_path) as parser:
+            parser.strategies = strategies
+            parser.template = template
+            parser.columns = columns
+            parser._pdf_opener(file_path)
+            if parser.pdf is None:
+                raise RuntimeError(f"Couldn't open {file_path} in the extraction process")
+
+            results = [parser._extract_page(page) for page in parser.pages[start:stop]]
+            # The per-page stage timings go back with the tables
+            timings = parser.page_timings
+    finally:
+        logger.remove(sink)
+
+    return results, timings, records
+
+
+def _init_extraction_process():
+    # Only the sink of _extract_page_range, nothing on the console of the child
+    logger.remove()
+
+
+# Spawned on the first long document and reused by the next ones
+_pool = None
+_pool_workers = 0
+
+
+def _extraction_pool(workers):
+    """The page extraction pool, started again only when the worker count changes"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        close_extraction_pool()
+        # Spawn: the app runs threads, a forked child could inherit one of their locks held
+        context = multiprocessing.get_context("spawn")
+        _pool = context.Pool(workers, initializer=_init_extraction_process)
+        _pool_workers = workers
+    return _pool
+
+
+def close_extraction_pool():
+    """Kills the page extraction processes, a stuck one included"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+    _pool = None
+    _pool_workers = 0
+
+
+def preferred_strategy(supplier) -> tuple[str, dict] | None:
+    """The table strategy (name, settings) that won most often for this supplier"""
+    if supplier == "Unknown":
+        return None
+
+    stats = db.get_table_strategies(supplier)
+    # Only trust a strategy that wins more pages than it loses
+    winners = [
+        (name, stat)
+        for name, stat in stats.items()
+        if name in TABLE_STRATEGIES and stat["wins"] > stat["losses"]
+    ]
+    if not winners:
+        return None
+
+    best, stat = max(winners, key=lambda item: item[1]["wins"])
+    return best, stat["settings"]
+
+
+def settings_fingerprint() -> str:
+    """Hash of the settings and supplier aliases a parse depends on"""
+    return _fingerprint(
+        {
+            "engine": settings.extraction_engine,
+            "skip_pages": settings.skip_non_tabular_pages,
+            # A new alias can give a file another supplier
+            "supplier_aliases": db.get_supplier_aliases(),
+        }
+    )
+
+
+def supplier_fingerprint(supplier) -> str:
+    """
+    Hash of what the parser learned about the supplier, as far as it changes a parse:
+    the layout template, the line templates in the order they are tried, the first strategy.
+    Hit counters are left out, they change on every parse.
+    """
+    if supplier == "Unknown":
+        return _fingerprint(None)
+
+    return _fingerprint(
+        {
+            "layout": db.get_layout_template(supplier),
+            "lines": [
+                [t["name"], t["pattern"], t["continuation"]]
+                for t in db.get_line_templates(supplier)
+            ],
+            "strategy": preferred_strategy(supplier),
+        }
+    )
+
+
+def _fingerprint(state) -> str:
+    data = json.dumps(state, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+def page_count(file_path) -> int:
+    """Pages of the document without parsing them, 0 if it can't be opened"""
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        logger.error(f"Couldn't count the pages of {file_path}: {e}")
+        return 0
+
+
+class NoTextLayer(Exception):
+    """The document is scanned (image-only), there is no text to extract"""
 
 
 class PdfParser:
@@ -14,32 +247,220 @@ class PdfParser:
 
         self.pdf = None
         self.pages = None
+        # Pages of the document, kept after close()
+        self.num_pages = None
         self.page_width = None
         self.page_height = None
 
         self.supplier = "Unknown"
+        # DataFrame, or a list of dicts (records) for small POs
         self.po_table = None
 
-    def run(self) -> tuple[str | None, pd.DataFrame | None]:
+        # (name, table settings) pairs, in the order they are tried
+        self.strategies = list(TABLE_STRATEGIES.items())
+        # Column layout learned for the supplier (see layout_template.py)
+        self.template = None
+        # Columns of the clustering engine (see column_detector.py), None = table finder
+        self.columns = None
+        # Name of the regex line template that parsed the document (see line_template.py)
+        self.line_template = None
+
+        # Resident memory of the process when the file was opened
+        self._rss_at_open = None
+
+        # Time spent per page-level stage: {stage: [seconds, pages]}
+        self.page_timings = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Closes the document and drops every page with its cached objects.
+        Reports the resident memory the parse added, measured before the pages are dropped.
+        """
+        if self.pdf is None:
+            return
+
+        rss = current_rss_mb()
+        if rss is not None and self._rss_at_open is not None:
+            logger.bind(visual=False).info(
+                f"{Path(self.file_path).name}: resident memory {rss:.1f} MB "
+                f"({rss - self._rss_at_open:+.1f} MB while parsing)"
+            )
+
+        try:
+            self.pdf.close()
+        except Exception as e:
+            logger.error(f"Couldn't close file {self.file_path}, error: {e}")
+        finally:
+            self.pdf = None
+            self.pages = None
+
+    def run(self) -> tuple[str | None, pd.DataFrame | list[dict] | None]:
+        """
+        Parses the document: (supplier, items with the columns qty, sku, description).
+        Small POs (settings.small_po_rows) come out as a list of dicts, others as a DataFrame.
+        """
         # Open the file
-        self._pdf_opener(str(self.file_path))
+        with self._span("open") as fields:
+            self._pdf_opener(str(self.file_path))
+            fields["pages"] = self.num_pages
         if self.pdf is None:
             return None, None
-        # Search for supplier
-        self._obtain_supplier()
+        # Search for supplier: a known alias in the file name needs no page,
+        # the header of the first page is read (and cached) before the text layer check
+        with self._span("supplier"):
+            self._obtain_supplier()
+        # Scanned documents stop here, before the table search
+        self._check_text_layer()
         # Get the table
-        self._extract_table()
+        with self._span("extract") as fields:
+            self._extract_table()
+            fields["rows"] = self._row_count()
+        self._emit_page_timings()
         if self.po_table is None:
             logger.error("Could not detect table")
             return self.supplier, None
 
-        # If the table isn't empty, clean the data
-        self._clean_table()
+        # A template already produces clean columns
+        if self.template is None and self.line_template is None:
+            # If the table isn't empty, clean the data
+            # (the clustering engine builds the clean frame itself)
+            if self.columns is None:
+                with self._span("clean") as fields:
+                    self._clean_table()
+                    fields["rows"] = self._row_count()
+            with self._span("learn"):
+                self._learn_template()
 
         # Return the supplier and table as a tuple
         return self.supplier, self.po_table
 
+    def iter_chunks(self, size=500) -> Iterator[pd.DataFrame]:
+        """
+        Streaming version of run().
+        Extracts and cleans the document page by page and yields the items in
+        frames of at most 'size' rows, so memory doesn't grow with the page count.
+        A supplier's line template is tried first, like run() does: its items are
+        only yielded once it read the whole document.
+        """
+        import pandas as pd
+
+        self._pdf_opener(str(self.file_path))
+        if self.pdf is None:
+            return
+
+        try:
+            self._obtain_supplier()
+            self._check_text_layer()
+
+            if self._extract_lines():
+                items = self.po_table
+                if isinstance(items, list):
+                    items = pd.DataFrame(items, columns=TEMPLATE_COLUMNS)
+                for start in range(0, len(items), size):
+                    yield items.iloc[start : start + size].reset_index(drop=True)
+                return
+
+            self.template = self._load_template()
+            self.strategies = self._strategy_order()
+            self.columns = self._cluster_columns()
+
+            header = None
+            winners = []
+            template_failed = False
+            pending = []
+
+            for page in self.pages:
+                # The layout of the page is released inside _extract_page
+                rows, winner = self._extract_page(page)
+
+                if winner == "skipped":
+                    continue
+
+                if self.template is not None:
+                    frame = template_frame(rows, self.template)
+                    if not frame.empty and (frame["sku"] != "").all():
+                        pending.extend(frame.to_dict("records"))
+                    else:
+                        # The template doesn't fit this page, use the table finder on it
+                        template_failed = True
+                        rows, winner = self._extract_generic(page)
+
+                if winner == "clustering":
+                    pending.extend(clustered_frame(rows).to_dict("records"))
+                elif winner != "template":
+                    winners.append(winner)
+                    header, frame = self._page_frame(rows, header)
+                    if frame is not None:
+                        pending.extend(self._clean_frame(frame).to_dict("records"))
+
+                # The page objects of pdfplumber are full of reference cycles,
+                # left to the collector they pile up with the page count
+                gc.collect()
+
+                while len(pending) >= size:
+                    yield pd.DataFrame(pending[:size])
+                    pending = pending[size:]
+
+            if pending:
+                yield pd.DataFrame(pending)
+
+            self._record_strategies(winners)
+            self._emit_page_timings()
+            if self.template is not None:
+                if template_failed:
+                    logger.warning(
+                        f"Layout template for {self.supplier} no longer fits, relearning"
+                    )
+                    db.delete_layout_template(self.supplier)
+                else:
+                    db.record_template_hit(self.supplier)
+        finally:
+            self.close()
+
+    def iter_rows(self) -> Iterator[dict]:
+        """Yields the cleaned line items one by one ({qty, sku, description, ...})"""
+        for chunk in self.iter_chunks():
+            yield from chunk.to_dict("records")
+
+    def _extract_generic(self, page) -> tuple[list, str | None]:
+        """Extracts a page with the table strategies, ignoring the template"""
+        template = self.template
+        self.template = None
+        try:
+            return self._extract_page(page)
+        finally:
+            self.template = template
+
+    def _page_frame(self, rows, header) -> tuple[list | None, pd.DataFrame | None]:
+        """
+        Builds the raw frame of one page for the streaming path.
+        A page that starts with its own header row uses it,
+        otherwise the rows continue under the previous header.
+        """
+        if not rows:
+            return header, None
+
+        first = [str(cell or "").lower().strip() for cell in rows[0]]
+        if header is None or any(cell in HEADER_KEYWORDS for cell in first):
+            header, rows = rows[0], rows[1:]
+
+        if not rows:
+            return header, None
+
+        import pandas as pd
+
+        # Like run(): ragged rows are padded, not dropped
+        columns, rows = self._pad_rows(header, rows)
+        return header, pd.DataFrame(rows, columns=columns)
+
     def _pdf_opener(self, file_path):
+        self._rss_at_open = current_rss_mb()
         try:
             self.pdf = pdfplumber.open(file_path)
         except Exception as e:
@@ -47,233 +468,606 @@ class PdfParser:
             return
 
         self.pages = self.pdf.pages
+        self.num_pages = len(self.pages)
         self.page_height = self.pages[0].height
         self.page_width = self.pages[0].width
 
+    def _check_text_layer(self):
+        """Raises NoTextLayer if the first pages have no text to extract"""
+        start = time.perf_counter()
+        with self._span("text_layer"):
+            reason = text_layer_reason(self.pages)
+        if reason is None:
+            return
+
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.warning(
+            f"{Path(self.file_path).name}: {reason} (detected in {elapsed:.1f} ms)"
+        )
+        raise NoTextLayer(reason)
+
     def _obtain_supplier(self):
         """Looks for supplier, vendor etc at the top of the first page"""
         logger.info("Obtaining supplier")
-        # look into the top 20% of the page (header)
-        page = self.pages[0].crop((0, 0, self.page_width, self.page_height * 0.2))
 
-        supplier_keys = [
-            "Vendor",
-            "Supplier",
-            "Provider",
-            "From",
-            "Sold By",
-            "Remit To",
-            "Seller",
-        ]
-        text = page.extract_text()
+        # A known alias in the file name saves reading the page
+        supplier = self._supplier_from_alias()
+        if supplier is not None:
+            self.supplier = supplier
+            return
 
-        for key in supplier_keys:
-            # Look for Key + colon (optional) + text until end of line
-            # (?:...) is a non-capturing group for the colon
-            # \s* handles spaces
-            # (.+) captures the name
-            pattern = rf"{re.escape(key)}\s*[:]?\s*(.+)"
+        # look into the top 20% of the page (header), a scan has no text there
+        page = self.pages[0].crop((0, 0, self.page_width, self.page_height * 0.2))
+        text = page.extract_text() or ""
 
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                self.supplier = match.group(1).strip()
+        fallback = None
+        for match in SUPPLIER_PATTERN.finditer(text):
+            name = match.group("name").strip()
+            # "Supplier: Acme" is a confident hit, stop reading
+            if match.group("colon"):
+                fallback = name
+                break
+            # "From Acme" only counts if nothing better shows up
+            if fallback is None:
+                fallback = name
+
+        # Not saved as an alias: a name read off the page is only trusted once its PO is reviewed
+        if fallback is not None:
+            self.supplier = fallback
 
         # If it isn't found, remains Unknown pending human intervention
 
+    def _supplier_from_alias(self) -> str | None:
+        """
+        Checks the file name against the known supplier aliases.
+        An alias has to be whole words of the name: "PO_Acme_Supplies_12" is Acme Supplies,
+        "PO_AcmeSuppliesEU_12" isn't.
+        """
+        words = re.findall(r"[a-z0-9]+", Path(self.file_path).stem.lower())
+        # Every run of consecutive words, glued the way aliases are cleaned
+        names = {"".join(words[i:j]) for i in range(len(words)) for j in range(i + 1, len(words) + 1)}
+
+        for alias, supplier in db.get_supplier_aliases().items():
+            if alias in names:
+                logger.info(f"Supplier {supplier} recognized from the file name")
+                return supplier
+
+        return None
+
     def _extract_table(self):
         """
         Universal Extractor:
         1. Tries to find a specific Grid.
         2. If no grid, assumes whitespace structure.
+        Long documents are split into page ranges and extracted in parallel.
         """
         logger.info("Extracting items")
-        full_table = []
+
+        # A regex line template of the supplier skips the table search entirely
+        with self._span("line_template") as fields:
+            found = self._extract_lines()
+            fields["rows"] = self._row_count()
+        if found:
+            return
+
+        page_count = len(self.pages)
+        workers = self._resolve_workers(page_count)
+
+        # Try what worked for this supplier before
+        self.template = self._load_template()
+        self.strategies = self._strategy_order()
+        self.columns = self._cluster_columns()
+
+        if workers > 1:
+            page_results = self._extract_parallel(page_count, workers)
+        else:
+            page_results = [self._extract_page(page) for page in self.pages]
+
+        full_table = self._join_pages(page_results)
+
+        if self.template is not None:
+            items = template_items(full_table, self.template)
+
+            # Every line needs a SKU, otherwise the layout changed
+            if items and all(sku != "" for _, sku, _ in items):
+                self.po_table = self._items_table(TEMPLATE_COLUMNS, items)
+                db.record_template_hit(self.supplier)
+                return
+
+            logger.warning(
+                f"Layout template for {self.supplier} no longer fits, relearning"
+            )
+            db.delete_layout_template(self.supplier)
+            self.template = None
+            self.columns = self._cluster_columns()
+            page_results = [self._extract_page(page) for page in self.pages]
+            full_table = self._join_pages(page_results)
+
+        if self.columns is not None:
+            items = clustered_items(full_table)
+
+            # Same check as the template: every line needs a SKU
+            if items and all(sku != "" for _, sku, _ in items):
+                self.po_table = self._items_table(TEMPLATE_COLUMNS, items)
+                return
+
+            logger.warning("Column clustering found no clean items, using the table finder")
+            self.columns = None
+            page_results = [self._extract_page(page) for page in self.pages]
+            full_table = self._join_pages(page_results)
+
+        self._record_strategies([winner for _, winner in page_results])
+
+        if full_table:
+            header, rows = full_table[0], full_table[1:]
+            # The header repeated on the next pages is no item
+            names = [str(cell or "").lower().strip() for cell in header]
+            rows = [
+                row for row in rows if [str(cell or "").lower().strip() for cell in row] != names
+            ]
+            # The cleaner works on lists, no need for a frame in between
+            header, rows = self._pad_rows(header, rows)
+            self.po_table = [header, *rows]
+
+        # print("Uncleaned DataFrame")
+        # print(self.po_table)
+
+    def _extract_lines(self) -> bool:
+        """
+        Tries the supplier's regex line templates on the text of every page.
+        Returns True if one of them covered enough lines to be trusted.
+        """
+        templates = []
+        for template in db.get_line_templates(self.supplier):
+            try:
+                templates.append((template["name"], *compile_template(template)))
+            except ValueError as e:
+                logger.error(f"Line template '{template['name']}' skipped: {e}")
+        if not templates:
+            return False
+
+        start = time.perf_counter()
+        # name: [items, covered lines, block lines]
+        results = {name: [[], 0, 0] for name, _, _ in templates}
+
         for page in self.pages:
+            layout = PageLayout(page)
+            lines = text_lines(layout.words)
+            layout.release()
+
+            for name, pattern, continuation in list(templates):
+                items, covered, block = match_lines(lines, pattern, continuation)
+                result = results[name]
+                result[0].extend(items)
+                result[1] += covered
+                result[2] += block
+
+                # Too many lines it can't read: give up on it now, not after the last page
+                if result[2] and result[1] / result[2] < MIN_LINE_COVERAGE:
+                    templates.remove((name, pattern, continuation))
+                    self._record_line_template(name, False, start, result)
+
+            if not templates:
+                return False
+
+        # Most used template first: the first one that read items wins
+        for name, _, _ in templates:
+            items = results[name][0]
+            hit = bool(items) and all(sku != "" for _, sku, _ in items)
+            self._record_line_template(name, hit, start, results[name])
+            if hit:
+                self.line_template = name
+                self.po_table = self._items_table(TEMPLATE_COLUMNS, items)
+                return True
+
+        return False
+
+    def _record_line_template(self, name, hit, start, result):
+        seconds = time.perf_counter() - start
+        items, covered, block = result
+        coverage = covered / block if block else 0.0
+        db.record_line_template(self.supplier, name, hit, seconds)
+
+        if hit:
+            logger.info(
+                f"Line template '{name}' read {len(items)} items "
+                f"({coverage:.0%} of the lines covered)"
+            )
+        else:
+            logger.info(
+                f"Line template '{name}' doesn't fit ({coverage:.0%} of the lines covered)"
+            )
+
+    def _extract_page(self, page) -> tuple[list, str | None]:
+        """
+        Extracts the raw table rows of a single page.
+        Returns the rows and the name of the strategy that found them (None if all failed).
+        """
+        # Analyze the page once, every step below reads from the same layout
+        layout = PageLayout(page)
+        try:
+            start = time.perf_counter()
+            layout.load()
+            self._add_page_time("load", start)
+
+            # Terms & conditions, cover or signature pages: don't look for a table
+            if settings.skip_non_tabular_pages:
+                keywords = HEADER_KEYWORDS
+                if self.template is not None:
+                    keywords = self.template["keywords"]
+
+                start = time.perf_counter()
+                reason = layout.skip_reason(keywords)
+                self._add_page_time("classify", start)
+                if reason is not None:
+                    logger.bind(visual=False).info(
+                        f"{Path(self.file_path).name}: skipped page {page.page_number}, {reason}"
+                    )
+                    return [], "skipped"
+
+            # Clustering engine: columns from the word coordinates, no table finder
+            if self.columns is not None:
+                start = time.perf_counter()
+                rows = self._cluster_page(layout)
+                self._add_page_time("clustering", start)
+                return rows, "clustering"
+
             # Remove the header
-            page = self._crop_to_header(page)
-
-            # ATTEMPT 1: LATTICE (Best for Grids/Lines)
-            # This looks for physical lines separating cells.
-            table = page.extract_table(
-                {
-                    "vertical_strategy": "lines",
-                    "horizontal_strategy": "lines",
-                    "snap_tolerance": 3,
-                }
+            start = time.perf_counter()
+            page = self._crop_to_header(layout)
+            self._add_page_time("crop", start)
+
+            # Known layout: cut the words along the learned columns
+            if self.template is not None:
+                start = time.perf_counter()
+                if page is layout.page:
+                    words = layout.words
+                else:
+                    words = page.extract_words(**WORD_SETTINGS)
+                rows = template_rows(words, self.template)
+                self._add_page_time("template", start)
+                return rows, "template"
+
+            # LATTICE (Best for Grids/Lines) looks for physical lines separating cells.
+            # STREAM (Best for Whitespace/No Lines) scans for text alignment.
+            table = None
+            for name, table_settings in self.strategies:
+                if name == "lattice" and not layout.has_grid(page):
+                    continue
+
+                start = time.perf_counter()
+                table = page.extract_table(table_settings)
+                self._add_page_time(name, start)
+
+                # Validation: Did we get a real table? (At least Header + 1 Row)
+                if table and len(table) >= 2:
+                    return table, name
+
+            # Nothing convincing, keep whatever the last attempt found
+            return table or [], None
+        finally:
+            # Done with this page, free its cached objects
+            layout.release()
+
+    def _resolve_workers(self, page_count) -> int:
+        """Decides how many processes the extraction should use"""
+        if page_count < settings.parallel_page_threshold:
+            return 1
+
+        workers = settings.parser_workers
+        if workers == 0:
+            # Auto: leave one core for the GUI and the other threads
+            workers = (os.cpu_count() or 1) - 1
+
+        # Don't spawn processes that would have nothing to do
+        return max(1, min(workers, page_count))
+
+    def _load_template(self) -> dict | None:
+        """Gets the layout template learned for this supplier"""
+        # The clustering engine cuts its own columns, a template would replace it
+        if self.supplier == "Unknown" or settings.extraction_engine == "clustering":
+            return None
+
+        template = db.get_layout_template(self.supplier)
+        if template is not None:
+            logger.info(f"Using the layout template for {self.supplier}")
+        return template
+
+    def _learn_template(self):
+        """Learns the column layout from the first page after a good parse"""
+        if self.supplier == "Unknown" or self.po_table is None:
+            return
+        if not all(col in self._item_columns() for col in TEMPLATE_COLUMNS):
+            return
+        if len(self.po_table) == 0 or db.get_layout_template(self.supplier) is not None:
+            return
+
+        layout = PageLayout(self.pages[0])
+        try:
+            header = self._find_header(layout, HEADER_KEYWORDS)
+            if header is None:
+                return
+
+            template = learn_template(
+                layout.words, header, layout.width, COLUMN_ALIASES
             )
+            if template is None:
+                return
 
-            # Validation: Did we get a real table? (At least Header + 1 Row)
-            if not table or not len(table) >= 2:
-                # ATTEMPT 2: STREAM (Best for Whitespace/No Lines)
-                # If the above failed (no lines found), we scan for text alignment.
-                table = page.extract_table(
-                    {
-                        "vertical_strategy": "text",
-                        "horizontal_strategy": "text",
-                        "intersection_tolerance": 5,
-                        "snap_tolerance": 3,
-                    }
+            # Check the template against what the generic path found on page 1,
+            # with clustering off so the page really goes through the template
+            columns, self.columns = self.columns, None
+            self.template = template
+            try:
+                rows, _ = self._extract_page(self.pages[0])
+            finally:
+                self.template = None
+                self.columns = columns
+            first_page = template_frame(rows, template)
+
+            expected = self._skus()[: len(first_page)]
+            if first_page.empty or first_page["sku"].tolist() != expected:
+                logger.info(f"No stable column layout found for {self.supplier}")
+                return
+
+            db.save_layout_template(self.supplier, template)
+        finally:
+            layout.release()
+
+    def _strategy_order(self) -> list[tuple[str, dict]]:
+        """Puts the strategy that won most often for this supplier first"""
+        default = list(TABLE_STRATEGIES.items())
+        preferred = preferred_strategy(self.supplier)
+        if preferred is None:
+            return default
+
+        best, table_settings = preferred
+        logger.info(f"Trying the {best} strategy first for {self.supplier}")
+
+        # The winner with its recorded tolerances, then the others as fallback
+        order = [(best, table_settings)]
+        order += [(name, s) for name, s in default if name != best]
+        return order
+
+    def _record_strategies(self, winners):
+        """Saves how each strategy did on this document's pages"""
+        if self.supplier == "Unknown":
+            return
+
+        names = [name for name, _ in self.strategies]
+        # Skipped pages never reached the table finder
+        winners = [w for w in winners if w is None or w in names]
+        for position, (name, table_settings) in enumerate(self.strategies):
+            wins = winners.count(name)
+            # A page counts as a loss for every strategy tried before its winner
+            losses = sum(
+                1 for w in winners if w is None or names.index(w) > position
+            )
+            if wins or losses:
+                db.record_table_strategy(
+                    self.supplier, name, table_settings, wins, losses
+                )
+
+    def _extract_parallel(self, page_count, workers) -> list[tuple]:
+        """Spreads page ranges over a process pool, keeps the page order"""
+        # Several ranges per process so one slow range doesn't stall the pool
+        chunk = math.ceil(page_count / (workers * 4))
+        ranges = [
+            (start, min(start + chunk, page_count))
+            for start in range(0, page_count, chunk)
+        ]
+        logger.info(
+            f"Splitting {page_count} pages into {len(ranges)} ranges on {workers} processes"
+        )
+
+        file_path = str(self.file_path)
+        page_results = []
+        try:
+            pool = _extraction_pool(workers)
+            tasks = [
+                pool.apply_async(
+                    _extract_page_range,
+                    (
+                        file_path,
+                        start,
+                        stop,
+                        self.strategies,
+                        self.template,
+                        self.columns,
+                    ),
+                )
+                for start, stop in ranges
+            ]
+            # In submission order, all of them within the parse timeout
+            deadline = time.monotonic() + settings.parse_timeout
+            for task in tasks:
+                tables, timings, records = task.get(
+                    timeout=max(0, deadline - time.monotonic())
+                )
+                page_results.extend(tables)
+                for stage, (seconds, pages) in timings.items():
+                    total = self.page_timings.setdefault(stage, [0.0, 0])
+                    total[0] += seconds
+                    total[1] += pages
+                # Replay the logs of the range here, so they reach the file log and the GUI
+                for level, message, visual in records:
+                    logger.bind(visual=visual).log(level, message)
+        except multiprocessing.TimeoutError:
+            # The stuck ranges keep running otherwise, the next document gets a new pool
+            close_extraction_pool()
+            raise TimeoutError(
+                f"Page extraction took longer than {settings.parse_timeout} seconds"
+            ) from None
+        except (OSError, pickle.PicklingError, multiprocessing.ProcessError) as e:
+            # Never lose a document because of the pool, go serial instead
+            close_extraction_pool()
+            logger.warning(f"Parallel extraction failed ({e!r}), retrying serially")
+            page_results = [self._extract_page(page) for page in self.pages]
+
+        return page_results
+
+    def _cluster_columns(self) -> list[dict] | None:
+        """
+        Reference columns for the clustering engine, from the first page with a header.
+        None when the engine is off or nothing was found.
+        """
+        if settings.extraction_engine != "clustering":
+            return None
+
+        for page in self.pages[:3]:
+            layout = PageLayout(page)
+            try:
+                header = self._find_header(layout, HEADER_KEYWORDS)
+                if header is None:
+                    continue
+                columns = detect_columns(
+                    layout.words, header, layout.width, COLUMN_ALIASES
                 )
+                if columns is not None:
+                    return columns
+            finally:
+                layout.release()
+
+        logger.info("Column clustering found no qty/sku/description columns")
+        return None
+
+    def _cluster_page(self, layout) -> list[list[str]]:
+        """
+        Rows of one page cut by the clustering engine.
+        A page with its own header gets its own columns, others use the reference.
+        """
+        columns = self.columns
+        words = layout.words
+
+        header = self._find_header(layout, HEADER_KEYWORDS)
+        if header is not None:
+            columns = detect_columns(words, header, layout.width, COLUMN_ALIASES) or columns
+            words = [w for w in words if w["top"] > header["bottom"]]
 
+        return cluster_rows(words, columns)
+
+    @staticmethod
+    def _join_pages(page_results) -> list:
+        full_table = []
+        for table, _ in page_results:
             full_table.extend(table)
+        return full_table
 
-        if full_table:
-            self.po_table = pd.DataFrame(full_table[1:], columns=full_table[0])
+    def _span(self, stage):
+        """Timing span of a parser stage, tagged with the file and its page count"""
+        return span(
+            f"parser.{stage}",
+            file=Path(self.file_path).name,
+            pages=len(self.pages) if self.pages is not None else None,
+        )
 
-        # print("Uncleaned DataFrame")
-        # print(self.po_table)
+    def _add_page_time(self, stage, start):
+        total = self.page_timings.setdefault(stage, [0.0, 0])
+        total[0] += time.perf_counter() - start
+        total[1] += 1
+
+    def _emit_page_timings(self):
+        """Reports the page-level stages (crop, lattice, stream...) summed over the document"""
+        for stage, (seconds, pages) in self.page_timings.items():
+            emit(f"parser.{stage}", seconds, file=Path(self.file_path).name, pages=pages)
+        self.page_timings = {}
 
-    def _crop_to_header(self, page):
+    def _row_count(self) -> int | None:
+        if self.po_table is None:
+            return None
+        if isinstance(self.po_table, list) and self.po_table and isinstance(self.po_table[0], list):
+            # Raw table, the first row is the header
+            return len(self.po_table) - 1
+        return len(self.po_table)
+
+    @staticmethod
+    def _is_small(row_count) -> bool:
+        """Small POs skip pandas: parsed, matched and exported as a list of dicts"""
+        return 0 < row_count <= settings.small_po_rows
+
+    def _items_table(self, names, items):
+        """The line items as records for a small PO, as a DataFrame otherwise"""
+        if self._is_small(len(items)):
+            return [dict(zip(names, item)) for item in items]
+
+        import pandas as pd
+
+        return pd.DataFrame(items, columns=names)
+
+    @staticmethod
+    def _pad_rows(header, rows) -> tuple[list, list[list]]:
+        """
+        Gives the header and every row the same width.
+        A short row gets empty cells (None, no cell). Cells past the header get a
+        nameless column, which the cleaner merges into the one on its left.
+        """
+        width = max([len(header), *(len(row) for row in rows)])
+        header = list(header) + [None] * (width - len(header))
+        rows = [list(row) + [None] * (width - len(row)) for row in rows]
+        return header, rows
+
+    def _item_columns(self) -> list:
+        if isinstance(self.po_table, list):
+            return list(self.po_table[0]) if self.po_table else []
+        return list(self.po_table.columns)
+
+    def _skus(self) -> list[str]:
+        if isinstance(self.po_table, list):
+            return [str(item["sku"]) for item in self.po_table]
+        return self.po_table["sku"].astype(str).tolist()
+
+    def _crop_to_header(self, layout):
         """
         Scans the page for header keywords and crops everything above them.
         Returns the cropped page (or original if no header found).
         """
-        header_keywords = [
-            "sku",
-            "qty",
-            "quantity",
-            "description",
-            "desc",
-            "unit price",
-            "price",
-            "unit",
-            "total",
-            "amount",
-            "item",
-            "ref",
-            "part number",
-        ]
-
-        # Get all words to find positions
-        words = page.extract_words()
+        keywords = HEADER_KEYWORDS
+        if self.template is not None:
+            keywords = self.template["keywords"]
 
-        # Sort by vertical position (top to bottom) to find the highest header
-        words.sort(key=lambda w: w["top"])
+        header = self._find_header(layout, keywords)
 
         crop_y = 0
-        for word in words:
-            if word["text"].lower().strip() in header_keywords:
-                # Found the start of the table.
-                # Crop slightly above the word (minus 2 pixels)
-                crop_y = max(0, word["top"] - 2)
-                break
+        if header is not None:
+            # Found the start of the table.
+            # Crop slightly above the word (minus 2 pixels)
+            crop_y = max(0, header["top"] - 2)
+        elif self.template is not None and layout.page.page_number == 1:
+            # The first page always has the header where the template saw it
+            crop_y = max(0, self.template["crop_offset"] - 2)
 
         # If we found a header, crop the page.
         # If not (crop_y is 0), return the full page (useful for Page 2 continuations).
         if crop_y > 0:
-            return page.crop((0, crop_y, page.width, page.height))
+            return layout.crop(crop_y)
+        return layout.page
 
-    def _clean_table(self):
-        if self.po_table.empty:
-            return
+    def _find_header(self, layout, keywords) -> dict | None:
+        """Returns the highest word on the page that is a header keyword"""
+        # Sort the cached words by vertical position (top to bottom) to find the highest header
+        words = sorted(layout.words, key=lambda w: w["top"])
 
-        # 1. Standardize headers
-        self.po_table.columns = (
-            self.po_table.columns.astype(str)
-            .str.replace(r"\n", "")
-            .str.strip()
-            .str.lower()
-        )
+        for word in words:
+            if word["text"].lower().strip() in keywords:
+                return word
 
-        # Change duplicate headers to 'name.number'
-        new_columns = []
-        seen_counts = {}  # Tracks how many times we've seen a header
-
-        for col in self.po_table.columns:
-            col_name = col.strip()
-            if col_name in seen_counts:
-                seen_counts[col_name] += 1
-                # Create unique name: "Total.1", "nan.2", ".1"
-                new_col = f"{col_name}.{seen_counts[col_name]}"
-            else:
-                seen_counts[col_name] = 0
-                new_col = col_name
-            new_columns.append(new_col)
-
-        self.po_table.columns = new_columns
-
-        # 1.5 Normalize common names
-        norm_map = {
-            "quantity": "qty",
-            "quantity.1": "qty",
-            "item": "description",
-            "desc": "description",
-            "part number": "sku",
-            "pn": "sku",
-            "ref": "sku",
-        }
-        self.po_table.rename(columns=norm_map, inplace=True)
+        return None
 
-        # 2. Drop price/total
-        cols_to_drop = [
-            c
-            for c in self.po_table.columns
-            if any(x in c for x in ["price", "total", "amount", "cost"])
-        ]
-        self.po_table = self.po_table.drop(columns=cols_to_drop)
-
-        def is_header_bad(col_name):
-            """Returns True if the column header looks like a ghost/split artifact"""
-            name = str(col_name).lower()
-            return (
-                name == "nan"
-                or "unnamed" in name
-                or name == ""
-                or name == "none"
-                or name.startswith(".")
-            )
-
-        # 3. Fix split data (Merge Left)
-        # We iterate backwards (right to left) so we don't mess up indexes while dropping
-        i = 1
-        while i < len(self.po_table.columns):
-            curr_col = self.po_table.columns[i]
-            prev_col = self.po_table.columns[i - 1]
-
-            if is_header_bad(curr_col):
-                # Merge Data: Previous + Space + Current
-                self.po_table[prev_col] = (
-                    self.po_table[prev_col].astype(str).replace("nan", "")
-                    + " "
-                    + self.po_table[curr_col].astype(str).replace("nan", "")
-                ).str.strip()
-
-                self.po_table.drop(columns=[curr_col], inplace=True)
-            else:
-                i += 1
-
-        # 4. Fix split headers (Merge Header Name Left)
-        self.po_table = self.po_table.replace(r"^\s*$", pd.NA, regex=True)
-
-        i = 1
-        while i < len(self.po_table.columns):
-            curr_col = self.po_table.columns[i]
-            prev_col = self.po_table.columns[i - 1]
-
-            # If column is empty (all NaNs), it's a split header artifact
-            if self.po_table[curr_col].isna().all():
-                new_name = str(prev_col) + str(curr_col)  # Merge Names
-                self.po_table.rename(columns={prev_col: new_name}, inplace=True)
-                self.po_table.drop(columns=[curr_col], inplace=True)
-            else:
-                i += 1
-
-        # 5. Remove repeated headers
-        if len(self.po_table.columns) > 0:
-            first_col = self.po_table.columns[0]
-            self.po_table = self.po_table[
-                self.po_table[first_col].astype(str) != str(first_col)
-            ]
+    def _clean_table(self):
+        if isinstance(self.po_table, list):
+            # Raw table: header row first
+            header, rows = self.po_table[0], self.po_table[1:]
+            if not rows:
+                # Nothing under the header, nothing to clean
+                self.po_table = to_frame(list(header), [[] for _ in header])
+                return
+            names, columns = clean_columns(list(header), [list(col) for col in zip(*rows)])
+            count = len(columns[0]) if columns else 0
+            build = to_records if self._is_small(count) else to_frame
+            self.po_table = build(names, columns)
+        else:
+            self.po_table = self._clean_frame(self.po_table)
 
-        # 6. Final cleanup
-        self.po_table = self.po_table.replace(r"\n", "", regex=True)
-        # Fix split words (e.g. "G asket")
-        self.po_table = self.po_table.replace(
-            r"(?<=[a-zA-Z])\s(?=[a-z])", "", regex=True
-        )
-        # Drop empty columns/rows
-        self.po_table = self.po_table.dropna(how="all").reset_index(drop=True)
-        # Remove leading/trailing spaces from the cells
-        self.po_table = self.po_table.apply(
-            lambda x: x.str.strip() if x.dtype == "object" else x
-        )
+    def _clean_frame(self, df) -> pd.DataFrame:
+        """Turns a raw extracted table into the cleaned items frame"""
+        return clean_frame(df)
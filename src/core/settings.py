@@ -20,11 +20,42 @@ class Settings:
         # After processing a file/batch of files open the output folder
         "open_output_folder": False,
         "export_format": ".xlsx",
+        # Sum the quantities of the lines with the same warehouse code in the export
+        "aggregate_export_qty": False,
         # --- MATCHER ---
         # Switch to turn fuzzy matching ON or OFF
         "enable_fuzzy_match": False,
         # The threshold for the fuzzy match (0.1 to 0.9)
         "fuzzy_threshold": 0.8,
+        # Options: "batched" (one matrix call per PO), "row" (one search per line),
+        # "blocked" (each line against the products sharing its rare tokens)
+        "matcher_engine": "batched",
+        # Match on descriptions without the supplier noise (see src/lib/text.py)
+        "normalize_descriptions": True,
+        # Best matches offered in the review dropdown of a line (0 = Disabled)
+        "review_candidates": 5,
+        # --- PARSER ---
+        # Documents with at least this many pages are split across processes
+        "parallel_page_threshold": 20,
+        # Number of extraction processes (0 = one per CPU core, minus one)
+        "parser_workers": 0,
+        # Documents with at least this many pages are parsed, matched and exported
+        # chunk by chunk (0 = Disabled)
+        "streaming_page_threshold": 200,
+        # Size limit of the parse cache in MB (0 = Disabled)
+        "parse_cache_size": 50,
+        # Don't run the table finder on pages that can't hold line items
+        "skip_non_tabular_pages": True,
+        # POs with at most this many lines skip pandas (0 = Always use pandas)
+        "small_po_rows": 30,
+        # Options: "table_finder" (pdfplumber), "clustering" (word coordinates)
+        "extraction_engine": "table_finder",
+        # Parse every file in a separate process that can be killed
+        "isolated_parsing": False,
+        # Seconds a parse may take before it's killed (isolated parsing)
+        "parse_timeout": 120,
+        # Memory a parse may use in MB (isolated parsing, 0 = No limit)
+        "parse_memory_limit": 1024,
         # --- BACKUP ---
         "max_backups": 10,
         "backup_interval": 24,
@@ -38,6 +69,8 @@ class Settings:
         self.db_path = self.internal_dir / "mappings.db"
         self.logs_path = self.internal_dir / "Logs"
         self.backup_path = self.internal_dir / "Backups"
+        self.parse_cache_path = self.internal_dir / "parse_cache.db"
+        self.benchmarks_path = self.internal_dir / "Benchmarks"
 
         # Load the defaults
         self._data = self.DEFAULTS.copy()
@@ -47,6 +80,7 @@ class Settings:
         self._data["output_dir"] = str(self.root / "Data" / "Output")
         self._data["review_dir"] = str(self.root / "Data" / "Review")
         self._data["archive_dir"] = str(self.root / "Data" / "Archive")
+        self._data["quarantine_dir"] = str(self.root / "Data" / "Quarantine")
 
         # Make sure the internal folder exists
         self._ensure_internal_structure()
@@ -132,6 +166,14 @@ class Settings:
     def archive_dir(self, value):
         self._data["archive_dir"] = str(value)
 
+    @property
+    def quarantine_dir(self) -> Path:
+        return Path(self._data["quarantine_dir"])
+
+    @quarantine_dir.setter
+    def quarantine_dir(self, value):
+        self._data["quarantine_dir"] = str(value)
+
     # -- GUI Properties --
     @property
     def resolution(self) -> str:
@@ -202,6 +244,14 @@ class Settings:
         else:
             logger.error(f"Invalid export format: {value}. Must be one of {valid_formats}")
 
+    @property
+    def aggregate_export_qty(self) -> bool:
+        return self._data.get("aggregate_export_qty", False)
+
+    @aggregate_export_qty.setter
+    def aggregate_export_qty(self, value):
+        self._data["aggregate_export_qty"] = bool(value)
+
     @property
     def keep_working_mode(self) -> bool:
         return self._data.get("keep_working_mode", False)
@@ -241,6 +291,211 @@ class Settings:
         except ValueError:
             logger.error(f"Invalid threshold: {value}. Must be a number.")
 
+    @property
+    def matcher_engine(self) -> str:
+        return self._data.get("matcher_engine", "batched")
+
+    @matcher_engine.setter
+    def matcher_engine(self, value):
+        valid_engines = ["batched", "row", "blocked"]
+
+        val = str(value).lower()
+        if val not in valid_engines:
+            logger.error(f"Invalid matcher engine: {value}. Use {valid_engines}")
+            return
+
+        self._data["matcher_engine"] = val
+
+    @property
+    def normalize_descriptions(self) -> bool:
+        return self._data.get("normalize_descriptions", True)
+
+    @normalize_descriptions.setter
+    def normalize_descriptions(self, value):
+        self._data["normalize_descriptions"] = bool(value)
+
+    @property
+    def review_candidates(self) -> int:
+        return self._data.get("review_candidates", 5)
+
+    @review_candidates.setter
+    def review_candidates(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid candidate count: {value}. Must be a number.")
+            return
+
+        if val < 0:
+            logger.error("Candidate count cannot be negative.")
+            return
+
+        # 0 = Disabled
+        self._data["review_candidates"] = val
+
+    # -- Parser Properties --
+    @property
+    def parallel_page_threshold(self) -> int:
+        return self._data.get("parallel_page_threshold", 20)
+
+    @parallel_page_threshold.setter
+    def parallel_page_threshold(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid page threshold: {value}. Must be a number.")
+            return
+
+        if val < 1:
+            logger.error("Page threshold has to be at least 1.")
+            return
+
+        self._data["parallel_page_threshold"] = val
+
+    @property
+    def streaming_page_threshold(self) -> int:
+        return self._data.get("streaming_page_threshold", 200)
+
+    @streaming_page_threshold.setter
+    def streaming_page_threshold(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid streaming threshold: {value}. Must be a number.")
+            return
+
+        if val < 0:
+            logger.error("Streaming threshold cannot be negative.")
+            return
+
+        # 0 = Disabled
+        self._data["streaming_page_threshold"] = val
+
+    @property
+    def parser_workers(self) -> int:
+        return self._data.get("parser_workers", 0)
+
+    @parser_workers.setter
+    def parser_workers(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid worker count: {value}. Must be a number.")
+            return
+
+        if val < 0:
+            logger.error("Worker count cannot be negative.")
+            return
+
+        # 0 = Automatic (based on the CPU)
+        self._data["parser_workers"] = val
+
+    @property
+    def parse_cache_size(self) -> int:
+        return self._data.get("parse_cache_size", 50)
+
+    @parse_cache_size.setter
+    def parse_cache_size(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid cache size: {value}. Must be a number.")
+            return
+
+        if val < 0:
+            logger.error("Cache size cannot be negative.")
+            return
+
+        # 0 = Disabled
+        self._data["parse_cache_size"] = val
+
+    @property
+    def skip_non_tabular_pages(self) -> bool:
+        return self._data.get("skip_non_tabular_pages", True)
+
+    @skip_non_tabular_pages.setter
+    def skip_non_tabular_pages(self, value):
+        self._data["skip_non_tabular_pages"] = bool(value)
+
+    @property
+    def small_po_rows(self) -> int:
+        return self._data.get("small_po_rows", 30)
+
+    @small_po_rows.setter
+    def small_po_rows(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid small PO size: {value}. Must be a number.")
+            return
+
+        if val < 0:
+            logger.error("Small PO size cannot be negative.")
+            return
+
+        # 0 = Disabled
+        self._data["small_po_rows"] = val
+
+    @property
+    def extraction_engine(self) -> str:
+        return self._data.get("extraction_engine", "table_finder")
+
+    @extraction_engine.setter
+    def extraction_engine(self, value):
+        valid_engines = ["table_finder", "clustering"]
+
+        val = str(value).lower()
+        if val not in valid_engines:
+            logger.error(f"Invalid extraction engine: {value}. Use {valid_engines}")
+            return
+
+        self._data["extraction_engine"] = val
+
+    @property
+    def isolated_parsing(self) -> bool:
+        return self._data.get("isolated_parsing", False)
+
+    @isolated_parsing.setter
+    def isolated_parsing(self, value):
+        self._data["isolated_parsing"] = bool(value)
+
+    @property
+    def parse_timeout(self) -> int:
+        return self._data.get("parse_timeout", 120)
+
+    @parse_timeout.setter
+    def parse_timeout(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid parse timeout: {value}. Must be a number.")
+            return
+
+        if val < 1:
+            logger.error("Parse timeout has to be at least 1 second.")
+            return
+
+        self._data["parse_timeout"] = val
+
+    @property
+    def parse_memory_limit(self) -> int:
+        return self._data.get("parse_memory_limit", 1024)
+
+    @parse_memory_limit.setter
+    def parse_memory_limit(self, value):
+        try:
+            val = int(value)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid memory limit: {value}. Must be a number.")
+            return
+
+        if val < 0:
+            logger.error("Memory limit cannot be negative.")
+            return
+
+        # 0 = No limit
+        self._data["parse_memory_limit"] = val
+
     # -- Backup Properties --
     @property
     def max_backups(self) -> int:
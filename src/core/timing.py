@@ -0,0 +1,82 @@
+"""
+Timing spans for the processing pipeline.
+
+    with span("parser.extract", file="PO-1.pdf", pages=12) as fields:
+        ...
+        fields["rows"] = len(table)
+
+Every finished span becomes a record {"stage", "seconds", "parent", "file", "pages", "rows", ...}
+that is handed to each registered sink. The default sink writes it to the file log.
+Stages measured somewhere else (e.g. summed over pages) are reported with emit().
+"""
+
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from loguru import logger
+
+# Stage of the span that is currently open, so nested spans know their parent
+_current_stage = ContextVar("current_stage", default=None)
+
+
+def log_sink(record):
+    """Writes the span to the file log (not shown in the GUI)"""
+    details = [record["file"]] if record.get("file") else []
+    if record.get("pages") is not None:
+        details.append(f"{record['pages']} pages")
+    if record.get("rows") is not None:
+        details.append(f"{record['rows']} rows")
+
+    suffix = f" | {', '.join(details)}" if details else ""
+    logger.bind(visual=False).debug(
+        f"Timing: {record['stage']} {record['seconds']:.3f}s{suffix}"
+    )
+
+
+_sinks: list[Callable[[dict], None]] = [log_sink]
+
+
+def add_sink(sink: Callable[[dict], None]):
+    """Registers a callable that receives every finished span record"""
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def remove_sink(sink: Callable[[dict], None]):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Times the block and emits it as 'stage'.
+    Yields the fields dict so the block can fill in what it learns (rows, pages...).
+    """
+    parent = _current_stage.get()
+    token = _current_stage.set(stage)
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        seconds = time.perf_counter() - start
+        _current_stage.reset(token)
+        emit(stage, seconds, parent=parent, **fields)
+
+
+def emit(stage, seconds, parent=None, **fields):
+    """Sends an already measured stage to the sinks"""
+    if parent is None:
+        parent = _current_stage.get()
+
+    record = {"stage": stage, "seconds": seconds, "parent": parent}
+    record.update(fields)
+
+    for sink in list(_sinks):
+        try:
+            sink(record)
+        except Exception as e:
+            # A broken sink must never break the pipeline
+            logger.bind(visual=False).error(f"Timing sink failed: {e}")
@@ -0,0 +1,93 @@
+"""
+Token inverted index over the catalog descriptions.
+
+Scoring a PO line against every product is O(lines x catalog). The index maps
+every token of a description to the positions of the descriptions that contain it,
+so a line is only scored against the products that share its rarest tokens.
+Tokens found in too large a share of the catalog ("bolt", "m8") don't narrow
+anything down and are left out of the shortlist.
+
+If a line has too few candidates (no rare token in common with the catalog),
+shortlist() returns None and the caller scans the whole catalog: the recall guard.
+"""
+
+import math
+import re
+
+import numpy as np
+
+# Lowercase letters/digits runs: "REF:1234 Heavy-Duty" -> ref, 1234, heavy, duty
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# Candidates a line is scored against at most
+SHORTLIST_SIZE = 300
+# Fewer candidates than this and the line is scored against the whole catalog
+MIN_SHORTLIST = 20
+# Tokens in a larger share of the catalog are too common to block on
+MAX_TOKEN_SHARE = 0.2
+
+
+def tokenize(text) -> set[str]:
+    return set(TOKEN.findall(str(text).lower()))
+
+
+class TokenIndex:
+    def __init__(self, descriptions):
+        # token: positions (in 'descriptions') of the descriptions that contain it
+        postings = {}
+        for position, description in enumerate(descriptions):
+            for token in tokenize(description):
+                postings.setdefault(token, []).append(position)
+
+        self.postings = {
+            token: np.array(positions, dtype=np.int64) for token, positions in postings.items()
+        }
+        self.size = len(descriptions)
+
+    def extended(self, position, description) -> "TokenIndex":
+        """
+        A new index with a description appended to the catalog at 'position'.
+        This one is left as it is: a search may still be reading it.
+        """
+        index = TokenIndex.__new__(TokenIndex)
+        # Unchanged postings are shared, the arrays are never written to
+        index.postings = dict(self.postings)
+        for token in tokenize(description):
+            positions = index.postings.get(token)
+            if positions is None:
+                index.postings[token] = np.array([position], dtype=np.int64)
+            else:
+                index.postings[token] = np.append(positions, position)
+        index.size = max(self.size, position + 1)
+        return index
+
+    def shortlist(self, text) -> np.ndarray | None:
+        """
+        Positions of the best candidates for the text, in catalog order.
+        None if the catalog has to be scanned in full.
+        """
+        if self.size <= SHORTLIST_SIZE:
+            return None
+
+        # 1. Rare tokens of the line, weighted by how rare they are
+        limit = self.size * MAX_TOKEN_SHARE
+        found = [self.postings[t] for t in tokenize(text) if t in self.postings]
+        found = [p for p in found if len(p) <= limit]
+        if not found:
+            return None
+
+        # 2. Candidates: the descriptions sharing the most (and rarest) tokens
+        positions = np.concatenate(found)
+        weights = np.concatenate(
+            [np.full(len(p), math.log(self.size / len(p))) for p in found]
+        )
+        scores = np.bincount(positions, weights=weights, minlength=self.size)
+        candidates = np.flatnonzero(scores)
+        if len(candidates) < MIN_SHORTLIST:
+            return None
+
+        if len(candidates) > SHORTLIST_SIZE:
+            best = np.argpartition(-scores[candidates], SHORTLIST_SIZE)[:SHORTLIST_SIZE]
+            candidates = np.sort(candidates[best])
+
+        return candidates
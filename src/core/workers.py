@@ -7,12 +7,15 @@ from typing import Any
 from loguru import logger
 
 from src.core.backup import backup
-from src.core.exporter import Exporter
+from src.core.exporter import ExportCancelled, Exporter
 from src.core.logger import task_scope
-from src.core.matcher import fuzzy_match, green_check
-from src.core.pdf_parser import PdfParser
+from src.core.matcher import fuzzy_match, green_check, match_chunks
+from src.core.parse_cache import parse_cache
+from src.core.parse_process import ParseBudgetExceeded, ParseProcess
+from src.core.pdf_parser import NoTextLayer, PdfParser, close_extraction_pool, page_count
 from src.core.settings import settings
-from src.lib.data import prepare_review_data, prepare_export_data
+from src.core.timing import span
+from src.lib.data import prepare_export_chunks, prepare_export_data, prepare_review_data
 
 
 class BasicThread(threading.Thread):
@@ -86,6 +89,15 @@ class Worker(BasicThread):
     def __init__(self, app):
         super().__init__(app, "Worker")
         self.exporter = Exporter()
+        # Only started when isolated parsing is on
+        self.parse_process = ParseProcess()
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            self.parse_process.close()
+            close_extraction_pool()
 
     def cycle(self):
         mode = settings.working_mode
@@ -104,21 +116,31 @@ class Worker(BasicThread):
         self.process_file(file_path, mode)
 
     def process_file(self, file_path, mode):
-        with task_scope(f"Parsing {file_path.name}"):
+        with task_scope(f"Parsing {file_path.name}"), span(
+            "worker.process_file", file=file_path.name
+        ) as fields:
             try:
-                parser = PdfParser(file_path)
-                # items format: [QTY, SKU, DESCRIPTION]
-                supplier, items = parser.run()
+                # Long documents: parsed, matched and exported chunk by chunk when all green
+                if self._should_stream(file_path) and self.stream_file(file_path, fields):
+                    return
+
+                # items format: [qty, sku, description], a DataFrame or a list of dicts (small POs)
+                with span("worker.parse", file=file_path.name) as parse_fields:
+                    supplier, items, pages = self.parse_file(file_path)
+                    parse_fields["pages"] = pages
+                    parse_fields["rows"] = None if items is None else len(items)
+                fields["rows"] = parse_fields["rows"]
 
                 # Filter items
-                # format: [sku, warehouse_code, flag, score]
+                # format: [sku, warehouse_code, flag, score, candidates], same type as the items
                 if supplier is None or items is None:
                     logger.warning(
                         f"Skipping {file_path.name}: Could not parse supplier/items."
                     )
                     return
 
-                match_results = fuzzy_match(po_items=items, supplier=supplier)
+                with span("worker.match", file=file_path.name, rows=len(items)):
+                    match_results = fuzzy_match(po_items=items, supplier=supplier)
 
                 # Check for all green status
                 if green_check(match_results):
@@ -126,25 +148,120 @@ class Worker(BasicThread):
                 else:
                     self.handle_review(file_path, supplier, items, match_results, mode)
 
+            except ParseBudgetExceeded as e:
+                self.quarantine(file_path, str(e))
+            except NoTextLayer as e:
+                self.reject_to_review(file_path, str(e))
             except Exception as e:
                 logger.error(f"Worker failed processing {file_path.name}: {e}")
 
+    @staticmethod
+    def _should_stream(file_path) -> bool:
+        threshold = settings.streaming_page_threshold
+        # Isolated parsing keeps whole-file parses, its time and memory budget applies to them
+        if threshold == 0 or settings.isolated_parsing:
+            return False
+        return page_count(file_path) >= threshold
+
+    def stream_file(self, file_path, fields) -> bool:
+        """
+        Parses, matches and exports the file chunk by chunk, memory doesn't grow with its pages.
+        Stops at the first line that isn't green and returns False, nothing exported:
+        the review needs the whole file.
+        """
+        rows = 0
+
+        def green_chunks(parser):
+            nonlocal rows
+            for items, matches in match_chunks(parser):
+                if not green_check(matches):
+                    raise ExportCancelled("not every line is known, sending it to review")
+                rows += len(items)
+                yield items, matches
+
+        with span("worker.stream", file=file_path.name) as stream_fields:
+            parser = PdfParser(file_path)
+            export_path = self.exporter.run_chunks(
+                prepare_export_chunks(green_chunks(parser)), file_path.stem
+            )
+            stream_fields["rows"] = rows
+        if export_path is None:
+            return False
+        fields["rows"] = rows
+
+        with task_scope(f"Archiving {file_path.name}"):
+            self.archive(file_path)
+        return True
+
+    def parse_file(self, file_path):
+        """
+        Runs the parser, unless this exact file content was parsed before.
+        Returns (supplier, items, pages), the page count comes from the cache on a hit.
+        """
+        file_hash = parse_cache.file_hash(file_path)
+
+        cached = parse_cache.get(file_hash)
+        if cached is not None:
+            logger.info(f"Parse cache hit for {file_path.name}, skipping the parser")
+            return cached
+
+        if settings.isolated_parsing:
+            # Killed and reported if it goes over the time or memory budget
+            supplier, items, pages = self.parse_process.parse(file_path)
+        else:
+            # The document and its pages are released as soon as the items are out
+            with PdfParser(file_path) as parser:
+                supplier, items = parser.run()
+            pages = parser.num_pages
+
+        if supplier is not None and items is not None:
+            parse_cache.put(file_hash, supplier, items, pages)
+
+        return supplier, items, pages
+
+    def quarantine(self, file_path, reason):
+        """Moves a file that broke the parser out of the way, the queue carries on"""
+        logger.error(f"Quarantined {file_path.name}: {reason}")
+        try:
+            shutil.move(file_path, settings.quarantine_dir / file_path.name)
+        except Exception as e:
+            logger.error(f"Failed to quarantine {file_path.name}: {e}")
+
+        self.app.processed_files.discard(file_path.name)
+
+    def reject_to_review(self, file_path, reason):
+        """Sends a file the parser can't read (e.g. a scan) to Review for a human"""
+        logger.warning(f"Sent {file_path.name} to Review: {reason}")
+        try:
+            shutil.move(file_path, settings.review_dir / file_path.name)
+        except Exception as e:
+            logger.error(f"Failed to move file to review: {e}")
+
+        self.app.processed_files.discard(file_path.name)
+
     def handle_green(self, file_path, supplier, items, match_results):
         with task_scope(f"Archiving {file_path.name}"):
             # 1. Export Data
-            export_df = prepare_export_data(items, match_results)
-            self.exporter.run(export_df, file_path.stem)
+            with span("worker.export", file=file_path.name, rows=len(items)):
+                export_df = prepare_export_data(items, match_results)
+                self.exporter.run(export_df, file_path.stem)
 
             # 2. Archive
-            if settings.archive_processed_files:
-                try:
-                    dest = settings.archive_dir / file_path.name
-                    shutil.move(file_path, dest)
-                    logger.info(f"Archived {file_path.name}")
+            self.archive(file_path)
 
-                    self.app.processed_files.discard(file_path.name)
-                except Exception as e:
-                    logger.error(f"Failed to archive {file_path.name}: {e}")
+    def archive(self, file_path):
+        """Moves an exported file to the archive, if the settings say so"""
+        if not settings.archive_processed_files:
+            return
+
+        try:
+            dest = settings.archive_dir / file_path.name
+            shutil.move(file_path, dest)
+            logger.info(f"Archived {file_path.name}")
+
+            self.app.processed_files.discard(file_path.name)
+        except Exception as e:
+            logger.error(f"Failed to archive {file_path.name}: {e}")
 
     def handle_review(self, file_path, supplier, items, match_results, mode):
         with task_scope(f"Requesting Review: {file_path.name}"):
@@ -166,7 +283,8 @@ class Worker(BasicThread):
                     return
 
                 # 2. Format the data
-                stats, rows = prepare_review_data(items, match_results)
+                with span("worker.prepare_review", file=file_path.name, rows=len(items)):
+                    stats, rows = prepare_review_data(items, match_results)
 
                 # 3. Stash the data in the App
                 self.app.current_review_payload = {
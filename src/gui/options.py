@@ -1,7 +1,13 @@
 import ttkbootstrap as ttk
 
 from src.core.settings import settings
-from src.gui.widgets.options_widgets import PathSelector, SliderSetting, ToggleSetting, DropdownSetting
+from src.gui.widgets.options_widgets import (
+    DropdownSetting,
+    EntrySetting,
+    PathSelector,
+    SliderSetting,
+    ToggleSetting,
+)
 from src.lib.time import format_duration, parse_duration
 
 
@@ -87,18 +93,21 @@ class PathSettings(ttk.Labelframe):
         self.var_output = ttk.StringVar(value=str(settings.output_dir))
         self.var_review = ttk.StringVar(value=str(settings.review_dir))
         self.var_archive = ttk.StringVar(value=str(settings.archive_dir))
+        self.var_quarantine = ttk.StringVar(value=str(settings.quarantine_dir))
 
         # -- Create the Selectors --
         PathSelector(self, "Input Directory", self.var_input).pack(fill="x")
         PathSelector(self, "Output Directory", self.var_output).pack(fill="x")
         PathSelector(self, "Review Directory", self.var_review).pack(fill="x")
         PathSelector(self, "Archive Directory", self.var_archive).pack(fill="x")
+        PathSelector(self, "Quarantine Directory", self.var_quarantine).pack(fill="x")
 
     def save(self):
         settings.input_dir = self.var_input.get()
         settings.output_dir = self.var_output.get()
         settings.review_dir = self.var_review.get()
         settings.archive_dir = self.var_archive.get()
+        settings.quarantine_dir = self.var_quarantine.get()
 
     def is_modified(self):
         if settings.input_dir != self.var_input.get():
@@ -109,6 +118,8 @@ class PathSettings(ttk.Labelframe):
             return True
         if settings.archive_dir != self.var_archive.get():
             return True
+        if settings.quarantine_dir != self.var_quarantine.get():
+            return True
 
         return False
 
@@ -144,11 +155,18 @@ class WorkflowSettings(ttk.Labelframe):
             values=[".xls", ".xlsx", ".csv"]
         ).pack(fill="x", pady=5)
 
+        # -- Aggregate Quantities --
+        self.var_aggregate = ttk.BooleanVar(value=settings.aggregate_export_qty)
+        ToggleSetting(
+            self, "Sum the quantities of the same product in the export", self.var_aggregate
+        ).pack(fill="x", pady=5)
+
     def save(self):
         settings.archive_processed_files = self.var_archive.get()
         settings.open_output_folder = self.var_open.get()
         settings.keep_working_mode = self.var_keep_mode.get()
         settings.export_format = self.var_export.get()
+        settings.aggregate_export_qty = self.var_aggregate.get()
 
     def is_modified(self):
         if settings.archive_processed_files != self.var_archive.get():
@@ -159,6 +177,8 @@ class WorkflowSettings(ttk.Labelframe):
             return True
         if settings.export_format != self.var_export.get():
             return True
+        if settings.aggregate_export_qty != self.var_aggregate.get():
+            return True
 
         return False
 
@@ -182,15 +202,171 @@ class MatcherSettings(ttk.Labelframe):
             max_val=0.9,  # 90%
         ).pack(fill="x", pady=5)
 
+        # -- Matcher Engine --
+        self.var_engine = ttk.StringVar(value=settings.matcher_engine)
+        DropdownSetting(
+            self, "Matcher Engine", self.var_engine, values=["batched", "row", "blocked"]
+        ).pack(fill="x", pady=5)
+
+        # -- Normalize Descriptions --
+        self.var_normalize = ttk.BooleanVar(value=settings.normalize_descriptions)
+        ToggleSetting(
+            self, "Ignore supplier noise in descriptions", self.var_normalize
+        ).pack(fill="x", pady=5)
+
+        # -- Review Candidates --
+        self.var_candidates = ttk.IntVar(value=settings.review_candidates)
+        EntrySetting(
+            self,
+            "Matches offered for a line in the review",
+            self.var_candidates,
+            help_text="0 = Disabled",
+        ).pack(fill="x", pady=5)
+
     def save(self):
         settings.enable_fuzzy_match = self.var_fuzzy.get()
         settings.fuzzy_threshold = self.var_threshold.get()
+        settings.matcher_engine = self.var_engine.get()
+        settings.normalize_descriptions = self.var_normalize.get()
+        settings.review_candidates = self.var_candidates.get()
 
     def is_modified(self):
         if settings.enable_fuzzy_match != self.var_fuzzy.get():
             return True
         if settings.fuzzy_threshold != self.var_threshold.get():
             return True
+        if settings.matcher_engine != self.var_engine.get():
+            return True
+        if settings.normalize_descriptions != self.var_normalize.get():
+            return True
+        if settings.review_candidates != self.var_candidates.get():
+            return True
+
+        return False
+
+
+class ParserSettings(ttk.Labelframe):
+    def __init__(self, parent):
+        super().__init__(parent, text="Parser", padding=15)
+
+        # -- Extraction Engine --
+        self.var_engine = ttk.StringVar(value=settings.extraction_engine)
+        DropdownSetting(
+            self,
+            "Table Extraction Engine",
+            self.var_engine,
+            values=["table_finder", "clustering"],
+        ).pack(fill="x", pady=5)
+
+        # -- Skip Pages --
+        self.var_skip = ttk.BooleanVar(value=settings.skip_non_tabular_pages)
+        ToggleSetting(
+            self, "Skip pages without line items", self.var_skip
+        ).pack(fill="x", pady=5)
+
+        # -- Small POs --
+        self.var_small = ttk.IntVar(value=settings.small_po_rows)
+        EntrySetting(
+            self,
+            "Lines of a small PO (handled without pandas)",
+            self.var_small,
+            help_text="0 = Always use pandas",
+        ).pack(fill="x", pady=5)
+
+        # -- Parse Cache --
+        self.var_cache = ttk.IntVar(value=settings.parse_cache_size)
+        EntrySetting(
+            self,
+            "Parse cache size (MB)",
+            self.var_cache,
+            help_text="0 = Disabled",
+        ).pack(fill="x", pady=5)
+
+        ttk.Separator(self, orient="horizontal").pack(fill="x", pady=15)
+
+        # -- Parallel Extraction --
+        self.var_threshold = ttk.IntVar(value=settings.parallel_page_threshold)
+        EntrySetting(
+            self,
+            "Pages before a document is split across processes",
+            self.var_threshold,
+            help_text="Shorter documents are extracted in one process",
+        ).pack(fill="x", pady=5)
+
+        self.var_workers = ttk.IntVar(value=settings.parser_workers)
+        EntrySetting(
+            self,
+            "Extraction processes",
+            self.var_workers,
+            help_text="0 = One per CPU core, minus one",
+        ).pack(fill="x", pady=5)
+
+        # -- Streaming --
+        self.var_streaming = ttk.IntVar(value=settings.streaming_page_threshold)
+        EntrySetting(
+            self,
+            "Pages before a document is handled chunk by chunk",
+            self.var_streaming,
+            help_text="Only all-known POs are exported this way, 0 = Disabled",
+        ).pack(fill="x", pady=5)
+
+        ttk.Separator(self, orient="horizontal").pack(fill="x", pady=15)
+
+        # -- Isolated Parsing --
+        self.var_isolated = ttk.BooleanVar(value=settings.isolated_parsing)
+        ToggleSetting(
+            self, "Parse every file in a separate process", self.var_isolated
+        ).pack(fill="x", pady=5)
+
+        self.var_timeout = ttk.IntVar(value=settings.parse_timeout)
+        EntrySetting(
+            self,
+            "Parse timeout (seconds)",
+            self.var_timeout,
+            help_text="Longer parses are stopped (isolated parsing, parallel extraction)",
+        ).pack(fill="x", pady=5)
+
+        self.var_memory = ttk.IntVar(value=settings.parse_memory_limit)
+        EntrySetting(
+            self,
+            "Parse memory limit (MB)",
+            self.var_memory,
+            help_text="Only with isolated parsing, 0 = No limit",
+        ).pack(fill="x", pady=5)
+
+    def save(self):
+        settings.extraction_engine = self.var_engine.get()
+        settings.skip_non_tabular_pages = self.var_skip.get()
+        settings.small_po_rows = self.var_small.get()
+        settings.parse_cache_size = self.var_cache.get()
+        settings.parallel_page_threshold = self.var_threshold.get()
+        settings.parser_workers = self.var_workers.get()
+        settings.streaming_page_threshold = self.var_streaming.get()
+        settings.isolated_parsing = self.var_isolated.get()
+        settings.parse_timeout = self.var_timeout.get()
+        settings.parse_memory_limit = self.var_memory.get()
+
+    def is_modified(self):
+        if settings.extraction_engine != self.var_engine.get():
+            return True
+        if settings.skip_non_tabular_pages != self.var_skip.get():
+            return True
+        if settings.small_po_rows != self.var_small.get():
+            return True
+        if settings.parse_cache_size != self.var_cache.get():
+            return True
+        if settings.parallel_page_threshold != self.var_threshold.get():
+            return True
+        if settings.parser_workers != self.var_workers.get():
+            return True
+        if settings.streaming_page_threshold != self.var_streaming.get():
+            return True
+        if settings.isolated_parsing != self.var_isolated.get():
+            return True
+        if settings.parse_timeout != self.var_timeout.get():
+            return True
+        if settings.parse_memory_limit != self.var_memory.get():
+            return True
 
         return False
 
@@ -361,6 +537,7 @@ class SettingsWindow(ttk.Toplevel):
         self.path_settings = PathSettings(container)
         self.workflow_settings = WorkflowSettings(container)
         self.matcher_settings = MatcherSettings(container)
+        self.parser_settings = ParserSettings(container)
         self.backup_settings = BackupSettings(container)
 
         self.modules = [
@@ -368,6 +545,7 @@ class SettingsWindow(ttk.Toplevel):
             self.path_settings,
             self.workflow_settings,
             self.matcher_settings,
+            self.parser_settings,
             self.backup_settings,
         ]
 
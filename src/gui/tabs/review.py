@@ -4,9 +4,10 @@ from tkinter import messagebox
 import ttkbootstrap as ttk
 from loguru import logger
 
+from src.core.cleaner import is_missing
 from src.core.database import database as db
 from src.gui.widgets.review_widgets import ReviewRow
-from src.lib.mappings import save_mappings_batch
+from src.lib.mappings import save_aliases_batch, save_mappings_batch, save_supplier_alias
 
 
 class Footer(ttk.Frame):
@@ -32,6 +33,18 @@ class Footer(ttk.Frame):
         # Separator
         ttk.Label(self.stats_frame, text=" / ", font=("Consolas", 12)).pack(side="left")
 
+        # Blue count
+        self.var_blue = ttk.StringVar(value=str(stats.get("blue", 0)))
+        ttk.Label(
+            self.stats_frame,
+            textvariable=self.var_blue,
+            bootstyle="info",
+            font=("Consolas", 12, "bold"),
+        ).pack(side="left")
+
+        # Separator
+        ttk.Label(self.stats_frame, text=" / ", font=("Consolas", 12)).pack(side="left")
+
         # Yellow count
         self.var_yellow = ttk.StringVar(value=str(stats["yellow"]))
         ttk.Label(
@@ -141,6 +154,8 @@ class Review(ttk.Labelframe):
 
         codes = df["warehouse_code"].astype(str).tolist()
         descriptions = df["description"].astype(str).tolist()
+        # For the matcher's candidates, which only carry the code
+        descriptions_by_code = dict(zip(codes, descriptions))
 
         # Add the row to the list
         for r in rows_data:
@@ -149,6 +164,7 @@ class Review(ttk.Labelframe):
                 row_data=r,
                 codes_list=codes,
                 descriptions_list=descriptions,
+                descriptions_by_code=descriptions_by_code,
             )
             self.rows.append(row)
 
@@ -175,6 +191,7 @@ class Review(ttk.Labelframe):
 
         invalid_rows = []
         mappings = []
+        aliases = []
         for r in self.rows:
             code, sku = r.get_mapping()
 
@@ -182,6 +199,15 @@ class Review(ttk.Labelframe):
                 invalid_rows.append(sku)
             else:
                 mappings.append({"sku": sku, "warehouse_code": code})
+                # Lines the matcher wasn't sure of: the next PO with this description skips scoring
+                # (a line without a description would confirm every other empty line)
+                description = r.data["description"]
+                if (
+                    r.data["flag"] != "green"
+                    and not is_missing(description)
+                    and str(description).strip()
+                ):
+                    aliases.append({"description": description, "warehouse_code": code})
 
         if invalid_rows:
             messagebox.showerror(
@@ -193,6 +219,10 @@ class Review(ttk.Labelframe):
         try:
             if mappings:
                 save_mappings_batch(self.supplier, mappings)
+            if aliases:
+                save_aliases_batch(self.supplier, aliases)
+            # A human saw the PO, its supplier name is safe to look for in file names
+            save_supplier_alias(self.supplier)
 
             self.destroy()
             self.backend.user_event.set()
@@ -123,3 +123,26 @@ class DropdownSetting(ttk.Frame):
             width=10
         )
         self.combo.pack(side="right", anchor="center")
+
+
+class EntrySetting(ttk.Frame):
+    """
+    A reusable number entry with a hint below it.
+    Layout:
+      [Label Title]
+      [Entry]
+      [Help text]
+    """
+    def __init__(self, parent, label_text, variable, help_text):
+        super().__init__(parent)
+
+        # 1. Label (Top)
+        ttk.Label(self, text=label_text).pack(anchor="w")
+
+        # 2. Entry
+        ttk.Entry(self, textvariable=variable).pack(fill="x", pady=(5, 0))
+
+        # 3. Help text (Bottom)
+        ttk.Label(
+            self, text=help_text, bootstyle="secondary", font=("Segoe UI", 8)
+        ).pack(anchor="w", pady=(2, 0))
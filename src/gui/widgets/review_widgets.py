@@ -14,12 +14,15 @@ class ReviewSearchBox(ttk.Frame):
         codes_list: list[str],
         descriptions_list: list[str],
         placeholder="",
+        candidates=None,
     ):
         super().__init__(parent, bootstyle="primary")
 
         # Store the data in lists for easier searching
         self.code_list = codes_list
         self.desc_list = descriptions_list
+        # The matcher's best guesses, [(code, description, score)], shown before anything is typed
+        self.candidates = candidates or []
 
         # -- UI Setup --
         self.var = ttk.StringVar(value=placeholder)
@@ -39,6 +42,8 @@ class ReviewSearchBox(ttk.Frame):
         )
 
         self.listbox_open = False
+        # Set while a picked item hands the focus back to the entry
+        self.picking = False
 
         # -- Bindings --
         # Fires every time a key is released
@@ -50,6 +55,8 @@ class ReviewSearchBox(ttk.Frame):
         # Select the top item
         self.entry.bind("<Return>", self.on_select)
 
+        # Offer the matcher's candidates when the box is entered
+        self.entry.bind("<FocusIn>", self.on_focus_in)
         # Close the dropdown if the user clicks somewhere else
         self.entry.bind("<FocusOut>", self.on_focus_out)
         # Handle clicking an item in the dropbox
@@ -64,7 +71,8 @@ class ReviewSearchBox(ttk.Frame):
         # 2. Get the text
         typed = self.var.get().strip()
         if not typed:
-            self.close_list()
+            self.show_candidates()
+            return
 
         # 3. Fuzzy matching
         results = process.extract(
@@ -77,15 +85,25 @@ class ReviewSearchBox(ttk.Frame):
 
     def update_list(self, matches):
         """Updates the suggestions in the listbox"""
+        # Match format: (match_string, score, index)
+        self._fill_list([f"{match[0]} : {self.desc_list[match[2]]}" for match in matches])
+
+    def show_candidates(self):
+        """Shows the matcher's candidates, no search needed"""
+        if not self.candidates:
+            self.close_list()
+            return
+
+        self._fill_list(
+            [f"{code} : {desc} ({score}%)" for code, desc, score in self.candidates]
+        )
+
+    def _fill_list(self, texts):
         # 1. Clear old items
         self.listbox.delete(0, END)
 
         # 2. Insert new matches
-        # Match format: (match_string, score, index)
-        for match in matches:
-            code = match[0]
-            desc = self.desc_list[match[2]]
-            text = f"{code} : {desc}"
+        for text in texts:
             self.listbox.insert(END, text)
 
         # 3. Show the new listbox
@@ -169,9 +187,19 @@ class ReviewSearchBox(ttk.Frame):
 
             # 3. Close the list and focus back on Entry
             self.close_list()
+            self.picking = True
             self.entry.focus_set()
             self.entry.icursor(END)
 
+    def on_focus_in(self, event):
+        """Opens the candidates when the user enters an editable box"""
+        if self.picking:
+            self.picking = False
+            return
+        if str(self.entry.cget("state")) != "normal" or self.listbox_open:
+            return
+        self.show_candidates()
+
     def on_focus_out(self, event):
         """Safely closes the list when user clicks away"""
         self.after(100, self._check_focus)
@@ -232,11 +260,12 @@ class ReviewRow(ttk.Frame):
         row_data: dict,
         codes_list: list,
         descriptions_list: list,
+        descriptions_by_code: dict,
     ):
         super().__init__(parent)
         self.pack(fill="x", pady=2, padx=5)
 
-        # {sku, description, warehouse, flag, score}
+        # {sku, description, warehouse, flag, score, candidates}
         self.data = row_data
 
         # Search takes all the extra space
@@ -265,13 +294,21 @@ class ReviewRow(ttk.Frame):
         else:
             placeholder = ""
 
-        self.search = ReviewSearchBox(self, codes_list, descriptions_list, placeholder)
+        candidates = [
+            (c["warehouse_code"], descriptions_by_code.get(c["warehouse_code"], ""), c["score"])
+            for c in row_data.get("candidates") or []
+        ]
+        self.search = ReviewSearchBox(
+            self, codes_list, descriptions_list, placeholder, candidates
+        )
         self.search.grid(row=0, column=2, sticky="ewn", padx=5)
 
         # -- Flag --
         flag = row_data["flag"]
         if flag == "green":
             color = "success"
+        elif flag == "blue":
+            color = "info"
         elif flag == "yellow":
             color = "warning"
         else:
@@ -282,7 +319,8 @@ class ReviewRow(ttk.Frame):
         )
 
         # -- Score --
-        if flag != "green":
+        # Green and blue are exact lookups, there is no score to show
+        if flag not in ("green", "blue"):
             score_text = f"{int(row_data.get('score', 0))}%"
 
             ttk.Label(
@@ -293,7 +331,7 @@ class ReviewRow(ttk.Frame):
             ).grid(row=0, column=4, padx=5, sticky="n")
 
         # -- Confirm Button --
-        self.is_confirmed = ttk.BooleanVar(value=False if flag != "green" else True)
+        self.is_confirmed = ttk.BooleanVar(value=flag in ("green", "blue"))
 
         ttk.Checkbutton(
             self,
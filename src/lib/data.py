@@ -1,43 +1,83 @@
+from collections.abc import Iterator
+
 import pandas as pd
 
+from src.core.cleaner import is_missing
+from src.core.settings import settings
+
+
+# Review order: what needs attention first
+PRIORITY = {"yellow": 0, "red": 1, "blue": 2, "green": 3}
+FLAGS = ["green", "blue", "yellow", "red"]
+
+
+def prepare_review_data(parsed_items, matched_items) -> tuple[dict, list[dict]]:
+    """
+    Pairs every item with its match result into a list of dicts for the review rows.
+    Repeated lines (same sku and description) are reviewed once.
+    """
+    if isinstance(parsed_items, list):
+        return _review_records(parsed_items, matched_items)
 
-def prepare_review_data(parsed_items: pd.DataFrame, matched_items: pd.DataFrame) -> tuple[dict, list[dict]]:
-    """Merges the dataframes into a list of dicts for the review rows"""
     # parsed_items has [QTY, SKU, DESCRIPTION]
-    # matched_items has [sku, warehouse_code, flag, score]
+    # matched_items has [sku, warehouse_code, flag, score, candidates], one row per item
 
-    # 1. Normalize 'sku' columns for merging
-    items = parsed_items[["sku", "description"]].copy().astype(str)
-    items["sku"] = pd.Series(items["sku"]).astype(str).str.strip()
+    # 1. Side by side, the matcher keeps the order of the items
+    # (a missing description stays empty, not "<NA>" or "nan")
+    items = parsed_items[["description"]].fillna("").astype(str).reset_index(drop=True)
 
-    matches = matched_items.copy()
+    matches = matched_items.reset_index(drop=True)
     matches["sku"] = pd.Series(matches["sku"]).astype(str).str.strip()
 
-    # 2. Merge
-    merged = pd.merge(matches, items, on="sku", how="left")
+    merged = pd.concat([matches, items], axis=1)
 
-    # 3. Fill mising and reorder
-    merged["description"] = merged["description"].fillna("No description found")
-    final = merged[["sku", "description", "warehouse_code", "flag", "score"]]
+    # 2. Drop the repeats and reorder
+    merged = merged.drop_duplicates(subset=["sku", "description"])
+    final = merged[["sku", "description", "warehouse_code", "flag", "score", "candidates"]]
 
-    # 4. Generate stats
+    # 3. Generate stats
     counts = pd.Series(final["flag"]).value_counts()
-    stats = {
-        "green": int(counts.get("green", 0)),
-        "yellow": int(counts.get("yellow", 0)),
-        "red": int(counts.get("red", 0))
-    }
+    stats = {flag: int(counts.get(flag, 0)) for flag in FLAGS}
 
-    priority = {"yellow": 0, "red": 1, "green": 2}
     rows = final.assign(p=final["flag"]
-                        .map(priority))\
-                        .sort_values("p")\
+                        .map(PRIORITY))\
+                        .sort_values("p", kind="stable")\
                         .drop(columns="p")\
                         .to_dict("records")
 
     return stats, rows
 
 
+def _review_records(parsed_items: list[dict], matched_items: list[dict]) -> tuple[dict, list[dict]]:
+    """List version of prepare_review_data() for small POs, same rows in the same order"""
+    # 1. Side by side, the first of the repeated lines only
+    final = []
+    seen = set()
+    for item, match in zip(parsed_items, matched_items):
+        sku = str(match["sku"]).strip()
+        description = "" if is_missing(item["description"]) else str(item["description"])
+        if (sku, description) in seen:
+            continue
+        seen.add((sku, description))
+
+        final.append(
+            {
+                "sku": sku,
+                "description": description,
+                "warehouse_code": match["warehouse_code"],
+                "flag": match["flag"],
+                "score": match["score"],
+                "candidates": match["candidates"],
+            }
+        )
+
+    # 2. Generate stats
+    stats = {flag: sum(row["flag"] == flag for row in final) for flag in FLAGS}
+
+    rows = sorted(final, key=lambda row: PRIORITY[row["flag"]])
+    return stats, rows
+
+
 def prepare_registry_data(df: pd.DataFrame) -> list[dict]:
     """Converts the database dataframe into a list of dicts for the registry rows"""
     if df.empty:
@@ -47,25 +87,92 @@ def prepare_registry_data(df: pd.DataFrame) -> list[dict]:
     return df.fillna("-").to_dict("records")
 
 
-def prepare_export_data(parsed_items: pd.DataFrame, matched_items: pd.DataFrame) -> pd.DataFrame:
-    """Extracts Warehouse Code and Quantity for final export."""
-    # 1. Normalize SKU for merging
-    items = parsed_items.copy()
-    items["sku"] = items["sku"].astype(str).str.strip()
-
-    matches = matched_items.copy()
-    matches["sku"] = matches["sku"].astype(str).str.strip()
+def prepare_export_data(parsed_items, matched_items) -> pd.DataFrame | list[dict]:
+    """
+    Extracts Warehouse Code and Quantity for final export, one row per PO line,
+    or per warehouse code with the quantities summed (settings.aggregate_export_qty).
+    """
+    if isinstance(parsed_items, list):
+        return _export_records(parsed_items, matched_items)
 
-    # 2. Merge to get warehouse_code alongside qty
-    # matched_items should have [sku, warehouse_code, flag, score]
+    # 1. Side by side, the matcher keeps the order of the items
+    # matched_items should have [sku, warehouse_code, flag, score, candidates]
     # parsed_items should have [qty, sku, description] (based on parser)
-    merged = pd.merge(items, matches[["sku", "warehouse_code"]], on="sku", how="left")
-
-    # 3. Filter only necessary columns for WSL format
     # Basic WSL format usually is: Warehouse Code, Quantity
-    export_df = merged[["warehouse_code", "qty"]].copy()
-    
-    # Rename columns to standard names
-    export_df.columns = ["Warehouse Code", "Qty"]
-    
+    export_df = pd.DataFrame(
+        {
+            "Warehouse Code": matched_items["warehouse_code"].to_numpy(),
+            "Qty": parsed_items["qty"].to_numpy(),
+        }
+    )
+
+    # 2. One row per product
+    if settings.aggregate_export_qty:
+        export_df = pd.DataFrame(
+            _sum_quantities(export_df.to_dict("records")), columns=export_df.columns
+        )
+
     return export_df
+
+
+def prepare_export_chunks(pairs) -> Iterator[pd.DataFrame]:
+    """
+    prepare_export_data() over a stream of (items, match_results) pairs (see matcher.match_chunks).
+    Summed quantities need every line: the export rows are then kept and yielded at the end.
+    """
+    if not settings.aggregate_export_qty:
+        for items, matches in pairs:
+            yield prepare_export_data(items, matches)
+        return
+
+    rows = []
+    for items, matches in pairs:
+        rows.extend(
+            {"Warehouse Code": code, "Qty": qty}
+            for code, qty in zip(matches["warehouse_code"], items["qty"])
+        )
+    if rows:
+        yield pd.DataFrame(_sum_quantities(rows), columns=["Warehouse Code", "Qty"])
+
+
+def _export_records(parsed_items: list[dict], matched_items: list[dict]) -> list[dict]:
+    """List version of prepare_export_data() for small POs"""
+    export = [
+        {"Warehouse Code": match["warehouse_code"], "Qty": item["qty"]}
+        for item, match in zip(parsed_items, matched_items)
+    ]
+
+    if settings.aggregate_export_qty:
+        export = _sum_quantities(export)
+
+    return export
+
+
+def _sum_quantities(rows: list[dict]) -> list[dict]:
+    """
+    One row per warehouse code, in the order they first appear, with the total qty.
+    The lines of a code with a qty that isn't a number are kept as they are.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(row["Warehouse Code"], []).append(row)
+
+    summed = []
+    for code, group in groups.items():
+        quantities = [_quantity(row["Qty"]) for row in group]
+        if len(group) == 1 or None in quantities:
+            summed.extend(group)
+            continue
+
+        total = sum(quantities)
+        summed.append({"Warehouse Code": code, "Qty": int(total) if total.is_integer() else total})
+
+    return summed
+
+
+def _quantity(value) -> float | None:
+    """'1,200' -> 1200.0, None if it isn't a number"""
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
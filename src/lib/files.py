@@ -25,6 +25,7 @@ def setup_filesystem():
             settings.output_dir,
             settings.review_dir,
             settings.archive_dir,
+            settings.quarantine_dir,
         ]
         
         for f in data:
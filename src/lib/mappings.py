@@ -14,3 +14,27 @@ def save_mappings_batch(supplier, batch: list[dict]):
                 warehouse_code=mapping["warehouse_code"]
             )
         logger.info(f"Added {len(batch)} new mappings")
+
+
+@logger.catch(reraise=True)
+def save_aliases_batch(supplier, batch: list[dict]):
+    """Saves reviewed descriptions ({description, warehouse_code}) as aliases"""
+    with task_scope(f"Saving description aliases for {supplier}"):
+        db.add_description_aliases(supplier, batch)
+
+
+@logger.catch(reraise=True)
+def delete_aliases_batch(supplier, descriptions: list[str]):
+    """Forgets reviewed descriptions that were confirmed with the wrong code"""
+    with task_scope(f"Removing description aliases of {supplier}"):
+        db.delete_description_aliases(supplier, descriptions)
+
+
+@logger.catch(reraise=True)
+def save_supplier_alias(supplier):
+    """Remembers the name of a reviewed supplier, to recognize its next files by their name"""
+    # Nothing to recognize a supplier the parser didn't find by
+    if supplier == "Unknown":
+        return
+    with task_scope(f"Saving supplier alias for {supplier}"):
+        db.add_supplier_alias(supplier, supplier)
@@ -0,0 +1,79 @@
+import os
+import sys
+
+
+def current_rss_mb() -> float | None:
+    """
+    Resident memory of the process right now, in MB.
+    Unlike peak_rss_mb() it goes down again, so it can be compared before and after a task.
+    Returns None if the platform doesn't report it.
+    """
+    if sys.platform == "win32":
+        counters = _windows_counters()
+        if counters is None:
+            return None
+        return counters.WorkingSetSize / (1024 * 1024)
+
+    # Linux: size and resident pages
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Highest resident memory of the process so far (high-water mark), in MB.
+    It never goes down: only meaningful for a process that does one task (see the benchmarks).
+    Returns None if the platform doesn't report it.
+    """
+    if sys.platform == "win32":
+        counters = _windows_counters()
+        if counters is None:
+            return None
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _windows_counters():
+    """PROCESS_MEMORY_COUNTERS of the current process"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ok = ctypes.windll.psapi.GetProcessMemoryInfo(
+            process, ctypes.byref(counters), counters.cb
+        )
+    except (AttributeError, OSError):
+        return None
+
+    return counters if ok else None
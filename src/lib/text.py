@@ -0,0 +1,57 @@
+import re
+
+from src.core.cleaner import is_missing
+
+# Bump when the pipeline changes, stored normalizations of older versions are redone
+NORMALIZER_VERSION = 3
+
+# Supplier part numbers: "REF:1234", "SKU#1234", "ITEM-ID: 1234", "PN:1234", "VEND:1234"
+PART_NUMBER = re.compile(r"\b(?:ref|sku|item-id|item|pn|p/n|vend|part)\s*[:#]\s*\w+")
+# A bare part number in front of the description: "8092 - Polished 50lb Sensor"
+# (set apart by a separator, "2500 ft Cable" is a length)
+LEADING_NUMBER = re.compile(r"^\s*\d{3,}\s*[-:/]\s")
+# Tags: "[RUSH]". Grades and revisions ("(G8)", "REV.2", "GRADE A") tell products apart, they stay
+TAGS = re.compile(r"\[[^\]]*\]")
+# A compound split by the extraction: "Heavy- Duty"
+SPLIT_HYPHEN = re.compile(r"(?<=[a-z])-\s+(?=[a-z])")
+# Words, keeping the inner punctuation of sizes and compounds ("1/2-inch", "0.5-hp")
+WORD = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+
+
+def description_tokens(text, catalog=False) -> list[str]:
+    """
+    The words of a description without the supplier noise, lowercase and sorted.
+    A catalog description keeps its numbers: "1000 ft" is no supplier part number there.
+    """
+    if text is None:
+        return []
+
+    text = str(text).lower()
+    if not catalog:
+        # The bare number first: once "REF:1234" is gone, a number of the description leads
+        text = LEADING_NUMBER.sub(" ", text)
+        text = PART_NUMBER.sub(" ", text)
+    text = TAGS.sub(" ", text)
+    text = SPLIT_HYPHEN.sub("-", text)
+
+    return sorted(WORD.findall(text))
+
+
+def fold_description(text) -> str:
+    """
+    The description as written, only case and whitespace folded.
+    Keys reviewed descriptions: "Grade A" and "Grade B" stay different products.
+    A missing description (None, NaN, NA) folds to "", which is never a key.
+    """
+    # str(pd.NA) is "<NA>": it would confirm every line without a description
+    if is_missing(text):
+        return ""
+    return " ".join(str(text).lower().split())
+
+
+def normalize_description(text, catalog=False) -> str:
+    """
+    The description as sorted words separated by single spaces.
+    fuzz.ratio on two of these gives token_sort_ratio without re-sorting them.
+    """
+    return " ".join(description_tokens(text, catalog))
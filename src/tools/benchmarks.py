@@ -0,0 +1,601 @@
+"""
+Parser and matcher benchmarks.
+
+Generates seeded PO corpora with PoGenerator (1, 10, 100 and 500 pages, ruled and
+whitespace layouts, wrapped descriptions) and measures PdfParser on them:
+pages/sec, rows/sec, peak memory and the time spent in every stage.
+
+Every PO is parsed by every extraction engine, twice, against its own empty database:
+"cold" runs the table finder and learns the supplier, "warm" reuses what was learned.
+Each parse runs in a fresh process so the memory high-water mark belongs to it alone.
+
+Results go to Internal/Benchmarks as JSON. If a baseline is stored there,
+any case that got slower, heavier or returns a different row count fails the run.
+
+The matcher benchmark builds catalogs of 1k to 1M products (catalog_gen descriptions),
+seeds the supplier history (known SKUs and reviewed descriptions) and matches a batch
+of POs with scrambled descriptions, delivery splits and unknown products. Every matcher
+engine (settings.matcher_engine), on raw and normalized descriptions, runs in a fresh
+process: lines/sec, p50/p99 latency per PO, peak memory, the green/blue/yellow/red
+split and the share of lines given the right code. The exact engines have to agree
+with a full scan. Results and baseline work like the parser's.
+
+Usage:
+    python -m src.tools.benchmarks                  # full suite, compared to the baseline
+    python -m src.tools.benchmarks --sizes 1 10     # smaller corpus
+    python -m src.tools.benchmarks --save-baseline  # store this run as the new baseline
+    python -m src.tools.benchmarks --matcher        # matcher engines instead of the parser
+    python -m src.tools.benchmarks --matcher --sizes 1000 10000  # smaller catalogs
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.core.settings import settings
+
+CORPUS_PAGES = [1, 10, 100, 500]
+LAYOUTS = {"ruled": True, "whitespace": False}
+PASSES = ["cold", "warm"]
+# Extraction engines compared head-to-head (settings.extraction_engine)
+ENGINES = ["table_finder", "clustering"]
+
+# Same corpus on every run
+BENCHMARK_SEED = 1234
+# Short enough that most descriptions wrap onto a second line
+WRAP_WIDTH = 24
+
+# How much slower/heavier than the baseline a case may get before the run fails
+REGRESSION_TOLERANCE = 0.25
+# Timing noise (seconds) ignored on top of that, tiny cases jitter a lot
+TIMING_SLACK = 0.1
+
+BASELINE_FILE = "parser_baseline.json"
+
+# -- Matcher --
+CATALOG_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+MATCHER_ENGINES = ["row", "batched", "blocked"]
+# Engines that have to give exactly the results of "row", the others report their accuracy
+EXACT_ENGINES = ["row", "batched"]
+# The row engine is the reference, on larger catalogs it takes too long to run
+ROW_MAX_PRODUCTS = 100_000
+# Share of the catalog the supplier history knows by SKU, and by a reviewed description
+HISTORY_SHARE = 0.3
+ALIAS_SHARE = 0.05
+# PO batch: POs, lines per PO (min, max), share of lines repeated (delivery splits)
+# and of lines for products that aren't in the catalog
+PO_COUNT = 20
+PO_LINES = (5, 60)
+REPEAT_SHARE = 0.1
+UNKNOWN_SHARE = 0.05
+
+MATCHER_BASELINE_FILE = "matcher_baseline.json"
+
+
+def parser_benchmark(sizes=None, save_baseline=False) -> bool:
+    """
+    Runs the parser benchmark suite.
+    Returns False if a case regressed against the stored baseline.
+    """
+    from src.tools.po_generator import PoGenerator
+
+    sizes = sizes or CORPUS_PAGES
+    print("\n--- ⏱️ STARTING PARSER BENCHMARK ---")
+
+    cases = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout, ruled in LAYOUTS.items():
+            for pages in sizes:
+                # 1. Generate the corpus document and its own empty database
+                case_dir = Path(tmp) / f"{layout}-{pages}"
+                case_dir.mkdir()
+                pogen = PoGenerator(
+                    output_dir=case_dir,
+                    seed=BENCHMARK_SEED + pages,
+                    page_count=pages,
+                    ruled=ruled,
+                    wrap_width=WRAP_WIDTH,
+                )
+                pogen.generate_pdf()
+
+                # 2. Parse it cold, then warm, with every engine
+                # (a database per engine: what one learns never serves the other)
+                for engine in ENGINES:
+                    db_path = case_dir / f"{engine}.db"
+                    for run in PASSES:
+                        name = f"{layout}-{pages}p/{engine}/{run}"
+                        result = _measure_isolated(pogen.path, db_path, engine)
+                        result.update(
+                            {
+                                "pages": pages,
+                                "expected_rows": len(pogen.po_table),
+                                "pages_per_sec": pages / result["seconds"],
+                                "rows_per_sec": result["rows"] / result["seconds"],
+                            }
+                        )
+                        cases[name] = result
+                        _print_case(name, result)
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": cases,
+    }
+
+    # 3. Save the results, compare them to the baseline
+    out_dir = settings.benchmarks_path
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    out_file = out_dir / f"parser_{stamp}.json"
+    out_file.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {out_file}")
+
+    baseline_file = out_dir / BASELINE_FILE
+    if save_baseline:
+        baseline_file.write_text(json.dumps(report, indent=2))
+        print(f"✅ Baseline saved to {baseline_file}")
+        return True
+
+    if not baseline_file.exists():
+        print("No baseline stored, run with --save-baseline to create one")
+        return True
+
+    baseline = json.loads(baseline_file.read_text())
+    failures = compare_to_baseline(cases, baseline["cases"])
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ No regression against the baseline")
+    return not failures
+
+
+def compare_to_baseline(cases, baseline) -> list[str]:
+    """Returns a description of every case that regressed"""
+    failures = []
+    for name, result in cases.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        if result["error"] and not base["error"]:
+            failures.append(f"{name}: {result['error']}")
+        elif result["rows"] != base["rows"]:
+            failures.append(f"{name}: {result['rows']} rows, baseline had {base['rows']}")
+
+        ceiling = base["seconds"] * (1 + REGRESSION_TOLERANCE) + TIMING_SLACK
+        if result["seconds"] > ceiling:
+            failures.append(
+                f"{name}: {result['pages_per_sec']:.1f} pages/s, "
+                f"baseline {base['pages_per_sec']:.1f} pages/s"
+            )
+
+        if result["peak_mb"] is not None and base["peak_mb"] is not None:
+            ceiling = base["peak_mb"] * (1 + REGRESSION_TOLERANCE)
+            if result["peak_mb"] > ceiling:
+                failures.append(
+                    f"{name}: peak {result['peak_mb']:.0f} MB, "
+                    f"baseline {base['peak_mb']:.0f} MB"
+                )
+
+    return failures
+
+
+def _measure_isolated(pdf_path, db_path, engine) -> dict:
+    """Parses the file in a fresh process"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_measure, str(pdf_path), str(db_path), engine).result()
+
+
+def _measure(pdf_path, db_path, engine) -> dict:
+    """
+    Process entry point.
+    Runs PdfParser.run() and collects its timing spans per stage.
+    """
+    from loguru import logger
+
+    from src.core.database import database as db
+    from src.core.pdf_parser import PdfParser
+    from src.core.timing import add_sink, remove_sink
+    from src.lib.memory import peak_rss_mb
+
+    # Only problems on the console, and a database of its own
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    db.path = db_path
+    db._initialize()
+    settings.extraction_engine = engine
+
+    stages = {}
+
+    def collect(record):
+        stage = record["stage"].removeprefix("parser.")
+        stages[stage] = stages.get(stage, 0.0) + record["seconds"]
+
+    add_sink(collect)
+    error = None
+    items = None
+    supplier = None
+    start = time.perf_counter()
+    try:
+        with PdfParser(pdf_path) as parser:
+            supplier, items = parser.run()
+    except Exception as e:
+        # A parse failure is a result too, the Worker would skip this file
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    remove_sink(collect)
+
+    return {
+        "supplier": supplier,
+        "rows": 0 if items is None else len(items),
+        "error": error,
+        "seconds": seconds,
+        "stages": stages,
+        "peak_mb": peak_rss_mb(),
+    }
+
+
+def matcher_benchmark(sizes=None, save_baseline=False) -> bool:
+    """
+    Runs the matcher benchmark suite.
+    Returns False if the exact engines disagree, or a case regressed against the stored baseline.
+    """
+    import random
+
+    from src.core.database import database as db
+    from src.tools.po_generator import PoGenerator
+
+    sizes = sizes or CATALOG_SIZES
+    print("\n--- ⏱️ STARTING MATCHER BENCHMARK ---")
+    random.seed(BENCHMARK_SEED)
+
+    db_path = db.path
+    cases = {}
+    # Time to build the test data of every size, kept apart from the matcher cases
+    setup = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pogen = PoGenerator(output_dir=tmp)
+        try:
+            for size in sizes:
+                # 1. A catalog of its own, with the supplier's history
+                case_db = Path(tmp) / f"catalog-{size}.db"
+                start = time.perf_counter()
+                catalog = _build_catalog(case_db, size, pogen)
+                build_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                pos = _po_batch(catalog, pogen)
+                batch_seconds = time.perf_counter() - start
+
+                lines = sum(len(items) for items, _ in pos)
+                setup[str(size)] = {
+                    "catalog_seconds": build_seconds,
+                    "po_batch_seconds": batch_seconds,
+                }
+                print(
+                    f"{size:>9,} products  {len(pos)} POs, {lines} lines  "
+                    f"(catalog built in {build_seconds:.1f}s, POs in {batch_seconds:.1f}s)"
+                )
+
+                # 2. The same POs through every engine and setting, in a fresh process each
+                results = {}
+                for normalized in (False, True):
+                    for engine in MATCHER_ENGINES:
+                        if engine == "row" and size > ROW_MAX_PRODUCTS:
+                            continue
+                        key = f"{engine}/normalized" if normalized else engine
+                        result = _measure_matcher_isolated(
+                            case_db, pogen.supplier, pos, engine, normalized
+                        )
+                        results[key] = result.pop("results")
+                        result["products"] = size
+                        cases[f"{size}/{key}"] = result
+                        _print_matcher_case(key, result)
+
+                # 3. The exact engines have to agree with a full scan, candidates included
+                for key in results:
+                    engine, _, setting = key.partition("/")
+                    reference = "/".join(filter(None, ["row", setting]))
+                    if engine in EXACT_ENGINES and reference in results:
+                        if results[key] != results[reference]:
+                            failures.append(f"{size}/{key}: results differ from {reference}")
+        finally:
+            db.path = db_path
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "setup": setup,
+        "cases": cases,
+    }
+
+    # 4. Save the results, compare them to the baseline
+    out_dir = settings.benchmarks_path
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    out_file = out_dir / f"matcher_{stamp}.json"
+    out_file.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {out_file}")
+
+    baseline_file = out_dir / MATCHER_BASELINE_FILE
+    if save_baseline:
+        baseline_file.write_text(json.dumps(report, indent=2))
+        print(f"✅ Baseline saved to {baseline_file}")
+    elif not baseline_file.exists():
+        print("No matcher baseline stored, run with --save-baseline to create one")
+    else:
+        baseline = json.loads(baseline_file.read_text())
+        failures += compare_matcher_to_baseline(cases, baseline["cases"])
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Exact engines agree, no regression against the baseline")
+    return not failures
+
+
+def compare_matcher_to_baseline(cases, baseline) -> list[str]:
+    """Returns a description of every matcher case that regressed"""
+    failures = []
+    for name, result in cases.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        if result["flags"] != base["flags"]:
+            failures.append(f"{name}: flags {result['flags']}, baseline had {base['flags']}")
+
+        ceiling = base["seconds"] * (1 + REGRESSION_TOLERANCE) + TIMING_SLACK
+        if result["seconds"] > ceiling:
+            failures.append(
+                f"{name}: {result['lines_per_sec']:.0f} lines/s, "
+                f"baseline {base['lines_per_sec']:.0f} lines/s"
+            )
+
+        if result["peak_mb"] is not None and base["peak_mb"] is not None:
+            ceiling = base["peak_mb"] * (1 + REGRESSION_TOLERANCE)
+            if result["peak_mb"] > ceiling:
+                failures.append(
+                    f"{name}: peak {result['peak_mb']:.0f} MB, "
+                    f"baseline {base['peak_mb']:.0f} MB"
+                )
+
+    return failures
+
+
+def _build_catalog(db_path, size, pogen) -> list[tuple[str, str]]:
+    """
+    Fills a new database with 'size' products, maps part of them to the supplier
+    and stores a reviewed description for another part. Returns the products.
+    """
+    from src.core.database import database as db
+    from src.tools.catalog_generator import item_data_gen
+
+    db.path = db_path
+    db._initialize()
+    column = db._ensure_supplier(pogen.supplier)
+
+    # catalog_gen() descriptions, a model number keeps them unique like a real catalog
+    catalog = [(f"WH-{i:07}", f"{item_data_gen()} Type-{i:07}") for i in range(size)]
+    conn = db._get_connection()
+    conn.executemany("INSERT INTO products VALUES (?, ?)", catalog)
+    conn.executemany(
+        f'INSERT INTO mappings (warehouse_code, "{column}") VALUES (?, ?)',
+        [
+            (code, f"SK-{i:07}" if _history_kind(i) == "sku" else None)
+            for i, (code, _) in enumerate(catalog)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    db.add_description_aliases(
+        pogen.supplier,
+        [
+            {"description": _supplier_wording(pogen, i, description), "warehouse_code": code}
+            for i, (code, description) in enumerate(catalog)
+            if _history_kind(i) == "alias"
+        ],
+    )
+    # Normalized once here, like add_product would, not by the first measured run
+    db.get_normalized_map()
+
+    return catalog
+
+
+def _history_kind(index) -> str | None:
+    """What the supplier history knows about the product: its SKU, a reviewed description or nothing"""
+    share = index % 100
+    if share < HISTORY_SHARE * 100:
+        return "sku"
+    if share < (HISTORY_SHARE + ALIAS_SHARE) * 100:
+        return "alias"
+    return None
+
+
+def _supplier_wording(pogen, index, description) -> str:
+    """The supplier's scrambled description of a product, the same on every PO"""
+    import random
+
+    state = random.getstate()
+    random.seed(index)
+    try:
+        return pogen._scramble_text(description)
+    finally:
+        random.setstate(state)
+
+
+def _po_batch(catalog, pogen) -> list[tuple[list[dict], list[str | None]]]:
+    """
+    POs like the supplier sends them: known SKUs, scrambled descriptions,
+    delivery splits and products missing from the catalog.
+    Returns (items, expected warehouse codes) per PO.
+    """
+    import random
+
+    from src.tools.catalog_generator import item_data_gen
+
+    pos = []
+    for po in range(PO_COUNT):
+        items = []
+        codes = []
+        for line in range(random.randint(*PO_LINES)):
+            # Same product again, another delivery date
+            if items and random.random() < REPEAT_SHARE:
+                repeat = random.randrange(len(items))
+                items.append(dict(items[repeat], qty=str(random.randint(1, 50))))
+                codes.append(codes[repeat])
+                continue
+
+            if random.random() < UNKNOWN_SHARE:
+                code, sku = None, None
+                text = pogen._scramble_text(f"{item_data_gen()} Type-X{po}{line}")
+            else:
+                i = random.randrange(len(catalog))
+                code, description = catalog[i]
+                sku = f"SK-{i:07}" if _history_kind(i) == "sku" else None
+                # Reviewed before: worded like then
+                if _history_kind(i) == "alias":
+                    text = _supplier_wording(pogen, i, description)
+                else:
+                    text = pogen._scramble_text(description)
+
+            items.append(
+                {
+                    "qty": str(random.randint(1, 50)),
+                    "sku": sku or f"XX-{po:02}{line:03}",
+                    "description": text,
+                }
+            )
+            codes.append(code)
+        pos.append((items, codes))
+
+    return pos
+
+
+def _measure_matcher_isolated(db_path, supplier, pos, engine, normalized) -> dict:
+    """Matches the POs in a fresh process"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(
+            _measure_matcher, str(db_path), supplier, pos, engine, normalized
+        ).result()
+
+
+def _measure_matcher(db_path, supplier, pos, engine, normalized) -> dict:
+    """
+    Process entry point.
+    Loads the match index, then runs fuzzy_match on every PO.
+    """
+    import numpy as np
+    from loguru import logger
+
+    from src.core.database import database as db
+    from src.core.match_index import match_index
+    from src.core.matcher import fuzzy_match
+    from src.lib.memory import peak_rss_mb
+
+    # Only problems on the console
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    db.path = db_path
+    settings.matcher_engine = engine
+    settings.normalize_descriptions = normalized
+
+    # 1. Everything a PO of this supplier needs in memory, timed on its own
+    start = time.perf_counter()
+    match_index.history(supplier)
+    match_index.aliases(supplier)
+    catalog = match_index.catalog(normalized)
+    if engine == "blocked":
+        match_index.search_state(catalog)
+    load_seconds = time.perf_counter() - start
+
+    # 2. One PO at a time, like the Worker
+    latencies = []
+    results = []
+    flags = {"green": 0, "blue": 0, "yellow": 0, "red": 0}
+    right = 0
+    for items, codes in pos:
+        start = time.perf_counter()
+        matches = fuzzy_match(po_items=items, supplier=supplier)
+        latencies.append(time.perf_counter() - start)
+
+        for match, code in zip(matches, codes):
+            flags[match["flag"]] += 1
+            right += match["warehouse_code"] == code
+            candidates = tuple((c["warehouse_code"], c["score"]) for c in match["candidates"])
+            results.append((match["warehouse_code"], match["flag"], match["score"], candidates))
+
+    seconds = sum(latencies)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {
+        "engine": engine,
+        "normalized": normalized,
+        "pos": len(pos),
+        "lines": len(results),
+        "load_seconds": load_seconds,
+        "seconds": seconds,
+        "lines_per_sec": len(results) / seconds,
+        "p50_ms": float(p50),
+        "p99_ms": float(p99),
+        "peak_mb": peak_rss_mb(),
+        "flags": flags,
+        "right_code": right / len(results),
+        "results": results,
+    }
+
+
+def _print_matcher_case(name, result):
+    peak = "n/a" if result["peak_mb"] is None else f"{result['peak_mb']:.0f} MB"
+    flags = "/".join(str(n) for n in result["flags"].values())
+    print(
+        f"    {name:<19} {result['lines_per_sec']:>8.0f} lines/s  "
+        f"p50 {result['p50_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  "
+        f"peak {peak:>7}  load {result['load_seconds']:>5.1f}s  "
+        f"G/B/Y/R {flags}  right code {result['right_code']:.1%}"
+    )
+
+
+def _print_case(name, result):
+    stages = ", ".join(f"{k} {v:.2f}s" for k, v in result["stages"].items())
+    peak = "n/a" if result["peak_mb"] is None else f"{result['peak_mb']:.0f} MB"
+    if result["error"]:
+        print(f"{name:<36} ❌ {result['error']}")
+        return
+    print(
+        f"{name:<36} {result['pages_per_sec']:>8.1f} pages/s "
+        f"{result['rows_per_sec']:>8.1f} rows/s  "
+        f"{result['rows']}/{result['expected_rows']} rows  peak {peak}  [{stages}]"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PdfParser and matcher benchmark suite")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", help="corpus sizes in pages (products with --matcher)"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store this run as the baseline"
+    )
+    parser.add_argument(
+        "--matcher", action="store_true", help="benchmark the matcher engines (sizes in products)"
+    )
+    args = parser.parse_args()
+
+    if args.matcher:
+        ok = matcher_benchmark(sizes=args.sizes, save_baseline=args.save_baseline)
+    else:
+        ok = parser_benchmark(sizes=args.sizes, save_baseline=args.save_baseline)
+    sys.exit(0 if ok else 1)
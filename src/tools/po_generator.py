@@ -1,6 +1,7 @@
 import datetime
 import random
 import textwrap
+from pathlib import Path
 
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
@@ -10,13 +11,40 @@ from src.tools.catalog_generator import catalog_gen
 
 
 class PoGenerator:
-    def __init__(self):
+    def __init__(
+        self,
+        output_dir=None,
+        seed=None,
+        page_count=None,
+        ruled=False,
+        wrap_width=70,
+        repeat_header=True,
+    ):
+        # Same seed, same PO (used by the benchmarks)
+        if seed is not None:
+            random.seed(seed)
+
         self.po_table = []
 
+        # Fill exactly this many pages instead of a random item count
+        self.page_count = page_count
+        self.page = 1
+        # Ruled: a full grid around the table, otherwise columns separated by whitespace
+        self.ruled = ruled
+        # Descriptions longer than this wrap onto extra lines
+        self.wrap_width = wrap_width
+        # Draw the column headers again on every continuation page
+        self.repeat_header = repeat_header
+        # Items drawn on every page
+        self.page_rows = [0]
+
         # Calculate the PO number here,
         # It is also used as the name for the file
         self.po_num = f"PO-{random.randint(10000, 99999)}.pdf"
-        self.path = settings.input_dir / self.po_num
+        # Defaults to the Input folder so the app picks it up
+        if output_dir is None:
+            output_dir = settings.input_dir
+        self.path = Path(output_dir) / self.po_num
 
         # Define the supplier here to make a custom SKU for each one
         self.suppliers = ["Acme Supplies", "Global Corp", "Tech Solutions"]
@@ -33,6 +61,10 @@ class PoGenerator:
         self.col_desc = 160
         self.col_price = 450
         self.col_total = 520
+        # Grid lines between the columns (ruled layout)
+        self.grid_x = [35, 75, 155, 445, 515, 565]
+        # Top of the grid on the current page
+        self.grid_top = None
 
         self.total_amount = 0.0
 
@@ -67,46 +99,34 @@ class PoGenerator:
 
     def _create_pdf_table(self):
         # --- TABLE HEADERS ---
-        self.canvas.setFont("Helvetica-Bold", 10)
+        self._draw_table_header()
 
-        self.canvas.drawString(self.col_qty, self.y, "QTY")
-        self.canvas.drawString(self.col_desc, self.y, "DESCRIPTION")
-        self.canvas.drawString(self.col_sku, self.y, "SKU")
-        self.canvas.drawString(self.col_price, self.y, "UNIT PRICE")
-        self.canvas.drawString(self.col_total, self.y, "TOTAL")
-
-        # Draw a line under headers
-        self.canvas.line(40, self.y - 5, 560, self.y - 5)
-
-        # --- TABLE ROWS ---
-        self.y -= 25  # Move down
-        self.canvas.setFont("Helvetica", 10)
-
-        for item in self.po_table:
+        for index, item in enumerate(self.po_table):
             # 1. Wrap the text
-            wrapped_lines = textwrap.wrap(item["Description"], width=70)
+            wrapped_lines = textwrap.wrap(item["Description"], width=self.wrap_width)
 
             # 2. calculate height of this row based on how many lines we have
             # 12 points per line for size 10 font
             row_height = len(wrapped_lines) * 12
 
             # 3. check if we need a new page before we start drawing
-            if self.y - row_height < 50:
+            # (the last page of a fixed size PO keeps room for the footer)
+            last_page = self.page_count is not None and self.page >= self.page_count
+            if self.y - row_height < (80 if last_page else 50):
+                if last_page:
+                    # Full: the items that didn't fit are not part of the PO
+                    self.po_table = self.po_table[:index]
+                    break
+
+                self._close_grid()
                 self.canvas.showPage()
+                self.page += 1
+                self.page_rows.append(0)
                 self.y = 800
 
                 # --- REDRAW HEADERS ---
-                self.canvas.setFont("Helvetica-Bold", 10)
-                self.canvas.drawString(self.col_qty, self.y, "QTY")
-                self.canvas.drawString(self.col_sku, self.y, "SKU")
-                self.canvas.drawString(self.col_desc, self.y, "DESCRIPTION")
-                self.canvas.drawString(self.col_price, self.y, "UNIT PRICE")
-                self.canvas.drawString(self.col_total, self.y, "TOTAL")
-                self.canvas.line(40, self.y - 5, 560, self.y - 5)
-
-                # Reset for data
-                self.y -= 25
-                self.canvas.setFont("Helvetica", 10)
+                if self.repeat_header:
+                    self._draw_table_header()
 
             # 4. Draw Qty, SKU, Price, Total
             self.canvas.drawString(self.col_qty, self.y, str(item["Qty"]))
@@ -122,11 +142,49 @@ class PoGenerator:
 
             # 6. Update Stats
             self.total_amount += item["Total"]
+            self.page_rows[-1] += 1
 
             # 7. Move the main cursor down for the next item
             # We move down by the height of the text + some padding
             self.y -= row_height + 10
 
+            # 8. Ruled layout: a line under every row
+            if self.ruled:
+                self.canvas.line(self.grid_x[0], self.y + 12, self.grid_x[-1], self.y + 12)
+
+        self._close_grid()
+
+    def _draw_table_header(self):
+        self.canvas.setFont("Helvetica-Bold", 10)
+        self.canvas.drawString(self.col_qty, self.y, "QTY")
+        self.canvas.drawString(self.col_sku, self.y, "SKU")
+        self.canvas.drawString(self.col_desc, self.y, "DESCRIPTION")
+        self.canvas.drawString(self.col_price, self.y, "UNIT PRICE")
+        self.canvas.drawString(self.col_total, self.y, "TOTAL")
+
+        if self.ruled:
+            # Box the header: a line above, the rows bring their own below
+            self.grid_top = self.y + 12
+            self.canvas.line(self.grid_x[0], self.grid_top, self.grid_x[-1], self.grid_top)
+            self.canvas.line(self.grid_x[0], self.y - 13, self.grid_x[-1], self.y - 13)
+        else:
+            # Draw a line under headers
+            self.canvas.line(40, self.y - 5, 560, self.y - 5)
+
+        # Reset for data
+        self.y -= 25  # Move down
+        self.canvas.setFont("Helvetica", 10)
+
+    def _close_grid(self):
+        """Ruled layout: draws the column lines from the header to the last row"""
+        if not self.ruled or self.grid_top is None:
+            return
+
+        bottom = self.y + 12
+        for x in self.grid_x:
+            self.canvas.line(x, self.grid_top, x, bottom)
+        self.grid_top = None
+
     def _create_pdf_footer(self):
         # --- FOOTER / TOTALS ---
         # Draw logic only if we aren't at the very bottom, else flip page first
@@ -145,9 +203,13 @@ class PoGenerator:
         items = catalog_gen()
         descriptions = items.iloc[:, 1].tolist()  # The description
 
-        # Shrink the list
-        count = min(len(descriptions), random.randint(4, 20))
-        descriptions = random.sample(descriptions, k=count)
+        if self.page_count is None:
+            # Shrink the list
+            count = min(len(descriptions), random.randint(4, 20))
+            descriptions = random.sample(descriptions, k=count)
+        else:
+            # More than fits on the pages, the table drawing cuts the rest
+            descriptions = random.choices(descriptions, k=self.page_count * 70)
 
         # Scramble them and add some random words
         descriptions = [self._scramble_text(t) for t in descriptions]
@@ -1,4 +1,9 @@
+import tempfile
 import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
 
 from src.core.database import database as db
 from src.tools.po_generator import PoGenerator
@@ -105,3 +110,1150 @@ def registry_stress_test():
             print(f"Processed {i}/{count} items...")
 
     print("✅ Registry stress test complete")
+
+
+def cleaner_test(count=30, seed=42):
+    """
+    Checks that the table cleaner gives the same output as the original
+    pandas implementation (_legacy_clean below) on a generated PO corpus.
+    """
+    import random
+    import tempfile
+
+    from src.core.cleaner import clean_frame
+    from src.core.pdf_parser import PdfParser
+
+    print("\n--- 🧪 STARTING CLEANER TEST ---")
+    random.seed(seed)
+
+    raw_tables = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(count):
+            pogen = PoGenerator(output_dir=tmp)
+            pogen.generate_pdf()
+
+            # Raw table finder output, the same way PdfParser._extract_table builds it
+            full_table = []
+            with PdfParser(pogen.path) as parser:
+                parser._pdf_opener(str(pogen.path))
+                for page in parser.pages:
+                    rows, _ = parser._extract_page(page)
+                    full_table.extend(rows)
+
+            if full_table:
+                raw_tables.append((full_table[0], full_table[1:]))
+
+    # Split columns, ghost headers and blank cells the generator doesn't produce
+    raw_tables += [
+        (
+            ["QTY", "SKU", None, "DESCRIPTION", "", "UNIT PRICE"],
+            [
+                ["4", "AS-0", "12", "Galvanized B olt", "M8", "$1.00"],
+                ["QTY", "SKU", None, "DESCRIPTION", "", "UNIT PRICE"],
+                ["", "", None, "   ", None, ""],
+                ["7", "AS-1", None, "Pipe\n2-inch", "", "$3.50"],
+            ],
+        ),
+        (
+            ["Qty", "Part", "Number", "Desc", "Desc"],
+            [["1", "GC-1", "", "Valve", "x"], ["2", "GC-2", " ", "Seal", None]],
+        ),
+    ]
+
+    failures = 0
+    legacy_time = 0.0
+    new_time = 0.0
+    for header, rows in raw_tables:
+        start = time.perf_counter()
+        expected = _legacy_clean(pd.DataFrame(rows, columns=header))
+        legacy_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = clean_frame(pd.DataFrame(rows, columns=header))
+        new_time += time.perf_counter() - start
+
+        if not result.equals(expected):
+            failures += 1
+            print(f"❌ Mismatch for header {header}")
+            print(expected)
+            print(result)
+
+    print(f"Legacy: {legacy_time * 1000:.1f} ms, new: {new_time * 1000:.1f} ms")
+    if failures:
+        print(f"❌ FAILURE! {failures}/{len(raw_tables)} tables differ")
+    else:
+        print(f"✅ SUCCESS! {len(raw_tables)} tables identical")
+    return failures == 0
+
+
+def _legacy_clean(df):
+    """The original PdfParser._clean_table, kept as the reference for cleaner_test"""
+    from src.core.cleaner import COLUMN_ALIASES
+
+    if df.empty:
+        return df
+
+    df.columns = df.columns.astype(str).str.replace("\n", "").str.strip().str.lower()
+
+    new_columns = []
+    seen_counts = {}
+    for col in df.columns:
+        col_name = col.strip()
+        if col_name in seen_counts:
+            seen_counts[col_name] += 1
+            new_col = f"{col_name}.{seen_counts[col_name]}"
+        else:
+            seen_counts[col_name] = 0
+            new_col = col_name
+        new_columns.append(new_col)
+    df.columns = new_columns
+
+    df.rename(columns=COLUMN_ALIASES, inplace=True)
+
+    cols_to_drop = [
+        c for c in df.columns if any(x in c for x in ["price", "total", "amount", "cost"])
+    ]
+    df = df.drop(columns=cols_to_drop)
+
+    def is_header_bad(col_name):
+        name = str(col_name).lower()
+        return (
+            name == "nan"
+            or "unnamed" in name
+            or name == ""
+            or name == "none"
+            or name.startswith(".")
+        )
+
+    i = 1
+    while i < len(df.columns):
+        curr_col = df.columns[i]
+        prev_col = df.columns[i - 1]
+        if is_header_bad(curr_col):
+            df[prev_col] = (
+                df[prev_col].astype(str).replace("nan", "")
+                + " "
+                + df[curr_col].astype(str).replace("nan", "")
+            ).str.strip()
+            df.drop(columns=[curr_col], inplace=True)
+        else:
+            i += 1
+
+    df = df.replace(r"^\s*$", pd.NA, regex=True)
+
+    i = 1
+    while i < len(df.columns):
+        curr_col = df.columns[i]
+        prev_col = df.columns[i - 1]
+        if df[curr_col].isna().all():
+            new_name = str(prev_col) + str(curr_col)
+            df.rename(columns={prev_col: new_name}, inplace=True)
+            df.drop(columns=[curr_col], inplace=True)
+        else:
+            i += 1
+
+    if len(df.columns) > 0:
+        first_col = df.columns[0]
+        df = df[df[first_col].astype(str) != str(first_col)]
+
+    df = df.replace(r"\n", "", regex=True)
+    df = df.replace(r"(?<=[a-zA-Z])\s(?=[a-z])", "", regex=True)
+    df = df.dropna(how="all").reset_index(drop=True)
+    df = df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
+    return df
+
+
+def small_po_test(count=20, seed=7):
+    """
+    Checks that small POs give the same review rows, stats and export files
+    on the list of dicts path as on the pandas path.
+    """
+    import random
+
+    from src.core.exporter import Exporter
+    from src.core.matcher import fuzzy_match
+    from src.core.pdf_parser import PdfParser
+    from src.core.settings import settings
+    from src.lib.data import prepare_export_data, prepare_review_data
+
+    print("\n--- 🧪 STARTING SMALL PO TEST ---")
+    random.seed(seed)
+
+    failures = 0
+    timings = {0: 0.0, 30: 0.0}
+    with _scratch("small_po_rows", "export_format") as tmp:
+        pos = []
+        for _ in range(count):
+            pogen = PoGenerator(output_dir=tmp)
+            pogen.generate_pdf()
+            pos.append(pogen)
+
+        exporter = Exporter()
+        exporter.output_dir = tmp
+        for pogen in pos:
+            outputs = {}
+            for rows in timings:
+                # Same empty database for both paths, half the SKUs known, a few products
+                _use_db(tmp / f"{pogen.path.stem}-{rows}.db")
+                for i, item in enumerate(pogen.po_table):
+                    db.add_product(f"WH-{i:03}", item["Description"])
+                    if i % 2 == 0:
+                        db.add_mapping(pogen.supplier, item["SKU"], f"WH-{i:03}")
+
+                settings.small_po_rows = rows
+                start = time.perf_counter()
+                with PdfParser(pogen.path) as parser:
+                    supplier, items = parser.run()
+                matches = fuzzy_match(po_items=items, supplier=supplier)
+                review = prepare_review_data(items, matches)
+                export = prepare_export_data(items, matches)
+
+                files = []
+                for fmt in [".csv", ".xlsx"]:
+                    settings.export_format = fmt
+                    path = exporter.run(export, f"{pogen.path.stem}-{rows}")
+                    files.append(_export_content(path))
+                timings[rows] += time.perf_counter() - start
+
+                outputs[rows] = (review, files, isinstance(items, list))
+
+            pandas_out, small_out = outputs[0], outputs[30]
+            if not small_out[2]:
+                failures += 1
+                print(f"❌ {pogen.po_num} didn't take the small PO path")
+            elif pandas_out[:2] != small_out[:2]:
+                failures += 1
+                print(f"❌ Mismatch for {pogen.po_num}")
+
+    print(f"pandas: {timings[0] * 1000:.1f} ms, small path: {timings[30] * 1000:.1f} ms")
+    if failures:
+        print(f"❌ FAILURE! {failures}/{count} POs differ")
+    else:
+        print(f"✅ SUCCESS! {count} POs identical")
+    return failures == 0
+
+
+def _export_content(path):
+    """Text of a csv, cell values of an xlsx"""
+    from openpyxl import load_workbook
+
+    if path.suffix == ".csv":
+        return path.read_bytes()
+
+    sheet = load_workbook(path).active
+    return sheet.title, [
+        [(cell.value, cell.font.b, cell.alignment.horizontal) for cell in row]
+        for row in sheet.iter_rows()
+    ]
+
+
+# Line format of PoGenerator POs: qty, sku, description, unit price, total
+GENERATOR_LINE = {
+    "pattern": r"(?P<qty>\d+) (?P<sku>[A-Z]{2}-\d{3}) (?P<description>.+) \$[\d.]+ \$[\d.]+",
+    "continuation": r"(?P<description>[^$:]+)",
+}
+
+
+def line_template_test(count=10, seed=11):
+    """
+    Parses generated POs with a regex line template and with the table finder,
+    and checks the template reads the same items the generator wrote.
+    """
+    import random
+
+    from src.core.pdf_parser import PdfParser
+
+    print("\n--- 🧪 STARTING LINE TEMPLATE TEST ---")
+    random.seed(seed)
+
+    failures = 0
+    timings = {"line_template": 0.0, "table_finder": 0.0}
+    with _scratch() as tmp:
+        for i in range(count):
+            pogen = PoGenerator(output_dir=tmp, ruled=i % 2 == 1)
+            pogen.generate_pdf()
+            expected = [
+                [str(item["Qty"]), item["SKU"], item["Description"]]
+                for item in pogen.po_table
+            ]
+
+            for mode in timings:
+                _use_db(tmp / f"{pogen.path.stem}-{mode}.db")
+                if mode == "line_template":
+                    db.save_line_template(pogen.supplier, "generator", **GENERATOR_LINE)
+
+                start = time.perf_counter()
+                with PdfParser(pogen.path) as parser:
+                    _, items = parser.run()
+                timings[mode] += time.perf_counter() - start
+
+                if mode == "line_template":
+                    rows = items if isinstance(items, list) else items.to_dict("records")
+                    found = [[r["qty"], r["sku"], r["description"]] for r in rows]
+                    stats = db.get_line_templates(pogen.supplier)[0]
+                    if parser.line_template != "generator" or found != expected:
+                        failures += 1
+                        print(f"❌ Mismatch for {pogen.po_num} (hit rate {stats['hit_rate']})")
+
+    print(
+        f"Line template: {timings['line_template'] * 1000:.1f} ms, "
+        f"table finder: {timings['table_finder'] * 1000:.1f} ms"
+    )
+    if failures:
+        print(f"❌ FAILURE! {failures}/{count} POs differ")
+    else:
+        print(f"✅ SUCCESS! {count} POs read by the line template")
+    return failures == 0
+
+
+def streaming_test(pages=12, size=7, seed=19):
+    """
+    Exports long POs through the streaming path (iter_chunks, match_chunks,
+    prepare_export_chunks, run_chunks) and checks the files are the ones run()
+    gives, with and without a learned layout or line template. Then checks the
+    streaming memory peak doesn't grow with the page count.
+    """
+    import random
+    import tracemalloc
+
+    from src.core.exporter import Exporter
+    from src.core.matcher import fuzzy_match, match_chunks
+    from src.core.pdf_parser import PdfParser
+    from src.core.settings import settings
+    from src.lib.data import prepare_export_chunks, prepare_export_data
+
+    print("\n--- 🧪 STARTING STREAMING TEST ---")
+    random.seed(seed)
+
+    failures = 0
+    with _scratch("export_format", "aggregate_export_qty") as tmp:
+        exporter = Exporter()
+        exporter.output_dir = tmp
+        # Cold: nothing learned, warm: the layout template of a first parse
+        # (the table finder can't line up longer whitespace POs, run() included)
+        cases = [("table", 2, False), ("layout template", 2, True), ("line template", pages, False)]
+        for case, count, warm in cases:
+            pogen = PoGenerator(output_dir=tmp, page_count=count)
+            pogen.generate_pdf()
+
+            outputs = {}
+            for path in ["run", "stream"]:
+                files = []
+                for fmt, aggregate_qty in [(".csv", False), (".xlsx", False), (".csv", True)]:
+                    # Same database for every export, half the SKUs known
+                    name = f"{case}-{path}-{aggregate_qty}"
+                    _use_db(tmp / f"{name}{fmt}.db")
+                    for i, item in enumerate(pogen.po_table):
+                        db.add_product(f"WH-{i:04}", item["Description"])
+                        if i % 2 == 0:
+                            db.add_mapping(pogen.supplier, item["SKU"], f"WH-{i:04}")
+                    if case == "line template":
+                        db.save_line_template(pogen.supplier, "generator", **GENERATOR_LINE)
+                    if warm:
+                        with PdfParser(pogen.path) as parser:
+                            parser.run()
+
+                    settings.export_format = fmt
+                    settings.aggregate_export_qty = aggregate_qty
+                    if path == "run":
+                        with PdfParser(pogen.path) as parser:
+                            supplier, items = parser.run()
+                        matches = fuzzy_match(po_items=items, supplier=supplier)
+                        export = exporter.run(prepare_export_data(items, matches), name)
+                    else:
+                        pairs = match_chunks(PdfParser(pogen.path), size)
+                        export = exporter.run_chunks(prepare_export_chunks(pairs), name)
+                    files.append(_export_content(export))
+                outputs[path] = files
+
+            if outputs["run"] != outputs["stream"]:
+                failures += 1
+                print(f"❌ Streamed export differs from run() ({case})")
+
+        # Memory: the peak of a document three times as long stays the same
+        peaks = []
+        _use_db(tmp / "memory.db")
+        for count in (pages // 3, pages):
+            pogen = PoGenerator(output_dir=tmp, page_count=count, ruled=True)
+            pogen.generate_pdf()
+            tracemalloc.start()
+            for _ in PdfParser(pogen.path).iter_chunks(size=size):
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+            tracemalloc.stop()
+        print(f"Streaming peak: {peaks[0]:.1f} MB for {pages // 3} pages, {peaks[1]:.1f} MB for {pages}")
+        if peaks[1] > peaks[0] * 1.25:
+            failures += 1
+            print("❌ The streaming peak grows with the page count")
+
+    if failures:
+        print(f"❌ FAILURE! {failures} streaming checks failed")
+    else:
+        print("✅ SUCCESS! Streamed exports match run(), memory stays flat")
+    return failures == 0
+
+
+def stream_worker_test(pages=12, seed=31):
+    """
+    Sends a long PO through the Worker with streaming on: with every SKU known it's
+    exported chunk by chunk (same file as run()), with one unknown SKU it goes to
+    review and leaves no export behind. An empty stream writes no file.
+    """
+    import threading
+    from types import SimpleNamespace
+
+    from src.core.exporter import Exporter
+    from src.core.matcher import fuzzy_match
+    from src.core.pdf_parser import PdfParser
+    from src.core.settings import settings
+    from src.core.timing import add_sink, remove_sink
+    from src.core.workers import Worker
+    from src.lib.data import prepare_export_data
+
+    print("\n--- 🧪 STARTING STREAM WORKER TEST ---")
+
+    failures = 0
+    stages = []
+
+    def collect(record):
+        stages.append(record["stage"])
+
+    names = [
+        "output_dir",
+        "review_dir",
+        "archive_dir",
+        "archive_processed_files",
+        "export_format",
+        "streaming_page_threshold",
+        "isolated_parsing",
+        "parse_cache_size",
+    ]
+    with _scratch(*names) as tmp:
+        for folder in ("in", "out", "review", "archive"):
+            (tmp / folder).mkdir()
+        settings.output_dir = tmp / "out"
+        settings.review_dir = tmp / "review"
+        settings.archive_dir = tmp / "archive"
+        settings.archive_processed_files = True
+        settings.export_format = ".csv"
+        settings.streaming_page_threshold = 2
+        settings.isolated_parsing = False
+        # The real parse cache stays out of it
+        settings.parse_cache_size = 0
+
+        app = SimpleNamespace(
+            stop_event=threading.Event(), user_event=threading.Event(), processed_files=set()
+        )
+        worker = Worker(app)
+
+        pogen = PoGenerator(output_dir=tmp / "in", seed=seed, page_count=pages)
+        pogen.generate_pdf()
+
+        add_sink(collect)
+        try:
+            # The review case leaves the SKU of the last line unknown
+            for case, unknown in (("green", None), ("review", pogen.po_table[-1]["SKU"])):
+                _use_db(tmp / f"{case}.db")
+                db.save_line_template(pogen.supplier, "generator", **GENERATOR_LINE)
+                for i, item in enumerate(pogen.po_table):
+                    db.add_product(f"WH-{i:04}", item["Description"])
+                    if item["SKU"] != unknown:
+                        db.add_mapping(pogen.supplier, item["SKU"], f"WH-{i:04}")
+
+                # What the whole-file path exports
+                with PdfParser(pogen.path) as parser:
+                    supplier, items = parser.run()
+                matches = fuzzy_match(po_items=items, supplier=supplier)
+                expected = Exporter().run(prepare_export_data(items, matches), "expected")
+
+                path = tmp / "in" / pogen.path.name
+                stages.clear()
+                worker.process_file(path, "auto")
+                export = settings.output_dir / f"{pogen.path.stem}.csv"
+                leftovers = [p.name for p in settings.output_dir.glob(".*")]
+
+                if case == "green":
+                    if "worker.stream" not in stages or "worker.parse" in stages:
+                        failures += 1
+                        print("❌ The all-green PO wasn't streamed")
+                    if not export.exists() or _export_content(export) != _export_content(expected):
+                        failures += 1
+                        print("❌ The streamed export differs from run()")
+                    if not (settings.archive_dir / path.name).exists():
+                        failures += 1
+                        print("❌ The streamed PO wasn't archived")
+                    # Back to Input for the next case
+                    (settings.archive_dir / path.name).rename(path)
+                    export.unlink(missing_ok=True)
+                else:
+                    if export.exists() or not (settings.review_dir / path.name).exists():
+                        failures += 1
+                        print("❌ The PO with an unknown SKU was exported instead of reviewed")
+                if leftovers:
+                    failures += 1
+                    print(f"❌ Partial exports left behind: {leftovers}")
+                print(f"{case}: stages {sorted(set(stages))}")
+        finally:
+            remove_sink(collect)
+
+        if Exporter().run_chunks(iter([]), "empty") is not None or list(
+            settings.output_dir.glob("empty*")
+        ):
+            failures += 1
+            print("❌ An empty stream left a file")
+
+    if failures:
+        print(f"❌ FAILURE! {failures} worker streaming checks failed")
+    else:
+        print("✅ SUCCESS! Long POs streamed when known, reviewed otherwise")
+    return failures == 0
+
+
+def parse_cache_test(seed=37):
+    """
+    Caches the parse of a PO, then checks the entry is only used while the parser
+    settings and what it learned about the supplier stay the same: other settings,
+    a new layout or line template, or a new supplier alias parse the file again.
+    """
+    from src.core.parse_cache import ParseCache
+    from src.core.pdf_parser import PdfParser, page_count
+    from src.core.settings import settings
+
+    print("\n--- 🧪 STARTING PARSE CACHE TEST ---")
+
+    failures = 0
+    with _scratch("parse_cache_size", "extraction_engine", "skip_non_tabular_pages") as tmp:
+        settings.parse_cache_size = 50
+        settings.extraction_engine = "table_finder"
+        settings.skip_non_tabular_pages = True
+        _use_db(tmp / "cache.db")
+        cache = ParseCache()
+        cache.path = tmp / "parse_cache.db"
+        cache._initialize()
+
+        pogen = PoGenerator(output_dir=tmp, seed=seed, ruled=False)
+        pogen.generate_pdf()
+        file_hash = cache.file_hash(pogen.path)
+
+        def parse_and_store():
+            with PdfParser(pogen.path) as parser:
+                supplier, items = parser.run()
+            cache.put(file_hash, supplier, items, parser.num_pages)
+
+        def check(case, hit):
+            nonlocal failures
+            entry = cache.get(file_hash)
+            found = entry is not None
+            print(f"{case}: {'hit' if found else 'miss'}")
+            if found != hit:
+                failures += 1
+                print(f"❌ Expected a {'hit' if hit else 'miss'} after: {case}")
+            # A hit still reports the pages of the document
+            if found and entry[2] != page_count(pogen.path):
+                failures += 1
+                print(f"❌ Cached page count {entry[2]}, the document has {page_count(pogen.path)}")
+
+        # 1. The first parse learns the layout template, the entry is made after it
+        parse_and_store()
+        check("same settings, same supplier state", True)
+        # Review confirmations don't change a parse
+        item = pogen.po_table[0]
+        db.add_product("WH-0001", item["Description"])
+        db.add_mapping(pogen.supplier, item["SKU"], "WH-0001")
+        db.add_description_aliases(
+            pogen.supplier, [{"description": item["Description"], "warehouse_code": "WH-0001"}]
+        )
+        check("nothing the parser uses changed", True)
+
+        # 2. Settings
+        settings.extraction_engine = "clustering"
+        check("other extraction engine", False)
+        settings.extraction_engine = "table_finder"
+        settings.skip_non_tabular_pages = False
+        check("page skipping off", False)
+        settings.skip_non_tabular_pages = True
+        check("settings back", True)
+
+        # 3. What the parser learned about the supplier
+        db.delete_layout_template(pogen.supplier)
+        check("layout template forgotten", False)
+        parse_and_store()
+        db.save_line_template(pogen.supplier, "generator", **GENERATOR_LINE)
+        check("new line template", False)
+        parse_and_store()
+        check("parsed again with it", True)
+        db.add_supplier_alias("Northwind Traders", "Northwind Traders")
+        check("new supplier alias", False)
+
+    if failures:
+        print(f"❌ FAILURE! {failures} stale or missed cache entries")
+    else:
+        print("✅ SUCCESS! Cache entries follow the settings and the supplier state")
+    return failures == 0
+
+
+def match_index_test(products=20000, seed=5):
+    """
+    Checks that the in-memory match index gives the same matches as a fresh
+    load after in-place updates and outside writes, and times a warm lookup.
+    """
+    import random
+
+    from src.core.match_index import match_index
+    from src.core.matcher import fuzzy_match
+    from src.core.settings import settings
+
+    print("\n--- 🧪 STARTING MATCH INDEX TEST ---")
+    random.seed(seed)
+    supplier = "Acme Supplies"
+
+    def fresh(items):
+        match_index.clear()
+        return fuzzy_match(po_items=items, supplier=supplier)
+
+    failures = 0
+    with _scratch("matcher_engine", "normalize_descriptions") as tmp:
+        # 1. A catalog written straight to the file, half of it mapped to the supplier
+        _use_db(tmp / "index.db")
+        db.add_mapping(supplier, "AS-00000", _seed_catalog(products))
+
+        items = [
+            {"qty": "1", "sku": f"AS-{random.randrange(products):05}", "description": "x"}
+            for _ in range(20)
+        ] + [{"qty": "1", "sku": "NEW-1", "description": "Brand New Widget 9000"}]
+
+        # 2. Every change has to show up in the warm index
+        steps = [
+            ("initial", lambda: None),
+            ("add_product", lambda: db.add_product("WH-NEW", "Brand New Widget 9000")),
+            ("add_alias", lambda: db.add_description_aliases(supplier, [{"description": "BRAND NEW  Widget 9000", "warehouse_code": "WH-NEW"}])),
+            ("delete_alias", lambda: db.delete_description_aliases(supplier, ["brand new widget 9000"])),
+            ("add_alias again", lambda: db.add_description_aliases(supplier, [{"description": "Brand New Widget 9000", "warehouse_code": "WH-NEW"}])),
+            ("add_mapping", lambda: db.add_mapping(supplier, "NEW-1", "WH-NEW")),
+            ("remap", lambda: db.add_mapping(supplier, "NEW-2", "WH-NEW")),
+            ("outside write", lambda: _outside_write("UPDATE mappings SET acmesupplies = 'NEW-1' WHERE warehouse_code = 'WH-NEW'")),
+            ("outside rename", lambda: _outside_write("UPDATE products SET description = 'Brand New Widget 9001' WHERE warehouse_code = 'WH-NEW'")),
+            ("outside unalias", lambda: _outside_write("DELETE FROM description_aliases")),
+        ]
+        # (the token index of the blocked engine has to follow too)
+        for name, change in steps:
+            settings.matcher_engine = "blocked"
+            fuzzy_match(po_items=items, supplier=supplier)
+            # A search that started before the change keeps its descriptions and token index paired
+            descriptions, tokens = match_index.search_state(match_index.catalog(False))
+            change()
+            if name.startswith(("add", "delete", "remap")) and match_index.version is None:
+                failures += 1
+                print(f"❌ {name} dropped the index instead of updating it")
+            if len(descriptions) != tokens.size:
+                failures += 1
+                print(f"❌ {name} changed the token index under a running search")
+
+            # (and both catalogs, raw and normalized descriptions)
+            warm = {}
+            for engine in ["blocked", "batched"]:
+                for normalized in (False, True):
+                    settings.matcher_engine = engine
+                    settings.normalize_descriptions = normalized
+                    warm[engine, normalized] = fuzzy_match(po_items=items, supplier=supplier)
+            for engine, normalized in warm:
+                settings.matcher_engine = engine
+                settings.normalize_descriptions = normalized
+                if warm[engine, normalized] != fresh(items):
+                    failures += 1
+                    print(f"❌ Stale index after {name} ({engine}, normalized={normalized})")
+
+        # 3. Warm against cold lookups
+        match_index.clear()
+        start = time.perf_counter()
+        fuzzy_match(po_items=items[:1], supplier=supplier)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        fuzzy_match(po_items=items[:1], supplier=supplier)
+        warm = time.perf_counter() - start
+        print(f"Cold lookup: {cold * 1000:.1f} ms, warm: {warm * 1000:.1f} ms")
+
+    if failures:
+        print(f"❌ FAILURE! {failures} stale results")
+    else:
+        print("✅ SUCCESS! The index followed every change")
+    return failures == 0
+
+
+def description_alias_test(products=20000, lines=200, seed=9):
+    """
+    Confirms a PO in review, then checks that the same descriptions under new
+    SKUs (case and spacing aside) come back blue without fuzzy scoring, that
+    another grade of a confirmed description does not, and that blue lines still
+    go to review. Then forgets half of the aliases.
+    """
+    import random
+
+    from src.core.match_index import match_index
+    from src.core.matcher import fuzzy_match, green_check
+    from src.lib.data import prepare_review_data
+    from src.lib.mappings import delete_aliases_batch, save_aliases_batch
+    from src.tools.po_generator import PoGenerator
+
+    print("\n--- 🧪 STARTING DESCRIPTION ALIAS TEST ---")
+    random.seed(seed)
+    supplier = "Acme Supplies"
+
+    failures = 0
+    with _scratch() as tmp:
+        pogen = PoGenerator(output_dir=tmp)
+        _use_db(tmp / "aliases.db")
+        _seed_catalog(products)
+        match_index.clear()
+
+        picks = [random.randrange(products) for _ in range(lines)]
+        descriptions = [f"Part {i} Steel Bolt M{i % 40}" for i in picks]
+
+        # The supplier's wording, the same on every PO
+        worded = [f"{pogen._scramble_text(d)} Grade A" for d in descriptions]
+
+        def po(prefix, text):
+            return [
+                {"qty": "1", "sku": f"{prefix}-{n:04}", "description": text(d)}
+                for n, d in enumerate(worded)
+            ]
+
+        # 1. First PO: unknown SKUs, fuzzy scored, then confirmed in review
+        first = po("X1", lambda d: d)
+        start = time.perf_counter()
+        matches = fuzzy_match(po_items=first, supplier=supplier)
+        scored = time.perf_counter() - start
+        save_aliases_batch(
+            supplier,
+            [
+                {"description": item["description"], "warehouse_code": f"WH-{i:05}"}
+                for item, i in zip(first, picks)
+            ],
+        )
+
+        # 2. Second PO: new SKUs, same products, other case and spacing
+        start = time.perf_counter()
+        matches = fuzzy_match(po_items=po("X2", lambda d: f"  {d.upper()}".replace(" ", "  ")), supplier=supplier)
+        aliased = time.perf_counter() - start
+
+        for match, i in zip(matches, picks):
+            if match["flag"] != "blue" or match["warehouse_code"] != f"WH-{i:05}":
+                failures += 1
+        if green_check(matches):
+            failures += 1
+            print("❌ Blue lines were exported without review")
+        print(f"Scored: {scored * 1000:.1f} ms, aliased: {aliased * 1000:.1f} ms")
+
+        # 3. Another grade of the same product is not the confirmed one
+        matches = fuzzy_match(po_items=po("X3", lambda d: d.replace("Grade A", "Grade B")), supplier=supplier)
+        graded = sum(match["flag"] == "blue" for match in matches)
+        if graded:
+            failures += graded
+            print(f"❌ {graded} lines of another grade came back blue")
+
+        # 4. Forgotten aliases are scored again
+        delete_aliases_batch(supplier, worded[: lines // 2])
+        matches = fuzzy_match(po_items=po("X4", lambda d: d), supplier=supplier)
+        kept = sum(match["flag"] == "blue" for match in matches)
+        expected = len(set(worded[lines // 2 :]) - set(worded[: lines // 2]))
+        if kept != expected:
+            failures += 1
+            print(f"❌ {kept} blue lines after deleting half of the aliases, expected {expected}")
+
+        # 5. A line without a description is no alias, and confirms no other empty line
+        missing = (None, float("nan"), pd.NA, "   ")
+        saved = sum(
+            db.add_description_aliases(
+                supplier, [{"description": description, "warehouse_code": "WH-00000"}]
+            )
+            for description in missing
+        )
+        empty = [
+            {"qty": "1", "sku": f"X5-{n}", "description": description}
+            for n, description in enumerate(missing)
+        ]
+        matches = fuzzy_match(po_items=empty, supplier=supplier)
+        if saved or any(match["flag"] == "blue" for match in matches):
+            failures += 1
+            print(f"❌ Missing descriptions saved as aliases ({saved}) or matched by one")
+
+        # The review rows (what gets saved on commit) show them empty, not as "<NA>"
+        for items in (empty, pd.DataFrame(empty)):
+            results = fuzzy_match(po_items=items, supplier=supplier)
+            _, rows = prepare_review_data(items, results)
+            shown = {row["description"].strip() for row in rows}
+            if shown != {""}:
+                failures += 1
+                print(f"❌ Missing descriptions reach the review as {sorted(shown)}")
+
+    if failures:
+        print(f"❌ FAILURE! {failures}/{lines} lines not matched by their alias")
+    else:
+        print(f"✅ SUCCESS! {lines} lines matched by their alias")
+    return failures == 0
+
+
+def duplicate_lines_test(products=20000, distinct=50, repeats=4, seed=13):
+    """
+    Checks that a PO repeating its lines (delivery splits) gets one match result per
+    line, one review row per distinct line and the right export, with and without
+    qty aggregation, on both the pandas and the list of dicts paths.
+    """
+    import random
+
+    import pandas as pd
+
+    from src.core.match_index import match_index
+    from src.core.matcher import fuzzy_match
+    from src.core.settings import settings
+    from src.lib.data import prepare_export_data, prepare_review_data
+
+    print("\n--- 🧪 STARTING DUPLICATE LINES TEST ---")
+    random.seed(seed)
+    supplier = "Acme Supplies"
+
+    failures = 0
+    with _scratch("aggregate_export_qty") as tmp:
+        _use_db(tmp / "duplicates.db")
+        _seed_catalog(products)
+        match_index.clear()
+
+        # Every line split over a few deliveries, odd products have no known SKU
+        picks = random.sample(range(products), distinct)
+        lines = [
+            {"qty": str(n + 1), "sku": f"AS-{i:05}", "description": f"Part {i} Steel Bolt M{i % 40}"}
+            for i in picks
+            for n in range(repeats)
+        ]
+        random.shuffle(lines)
+        totals = {}
+        for line in lines:
+            totals[line["sku"]] = totals.get(line["sku"], 0) + int(line["qty"])
+
+        # Warm index, the timings are the matching alone
+        fuzzy_match(po_items=lines[:1], supplier=supplier)
+        for items in (lines, pd.DataFrame(lines)):
+            start = time.perf_counter()
+            matches = fuzzy_match(po_items=items, supplier=supplier)
+            elapsed = time.perf_counter() - start
+            records = matches if isinstance(matches, list) else matches.to_dict("records")
+            _, rows = prepare_review_data(items, matches)
+
+            settings.aggregate_export_qty = False
+            export = prepare_export_data(items, matches)
+            settings.aggregate_export_qty = True
+            summed = prepare_export_data(items, matches)
+            if not isinstance(export, list):
+                export, summed = export.to_dict("records"), summed.to_dict("records")
+
+            expected = {f"WH-{i:05}": totals[f"AS-{i:05}"] for i in picks}
+            found = {row["Warehouse Code"]: row["Qty"] for row in summed}
+            kind = type(items).__name__
+            if [r["sku"] for r in records] != [line["sku"] for line in lines]:
+                failures += 1
+                print(f"❌ {kind}: match results out of line with the items")
+            if len(rows) != distinct:
+                failures += 1
+                print(f"❌ {kind}: {len(rows)} review rows for {distinct} distinct lines")
+            if len(export) != len(lines):
+                failures += 1
+                print(f"❌ {kind}: {len(export)} export rows for {len(lines)} lines")
+            if len(summed) != distinct or found != expected:
+                failures += 1
+                print(f"❌ {kind}: wrong aggregated quantities")
+            print(f"{kind}: {len(lines)} lines matched in {elapsed * 1000:.1f} ms")
+
+    if failures:
+        print(f"❌ FAILURE! {failures} checks failed")
+    else:
+        print("✅ SUCCESS! Repeated lines matched once and exported right")
+    return failures == 0
+
+
+def catalog_collision_test():
+    """
+    Products that only differ by a grade, a revision or a number, or not at all
+    once normalized: each line gets its own product, and none of them is lost
+    from the review candidates, on every engine and both catalogs.
+    """
+
+    from src.core.match_index import match_index
+    from src.core.matcher import fuzzy_match
+    from src.core.settings import settings
+
+    print("\n--- 🧪 STARTING CATALOG COLLISION TEST ---")
+    supplier = "Acme Supplies"
+
+    products = [
+        ("WH-G8", "Hex Bolt M8 Galvanized Grade 8"),
+        ("WH-G5", "Hex Bolt M8 Galvanized Grade 5"),
+        ("WH-R1", "Hydraulic Filter 220V Rev 1"),
+        ("WH-R2", "Hydraulic Filter 220V Rev 2"),
+        ("WH-1000", "1000 ft Copper Cable"),
+        ("WH-2500", "2500 ft Copper Cable"),
+        # The same product twice, once with a tag
+        ("WH-PUMP", "Pneumatic Pump 15psi"),
+        ("WH-PUMP-2", "[NEW] Pneumatic Pump 15psi"),
+    ]
+    items = [
+        {"qty": "1", "sku": "N-1", "description": "REF:1234 - Hex Bolt M8 Galvanized Grade 5"},
+        {"qty": "1", "sku": "N-2", "description": "PN:2925 Hydraulic Filter 220V Rev 2"},
+        {"qty": "1", "sku": "N-3", "description": "2500 ft Copper Cable"},
+        {"qty": "1", "sku": "N-4", "description": "Pneumatic Pump 15psi"},
+    ]
+    expected = ["WH-G5", "WH-R2", "WH-2500", "WH-PUMP"]
+
+    failures = 0
+    with _scratch("matcher_engine", "normalize_descriptions") as tmp:
+        _use_db(tmp / "collisions.db")
+        for code, description in products:
+            db.add_product(code, description)
+
+        for engine in ["row", "batched", "blocked"]:
+            for normalized in (True, False):
+                settings.matcher_engine = engine
+                settings.normalize_descriptions = normalized
+                match_index.clear()
+                results = fuzzy_match(po_items=items, supplier=supplier)
+                case = f"{engine}, normalized={normalized}"
+
+                for result, code in zip(results, expected):
+                    if result["warehouse_code"] != code:
+                        failures += 1
+                        print(f"❌ {result['sku']} -> {result['warehouse_code']}, expected {code} ({case})")
+                # Both pumps are offered in review
+                offered = {c["warehouse_code"] for c in results[3]["candidates"]}
+                if not {"WH-PUMP", "WH-PUMP-2"} <= offered:
+                    failures += 1
+                    print(f"❌ Pump candidates {sorted(offered)} ({case})")
+
+    if failures:
+        print(f"❌ FAILURE! {failures} lines matched to the wrong product")
+    else:
+        print("✅ SUCCESS! Every product kept apart")
+    return failures == 0
+
+
+def supplier_alias_test(seed=23):
+    """
+    Checks that a supplier read off the page isn't saved as an alias, that a saved
+    alias only matches whole words of a file name, and that it can be deleted.
+    """
+    import random
+    import shutil
+
+    from src.core.pdf_parser import PdfParser
+    from src.lib.mappings import save_supplier_alias
+
+    print("\n--- 🧪 STARTING SUPPLIER ALIAS TEST ---")
+    random.seed(seed)
+
+    failures = 0
+    with _scratch() as tmp:
+        _use_db(tmp / "suppliers.db")
+        pogen = PoGenerator(output_dir=tmp)
+        pogen.generate_pdf()
+
+        # 1. Read off the page, nothing saved
+        with PdfParser(pogen.path) as parser:
+            supplier, _ = parser.run()
+        if db.get_supplier_aliases():
+            failures += 1
+            print(f"❌ Parsing saved aliases: {db.get_supplier_aliases()}")
+
+        # 2. Reviewed: whole words of the file name only (the page says another supplier)
+        save_supplier_alias("Northwind Traders")
+        names = {
+            "PO_Northwind_Traders_0042": "Northwind Traders",
+            "northwind-traders PO 7": "Northwind Traders",
+            "PO_NorthwindTradersEU_0042": supplier,
+            "PO_XNorthwind_Traders_0042": supplier,
+        }
+        for name, expected in names.items():
+            path = tmp / f"{name}.pdf"
+            shutil.copy(pogen.path, path)
+            with PdfParser(path) as parser:
+                found, _ = parser.run()
+            if found != expected:
+                failures += 1
+                print(f"❌ {name}: {found}, expected {expected}")
+
+        # 3. A wrong alias can be taken back
+        if not db.delete_supplier_alias("Northwind Traders") or db.get_supplier_aliases():
+            failures += 1
+            print("❌ The alias wasn't deleted")
+
+    if failures:
+        print(f"❌ FAILURE! {failures} supplier alias checks failed")
+    else:
+        print("✅ SUCCESS! Supplier aliases are only saved, matched and kept on purpose")
+    return failures == 0
+
+
+def continuation_page_test(seed=17):
+    """
+    Checks that a continuation page without a header, holding a single item,
+    is read with page skipping on (the item used to be dropped as "almost no text").
+    """
+
+    from src.core.pdf_parser import PdfParser
+    from src.core.settings import settings
+
+    print("\n--- 🧪 STARTING CONTINUATION PAGE TEST ---")
+
+    failures = 0
+    with _scratch("skip_non_tabular_pages") as tmp:
+        # 1. How many items fill the first page
+        probe = PoGenerator(output_dir=tmp, seed=seed, page_count=2, repeat_header=False)
+        probe.generate_pdf()
+        first_page = probe.page_rows[0]
+
+        # 2. The same items and a short one more, alone on page 2: no header, no footer
+        pogen = PoGenerator(output_dir=tmp, repeat_header=False)
+        pogen.po_table = probe.po_table[:first_page] + [
+            dict(probe.po_table[first_page], SKU="NP-999", Description="Hex Bolt")
+        ]
+        pogen._create_pdf_header()
+        pogen._create_pdf_table()
+        pogen.canvas.save()
+        if pogen.page_rows != [first_page, 1]:
+            print(f"❌ Expected {first_page} + 1 items, the PO has {pogen.page_rows}")
+            return False
+
+        for skipping in (True, False):
+            _use_db(tmp / f"skip-{skipping}.db")
+            settings.skip_non_tabular_pages = skipping
+            # The first parse learns the supplier's layout, the second one uses it
+            for _ in range(2):
+                with PdfParser(pogen.path) as parser:
+                    _, items = parser.run()
+
+            rows = items if isinstance(items, list) else items.to_dict("records")
+            skus = [str(r["sku"]) for r in rows]
+            print(f"Skipping {'on' if skipping else 'off'}: {len(rows)} rows")
+            if len(rows) != len(pogen.po_table) or "NP-999" not in skus:
+                failures += 1
+                print(f"❌ Lost the continuation item ({len(rows)}/{len(pogen.po_table)} rows)")
+
+    if failures:
+        print("❌ FAILURE! The continuation page was dropped")
+    else:
+        print("✅ SUCCESS! The one-line continuation page was read")
+    return failures == 0
+
+
+def clustering_template_test(seed=29):
+    """
+    Parses a PO twice with the clustering engine: the first parse must check the
+    layout template it learns on the template path, the second must still cluster.
+    """
+    from src.core import pdf_parser
+    from src.core.pdf_parser import PdfParser
+    from src.core.settings import settings
+    from src.core.timing import add_sink, remove_sink
+
+    print("\n--- 🧪 STARTING CLUSTERING TEMPLATE TEST ---")
+
+    failures = 0
+    calls = []
+    stages = []
+    template_rows = pdf_parser.template_rows
+
+    def counted(words, template):
+        calls.append(1)
+        return template_rows(words, template)
+
+    def collect(record):
+        stages.append(record["stage"])
+
+    with _scratch("extraction_engine") as tmp:
+        pogen = PoGenerator(output_dir=tmp, seed=seed, ruled=False)
+        pogen.generate_pdf()
+        _use_db(tmp / "clustering.db")
+        settings.extraction_engine = "clustering"
+
+        pdf_parser.template_rows = counted
+        add_sink(collect)
+        try:
+            results = []
+            for run in ("cold", "warm"):
+                calls.clear()
+                stages.clear()
+                with PdfParser(pogen.path) as parser:
+                    _, items = parser.run()
+                rows = items if isinstance(items, list) else items.to_dict("records")
+                results.append([str(r["sku"]) for r in rows])
+                print(f"{run}: {len(rows)} rows, template rows cut {len(calls)} times")
+
+                if run == "cold" and not calls:
+                    failures += 1
+                    print("❌ The template check never went through the template")
+                if run == "warm" and ("parser.clustering" not in stages or calls):
+                    failures += 1
+                    print("❌ The saved template replaced the clustering engine")
+        finally:
+            pdf_parser.template_rows = template_rows
+            remove_sink(collect)
+
+        if db.get_layout_template(pogen.supplier) is None:
+            failures += 1
+            print("❌ No layout template was learned")
+        expected = [item["SKU"] for item in pogen.po_table]
+        if any(skus != expected for skus in results):
+            failures += 1
+            print("❌ The items differ from the generated PO")
+
+    if failures:
+        print("❌ FAILURE! The engines got mixed up")
+    else:
+        print("✅ SUCCESS! Template checked on its own path, clustering kept")
+    return failures == 0
+
+
+@contextmanager
+def _scratch(*names):
+    """Temp folder (Path) for a test's POs and databases; the app database,
+    the listed settings and the match index are put back afterwards"""
+    from src.core.match_index import match_index
+    from src.core.settings import settings
+
+    saved = {name: getattr(settings, name) for name in names}
+    db_path = db.path
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            yield Path(tmp)
+        finally:
+            db.path = db_path
+            for name, value in saved.items():
+                setattr(settings, name, value)
+            match_index.clear()
+
+
+def _use_db(path):
+    """Points the app at a new empty database"""
+    db.path = path
+    db._initialize()
+
+
+def _seed_catalog(count) -> str:
+    """Bulk inserts products (every other one mapped to Acme Supplies), returns a code"""
+    db._ensure_supplier("Acme Supplies")
+    conn = db._get_connection()
+    conn.executemany(
+        "INSERT INTO products (warehouse_code, description) VALUES (?, ?)",
+        [(f"WH-{i:05}", f"Part {i} Steel Bolt M{i % 40}") for i in range(count)],
+    )
+    conn.executemany(
+        "INSERT INTO mappings (warehouse_code, acmesupplies) VALUES (?, ?)",
+        [(f"WH-{i:05}", f"AS-{i:05}" if i % 2 == 0 else None) for i in range(count)],
+    )
+    conn.commit()
+    conn.close()
+    return "WH-00000"
+
+
+def _outside_write(sql):
+    conn = db._get_connection()
+    conn.execute(sql)
+    conn.commit()
+    conn.close()